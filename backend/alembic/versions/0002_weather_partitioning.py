@@ -0,0 +1,124 @@
+"""Weather time-series indexes and yearly partitioning of weather_history
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+# Cria (se necessário) a partição anual, movendo para ela as linhas que tenham caído
+# na partição default. O advisory lock serializa cargas concorrentes.
+ENSURE_PARTITION_FN = """
+CREATE OR REPLACE FUNCTION weather_history_ensure_partition(p_year integer) RETURNS void AS $$
+DECLARE
+    part text := format('weather_history_y%s', p_year);
+    lo date := make_date(p_year, 1, 1);
+    hi date := make_date(p_year + 1, 1, 1);
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('weather_history_partitions'));
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE weather_history INCLUDING DEFAULTS)', part);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM weather_history_default WHERE reading_date >= %L AND reading_date < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved', lo, hi, part
+    );
+    EXECUTE format(
+        'ALTER TABLE weather_history ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', part, lo, hi
+    );
+END
+$$ LANGUAGE plpgsql
+"""
+
+ENSURE_PARTITIONS_FN = """
+CREATE OR REPLACE FUNCTION weather_history_ensure_partitions(p_from date, p_to date) RETURNS void AS $$
+BEGIN
+    IF p_from IS NULL OR p_to IS NULL THEN
+        RETURN;
+    END IF;
+    FOR y IN extract(year FROM p_from)::integer..extract(year FROM p_to)::integer LOOP
+        PERFORM weather_history_ensure_partition(y);
+    END LOOP;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.create_index("ix_weather_forecasts_station_date", "weather_forecasts", ["station_id", "forecast_date"])
+
+    op.execute("ALTER TABLE weather_history RENAME TO weather_history_legacy")
+    op.execute("ALTER TABLE weather_history_legacy RENAME CONSTRAINT weather_history_pkey TO weather_history_legacy_pkey")
+    op.execute(
+        """
+        CREATE TABLE weather_history (
+            id integer NOT NULL DEFAULT nextval('weather_history_id_seq'),
+            station_id integer REFERENCES weather_stations (id) ON DELETE CASCADE,
+            reading_date date NOT NULL,
+            rainfall_mm double precision NOT NULL,
+            temperature_c double precision NOT NULL,
+            eto double precision NOT NULL,
+            ndvi double precision NOT NULL,
+            PRIMARY KEY (id, reading_date)
+        ) PARTITION BY RANGE (reading_date)
+        """
+    )
+    op.execute("ALTER SEQUENCE weather_history_id_seq OWNED BY weather_history.id")
+    # Índice único (station_id, reading_date DESC): atende get_history (filtro por estação,
+    # ordenação decrescente por data) e serve de alvo para ON CONFLICT nas cargas.
+    op.execute(
+        "CREATE UNIQUE INDEX uq_weather_history_station_date ON weather_history (station_id, reading_date DESC)"
+    )
+    op.execute("CREATE TABLE weather_history_default PARTITION OF weather_history DEFAULT")
+    op.execute(ENSURE_PARTITION_FN)
+    op.execute(ENSURE_PARTITIONS_FN)
+    op.execute(
+        """
+        SELECT weather_history_ensure_partitions(
+            LEAST(min(reading_date), current_date), GREATEST(max(reading_date), current_date + interval '1 year')::date
+        ) FROM weather_history_legacy
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO weather_history (id, station_id, reading_date, rainfall_mm, temperature_c, eto, ndvi)
+        SELECT DISTINCT ON (station_id, reading_date) id, station_id, reading_date, rainfall_mm, temperature_c, eto, ndvi
+        FROM weather_history_legacy
+        ORDER BY station_id, reading_date, id DESC
+        """
+    )
+    op.execute("DROP TABLE weather_history_legacy")
+    op.execute("ANALYZE weather_history")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE weather_history RENAME TO weather_history_partitioned")
+    op.execute("ALTER INDEX weather_history_pkey RENAME TO weather_history_partitioned_pkey")
+    op.execute(
+        """
+        CREATE TABLE weather_history (
+            id integer PRIMARY KEY DEFAULT nextval('weather_history_id_seq'),
+            station_id integer REFERENCES weather_stations (id) ON DELETE CASCADE,
+            reading_date date NOT NULL,
+            rainfall_mm double precision NOT NULL,
+            temperature_c double precision NOT NULL,
+            eto double precision NOT NULL,
+            ndvi double precision NOT NULL
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE weather_history_id_seq OWNED BY weather_history.id")
+    op.execute("INSERT INTO weather_history SELECT * FROM weather_history_partitioned")
+    op.execute("DROP TABLE weather_history_partitioned CASCADE")
+    op.execute("DROP FUNCTION weather_history_ensure_partitions(date, date)")
+    op.execute("DROP FUNCTION weather_history_ensure_partition(integer)")
+    op.drop_index("ix_weather_forecasts_station_date", table_name="weather_forecasts")
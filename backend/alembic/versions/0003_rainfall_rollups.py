@@ -0,0 +1,103 @@
+"""Monthly and per-season rainfall rollups maintained by weather_history triggers
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+BUCKETS = {
+    "weather_rainfall_monthly": ("month", "date_trunc('month', reading_date)::date"),
+    "weather_rainfall_seasonal": (
+        "season_start",
+        "make_date(extract(year FROM reading_date - interval '6 months')::integer, 7, 1)",
+    ),
+}
+SOURCES = {
+    "insert": "SELECT station_id, reading_date, rainfall_mm, 1 AS sign FROM new_rows",
+    "delete": "SELECT station_id, reading_date, rainfall_mm, -1 AS sign FROM old_rows",
+    "update": (
+        "SELECT station_id, reading_date, rainfall_mm, 1 AS sign FROM new_rows "
+        "UNION ALL SELECT station_id, reading_date, rainfall_mm, -1 FROM old_rows"
+    ),
+}
+TRANSITION_TABLES = {
+    "insert": "NEW TABLE AS new_rows",
+    "delete": "OLD TABLE AS old_rows",
+    "update": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+}
+
+
+def _upsert(table: str, source: str) -> str:
+    bucket, expression = BUCKETS[table]
+    return f"""
+        INSERT INTO {table} AS r (station_id, {bucket}, rainfall_sum, reading_count, rainy_days)
+        SELECT station_id, {expression}, sum(sign * rainfall_mm), sum(sign), coalesce(sum(sign) FILTER (WHERE rainfall_mm > 0), 0)
+        FROM ({source}) d
+        WHERE station_id IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (station_id, {bucket}) DO UPDATE
+        SET rainfall_sum = r.rainfall_sum + EXCLUDED.rainfall_sum,
+            reading_count = r.reading_count + EXCLUDED.reading_count,
+            rainy_days = r.rainy_days + EXCLUDED.rainy_days;
+    """
+
+
+def _create_rollup_table(name: str, bucket: str) -> None:
+    op.create_table(
+        name,
+        sa.Column("station_id", sa.Integer, sa.ForeignKey("weather_stations.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column(bucket, sa.Date, primary_key=True),
+        sa.Column("rainfall_sum", sa.Float, nullable=False, server_default="0"),
+        sa.Column("reading_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("rainy_days", sa.Integer, nullable=False, server_default="0"),
+    )
+
+
+def upgrade() -> None:
+    for table, (bucket, _) in BUCKETS.items():
+        _create_rollup_table(table, bucket)
+
+    # Backfill antes dos triggers: a migração roda em uma transação, então nenhuma
+    # leitura nova escapa entre a carga inicial e a criação dos triggers.
+    op.execute("LOCK TABLE weather_history IN SHARE MODE")
+    source = "SELECT station_id, reading_date, rainfall_mm, 1 AS sign FROM weather_history"
+    for table in BUCKETS:
+        op.execute(_upsert(table, source))
+
+    for operation, source in SOURCES.items():
+        body = "".join(_upsert(table, source) for table in BUCKETS)
+        op.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION weather_rainfall_on_{operation}() RETURNS trigger AS $$
+            BEGIN
+                {body}
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+        op.execute(
+            f"""
+            CREATE TRIGGER weather_rainfall_{operation} AFTER {operation.upper()} ON weather_history
+            REFERENCING {TRANSITION_TABLES[operation]}
+            FOR EACH STATEMENT EXECUTE FUNCTION weather_rainfall_on_{operation}()
+            """
+        )
+
+
+def downgrade() -> None:
+    for operation in SOURCES:
+        op.execute(f"DROP TRIGGER weather_rainfall_{operation} ON weather_history")
+        op.execute(f"DROP FUNCTION weather_rainfall_on_{operation}()")
+    for table in BUCKETS:
+        op.drop_table(table)
@@ -0,0 +1,34 @@
+"""Append-only price quote history
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "price_quotes",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column("commodity", sa.String(64), nullable=False),
+        sa.Column("ts", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("price", sa.Float, nullable=False),
+        sa.Column("unit", sa.String(16), nullable=False),
+        sa.Column("source", sa.String(128), nullable=False),
+        sa.Column("payload", sa.JSON, nullable=False),
+    )
+    op.create_index("ix_price_quotes_commodity_ts", "price_quotes", ["commodity", "ts"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_price_quotes_commodity_ts", table_name="price_quotes")
+    op.drop_table("price_quotes")
@@ -0,0 +1,46 @@
+"""Store refresh tokens as SHA-256 digests with expiry for rotation and pruning
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("refresh_tokens", sa.Column("token_hash", sa.LargeBinary(32)))
+    op.add_column("refresh_tokens", sa.Column("expires_at", sa.TIMESTAMP(timezone=True)))
+    # Tokens existentes continuam válidos: digest do JWT e validade estimada pela duração
+    # padrão do refresh (7 dias). Revogados expiram já e saem na próxima limpeza.
+    op.execute(
+        """
+        UPDATE refresh_tokens
+        SET token_hash = sha256(convert_to(token, 'UTF8')),
+            expires_at = CASE WHEN revoked THEN now() ELSE coalesce(created_at, now()) + interval '7 days' END
+        """
+    )
+    op.alter_column("refresh_tokens", "token_hash", nullable=False)
+    op.alter_column("refresh_tokens", "expires_at", nullable=False)
+    op.drop_column("refresh_tokens", "token")
+    op.execute("CREATE INDEX ix_refresh_tokens_token_hash ON refresh_tokens USING hash (token_hash)")
+    op.create_index("ix_refresh_tokens_expires_at", "refresh_tokens", ["expires_at"])
+
+
+def downgrade() -> None:
+    # O JWT original não é recuperável a partir do digest: os tokens deixam de ser aceitos.
+    op.add_column("refresh_tokens", sa.Column("token", sa.Text))
+    op.execute("UPDATE refresh_tokens SET token = encode(token_hash, 'hex'), revoked = true")
+    op.alter_column("refresh_tokens", "token", nullable=False)
+    op.create_unique_constraint("refresh_tokens_token_key", "refresh_tokens", ["token"])
+    op.drop_index("ix_refresh_tokens_expires_at", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_token_hash", table_name="refresh_tokens")
+    op.drop_column("refresh_tokens", "expires_at")
+    op.drop_column("refresh_tokens", "token_hash")
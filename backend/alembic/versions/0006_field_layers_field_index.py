@@ -0,0 +1,22 @@
+"""Index field_layers.field_id for eager loading of field layers
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_field_layers_field_id", "field_layers", ["field_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_field_layers_field_id", table_name="field_layers")
@@ -0,0 +1,24 @@
+"""GiST index on fields.geometry for vector tiles and spatial filters
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Mesmo nome que o GeoAlchemy2 usa em create_all: bancos que já têm o índice ficam como estão.
+    op.execute("CREATE INDEX IF NOT EXISTS idx_fields_geometry ON fields USING gist (geometry)")
+    op.execute("ANALYZE fields")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_fields_geometry")
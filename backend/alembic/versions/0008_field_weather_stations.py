@@ -0,0 +1,117 @@
+"""Station locations as geography and precomputed nearest stations per field
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+# SQL congelado desta revisão; app.models.field mantém apenas a cópia usada pelo create_all.
+FUNCTIONS = [
+    """
+    CREATE OR REPLACE FUNCTION field_weather_stations_refresh(p_field_ids integer[]) RETURNS void AS $$
+    BEGIN
+        DELETE FROM field_weather_stations WHERE p_field_ids IS NULL OR field_id = ANY(p_field_ids);
+        INSERT INTO field_weather_stations (field_id, rank, station_id, distance_m)
+        SELECT f.id, row_number() OVER (PARTITION BY f.id ORDER BY s.distance_m, s.id), s.id, s.distance_m
+        FROM fields f
+        CROSS JOIN LATERAL (SELECT ST_Centroid(ST_Transform(f.geometry, 4326))::geography AS centroid) c
+        CROSS JOIN LATERAL (
+            SELECT ws.id, ST_Distance(ws.location, c.centroid) AS distance_m
+            FROM weather_stations ws
+            ORDER BY ws.location <-> c.centroid
+            LIMIT 3
+        ) s
+        WHERE p_field_ids IS NULL OR f.id = ANY(p_field_ids)
+        ON CONFLICT (field_id, rank) DO UPDATE
+        SET station_id = EXCLUDED.station_id, distance_m = EXCLUDED.distance_m;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION fields_refresh_weather_stations() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM field_weather_stations_refresh(ARRAY(SELECT id FROM new_rows));
+        ELSE
+            PERFORM field_weather_stations_refresh(ARRAY(
+                SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.geometry IS DISTINCT FROM o.geometry
+            ));
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION weather_stations_refresh_fields() RETURNS trigger AS $$
+    BEGIN
+        PERFORM field_weather_stations_refresh(NULL);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+]
+
+TRIGGERS = [
+    """
+    CREATE TRIGGER fields_weather_stations_insert AFTER INSERT ON fields
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION fields_refresh_weather_stations()
+    """,
+    """
+    CREATE TRIGGER fields_weather_stations_update AFTER UPDATE ON fields
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION fields_refresh_weather_stations()
+    """,
+    """
+    CREATE TRIGGER weather_stations_refresh_fields
+    AFTER INSERT OR DELETE OR UPDATE OF latitude, longitude ON weather_stations
+    FOR EACH STATEMENT EXECUTE FUNCTION weather_stations_refresh_fields()
+    """,
+]
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        ALTER TABLE weather_stations ADD COLUMN location geography(POINT, 4326)
+        GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography) STORED
+        """
+    )
+    op.execute("CREATE INDEX idx_weather_stations_location ON weather_stations USING gist (location)")
+    op.create_table(
+        "field_weather_stations",
+        sa.Column("field_id", sa.Integer, sa.ForeignKey("fields.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("rank", sa.SmallInteger, primary_key=True),
+        sa.Column(
+            "station_id", sa.Integer, sa.ForeignKey("weather_stations.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("distance_m", sa.Float, nullable=False),
+    )
+    op.create_index("ix_field_weather_stations_station_id", "field_weather_stations", ["station_id"])
+    for statement in FUNCTIONS + TRIGGERS:
+        op.execute(statement)
+    op.execute("ANALYZE weather_stations")
+    op.execute("SELECT field_weather_stations_refresh(NULL)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS weather_stations_refresh_fields ON weather_stations")
+    op.execute("DROP TRIGGER IF EXISTS fields_weather_stations_update ON fields")
+    op.execute("DROP TRIGGER IF EXISTS fields_weather_stations_insert ON fields")
+    op.execute("DROP FUNCTION IF EXISTS weather_stations_refresh_fields()")
+    op.execute("DROP FUNCTION IF EXISTS fields_refresh_weather_stations()")
+    op.drop_table("field_weather_stations")
+    op.execute("DROP FUNCTION IF EXISTS field_weather_stations_refresh(integer[])")
+    op.execute("DROP INDEX IF EXISTS idx_weather_stations_location")
+    op.drop_column("weather_stations", "location")
@@ -0,0 +1,41 @@
+"""Report jobs run on the Celery queue: idempotency key, attempts, dispatch time and error detail
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("report_jobs", sa.Column("idempotency_key", sa.String(128)))
+    op.add_column("report_jobs", sa.Column("attempts", sa.Integer, nullable=False, server_default="0"))
+    op.add_column("report_jobs", sa.Column("error", sa.Text))
+    op.add_column("report_jobs", sa.Column("dispatched_at", sa.TIMESTAMP(timezone=True)))
+    op.add_column("report_jobs", sa.Column("started_at", sa.TIMESTAMP(timezone=True)))
+    op.create_unique_constraint("report_jobs_idempotency_key_key", "report_jobs", ["idempotency_key"])
+    # Jobs disparados com asyncio.create_task que não terminaram se perderam no reinício do processo.
+    op.execute(
+        """
+        UPDATE report_jobs
+        SET status = 'failed', error = 'Geração interrompida antes da fila de relatórios', finished_at = now()
+        WHERE status = 'pending'
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("report_jobs_idempotency_key_key", "report_jobs", type_="unique")
+    op.drop_column("report_jobs", "started_at")
+    op.drop_column("report_jobs", "dispatched_at")
+    op.drop_column("report_jobs", "error")
+    op.drop_column("report_jobs", "attempts")
+    op.drop_column("report_jobs", "idempotency_key")
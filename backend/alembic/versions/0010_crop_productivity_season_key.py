@@ -0,0 +1,49 @@
+"""One productivity record per season: unique season_id as the bulk-load natural key
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+
+import logging
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    # Duplicatas de cargas anteriores: mantém o registro mais recente de cada safra e move
+    # os demais para crop_productivity_duplicates, de onde o downgrade os restaura.
+    op.execute("CREATE TABLE crop_productivity_duplicates (LIKE crop_productivity INCLUDING DEFAULTS)")
+    moved = op.get_bind().execute(
+        sa.text(
+            """
+            WITH moved AS (
+                DELETE FROM crop_productivity c
+                USING crop_productivity newer
+                WHERE newer.season_id = c.season_id AND newer.id > c.id
+                RETURNING c.*
+            )
+            INSERT INTO crop_productivity_duplicates SELECT * FROM moved
+            """
+        )
+    ).rowcount
+    if moved:
+        logger.warning(
+            "%s registros duplicados de crop_productivity movidos para crop_productivity_duplicates", moved
+        )
+    op.create_index("uq_crop_productivity_season", "crop_productivity", ["season_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("uq_crop_productivity_season", table_name="crop_productivity")
+    op.execute("INSERT INTO crop_productivity SELECT * FROM crop_productivity_duplicates")
+    op.drop_table("crop_productivity_duplicates")
@@ -8,6 +8,8 @@ from app.core.security import decode_token
 from app.db.session import get_session
 from app.models import User, UserRole
 from app.core import rate_limit
+from app.schemas import TokenPayload
+from app.services.users import get_principal
 
 security_scheme = HTTPBearer()
 
@@ -17,21 +19,44 @@ async def get_db() -> AsyncSession:
         yield session
 
 
-async def get_current_user(
+async def get_token_claims(
     credentials: Annotated[HTTPAuthorizationCredentials, Security(security_scheme)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-) -> User:
+) -> TokenPayload:
     token_data = decode_token(credentials.credentials)
     if not token_data:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
+    return TokenPayload.model_validate(token_data)
+
 
-    result = await db.get(User, int(token_data["sub"]))
+async def get_current_user(
+    claims: Annotated[TokenPayload, Depends(get_token_claims)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> User:
+    result = await get_principal(db, int(claims.sub))
     if not result:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuário não encontrado")
+    if not result.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuário inativo")
     return result
 
 
-def require_roles(*roles: UserRole):
+def require_roles(*roles: UserRole, from_token: bool = False):
+    """Restringe a rota aos papéis informados.
+
+    Com ``from_token=True`` a checagem usa apenas o claim ``roles`` do JWT e a dependência
+    devolve o ``TokenPayload``, sem consultar o usuário; mudanças de papel ou desativação
+    só passam a valer quando o access token expira.
+    """
+    if from_token:
+        allowed = {role.value for role in roles}
+
+        async def token_checker(claims: Annotated[TokenPayload, Depends(get_token_claims)]) -> TokenPayload:
+            if allowed.isdisjoint(claims.roles):
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado")
+            return claims
+
+        return token_checker
+
     async def checker(user: Annotated[User, Depends(get_current_user)]) -> User:
         if user.role not in roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado")
@@ -40,6 +65,19 @@ def require_roles(*roles: UserRole):
     return checker
 
 
+def _route_name(request: Request) -> str | None:
+    endpoint = request.scope.get("endpoint")
+    if endpoint is None:
+        return None
+    return f"{endpoint.__module__.rsplit('.', 1)[-1]}.{endpoint.__name__}"
+
+
 async def rate_limit_dep(request: Request) -> None:
-    identifier = request.client.host or "anonymous"
-    await rate_limit.enforce(identifier)
\ No newline at end of file
+    # Apenas decodifica o JWT (sem consulta ao banco) para identificar principal e papéis.
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    claims = decode_token(token) if scheme.lower() == "bearer" and token else None
+    if claims:
+        principal, roles = f"user:{claims['sub']}", claims.get("roles", [])
+    else:
+        principal, roles = f"ip:{request.client.host if request.client else 'anonymous'}", []
+    await rate_limit.enforce(rate_limit.limits_for(principal, roles, _route_name(request)))
\ No newline at end of file
@@ -3,16 +3,14 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, get_db
-from app.core.security import (
-    create_access_token,
-    create_refresh_token,
-    get_password_hash,
-    verify_password,
-)
-from app.models import RefreshToken, User
+from app.core.config import get_settings
+from app.core.security import create_access_token, password_hasher
+from app.models import User
 from app.schemas import LoginRequest, LoginResponse, RefreshRequest, TokenPair, UserCreate, UserRead
+from app.services.tokens import RefreshTokenService
 
 router = APIRouter()
+settings = get_settings()
 
 
 @router.post("/register", response_model=UserRead, summary="Cria um usuário com RBAC")
@@ -20,10 +18,12 @@ async def register(payload: UserCreate, db: AsyncSession = Depends(get_db)) -> U
     existing = await db.execute(select(User).where(User.email == payload.email))
     if existing.scalar_one_or_none():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="E-mail já cadastrado")
+    # Libera a conexão antes do bcrypt para não segurar o pool durante o hash.
+    await db.commit()
     user = User(
         email=payload.email,
         full_name=payload.full_name,
-        hashed_password=get_password_hash(payload.password),
+        hashed_password=await password_hasher.hash(payload.password),
         role=payload.role,
         locale=payload.locale,
     )
@@ -38,35 +38,28 @@ async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)) -> Lo
     stmt = select(User).where(User.email == payload.email)
     result = await db.execute(stmt)
     user = result.scalar_one_or_none()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    # Libera a conexão antes do bcrypt (expire_on_commit=False mantém o usuário carregado).
+    await db.commit()
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciais inválidas")
+    valid, new_hash = await password_hasher.verify_and_update(payload.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciais inválidas")
+    if new_hash and settings.password_rehash_on_login:
+        user.hashed_password = new_hash
 
     tokens = TokenPair(
         access_token=create_access_token(str(user.id), [user.role.value]),
-        refresh_token=create_refresh_token(str(user.id)),
+        refresh_token=RefreshTokenService(db).issue(user.id),
     )
-    refresh = RefreshToken(user_id=user.id, token=tokens.refresh_token)
-    db.add(refresh)
     await db.commit()
     return LoginResponse(user=UserRead.model_validate(user), tokens=tokens)
 
 
 @router.post("/refresh", response_model=TokenPair)
 async def refresh(payload: RefreshRequest, db: AsyncSession = Depends(get_db)) -> TokenPair:
-    stmt = select(RefreshToken).where(RefreshToken.token == payload.refresh_token)
-    result = await db.execute(stmt)
-    refresh_token = result.scalar_one_or_none()
-    if not refresh_token or refresh_token.revoked:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh inválido")
-
-    user = await db.get(User, refresh_token.user_id)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
-
-    return TokenPair(
-        access_token=create_access_token(str(user.id), [user.role.value]),
-        refresh_token=create_refresh_token(str(user.id)),
-    )
+    user, refresh_token = await RefreshTokenService(db).rotate(payload.refresh_token)
+    return TokenPair(access_token=create_access_token(str(user.id), [user.role.value]), refresh_token=refresh_token)
 
 
 @router.get("/me", response_model=UserRead)
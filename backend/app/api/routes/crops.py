@@ -1,4 +1,10 @@
+import json
+from typing import Iterator
+
+import numpy as np
+import pyarrow as pa
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db
@@ -8,11 +14,33 @@ from app.schemas import (
     SimulationCompareRequest,
     SimulationRequest,
     SimulationResult,
+    SimulationSweepRequest,
 )
 from app.services.crops import CropService
 
 router = APIRouter()
 
+SWEEP_CHUNK_SIZE = 65_536
+ARROW_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+
+def _ndjson_chunks(columns: dict[str, np.ndarray]) -> Iterator[bytes]:
+    """Uma linha JSON por bloco, cada uma com as colunas do bloco (formato colunar)."""
+    cells = len(next(iter(columns.values())))
+    yield (json.dumps({"cells": cells, "columns": list(columns)}) + "\n").encode()
+    for start in range(0, cells, SWEEP_CHUNK_SIZE):
+        chunk = {name: values[start : start + SWEEP_CHUNK_SIZE].tolist() for name, values in columns.items()}
+        yield (json.dumps(chunk) + "\n").encode()
+
+
+def _arrow_chunks(columns: dict[str, np.ndarray]) -> Iterator[bytes]:
+    """Stream Arrow IPC: schema, um record batch por bloco e marcador de fim."""
+    batch = pa.record_batch(columns)
+    yield batch.schema.serialize().to_pybytes()
+    for start in range(0, batch.num_rows, SWEEP_CHUNK_SIZE):
+        yield batch.slice(start, SWEEP_CHUNK_SIZE).serialize().to_pybytes()
+    yield ARROW_EOS
+
 
 @router.get("/season", response_model=list[SeasonSchema])
 async def list_seasons(db: AsyncSession = Depends(get_db)) -> list[SeasonSchema]:
@@ -36,3 +64,11 @@ async def run_simulation(payload: SimulationRequest, db: AsyncSession = Depends(
 async def compare_simulations(payload: SimulationCompareRequest, db: AsyncSession = Depends(get_db)) -> list[SimulationResult]:
     service = CropService(db)
     return await service.compare(payload)
+
+
+@router.post("/simulation/sweep")
+async def sweep_simulations(payload: SimulationSweepRequest, db: AsyncSession = Depends(get_db)) -> StreamingResponse:
+    columns = await CropService(db).sweep(payload)
+    if payload.format == "arrow":
+        return StreamingResponse(_arrow_chunks(columns), media_type="application/vnd.apache.arrow.stream")
+    return StreamingResponse(_ndjson_chunks(columns), media_type="application/x-ndjson")
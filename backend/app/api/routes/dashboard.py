@@ -1,10 +1,12 @@
-from datetime import datetime
+from datetime import date, datetime
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db
 from app.models import Field, Season, CropProductivity
+from app.schemas import RainfallMonth, RainfallStatsResponse
+from app.services.weather import WeatherService
 
 router = APIRouter()
 
@@ -74,3 +76,20 @@ async def get_kpis(
     }
 
 
+@router.get("/rainfall")
+async def get_rainfall(
+    station: str = Query(...),
+    date_from: date | None = Query(None),
+    date_to: date | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+) -> dict:
+    """
+    Totais de chuva do período e série mensal, servidos pelos rollups climáticos.
+    """
+    service = WeatherService(db)
+    stats = await service.get_rainfall_stats(station, date_from, date_to)
+    monthly = await service.get_rainfall_monthly(station, date_from, date_to)
+    return {
+        "stats": RainfallStatsResponse(station_code=station, start=date_from, end=date_to, **stats),
+        "monthly": [RainfallMonth(month=month, rainfall_mm=round(total, 1), rainy_days=days) for month, total, days in monthly],
+    }
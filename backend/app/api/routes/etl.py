@@ -1,9 +1,14 @@
+import asyncio
 from pathlib import Path
 
-from fastapi import APIRouter, File, UploadFile
+from fastapi import APIRouter, Depends, File, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_db
 from app.core.config import get_settings
-from app.schemas import ETLJobResponse, UploadMapping
+from app.schemas import ETLJobResponse, ETLLoadRequest, ETLLoadResponse, UploadMapping
 from app.services.etl import ETLService
+from app.services.etl_load import ETLLoadService
 
 router = APIRouter()
 settings = get_settings()
@@ -18,10 +23,15 @@ async def upload(file: UploadFile = File(...)) -> ETLJobResponse:
 
 @router.post("/normalize/rainfall")
 async def normalize_rainfall(file_path: str) -> dict[str, str]:
-    out = etl_service.normalize_rainfall(Path(file_path))
+    out = await asyncio.to_thread(etl_service.normalize_rainfall, Path(file_path))
     return {"normalized_file": str(out)}
 
 
 @router.post("/preview")
 async def preview(mapping: UploadMapping) -> dict:
-    return etl_service.preview_mapping(mapping)
+    return await asyncio.to_thread(etl_service.preview_mapping, mapping)
+
+
+@router.post("/load", response_model=ETLLoadResponse)
+async def load(payload: ETLLoadRequest, db: AsyncSession = Depends(get_db)) -> ETLLoadResponse:
+    return await ETLLoadService(db, etl_service).load(payload.file_path, payload.target)
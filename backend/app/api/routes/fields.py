@@ -1,17 +1,115 @@
-from fastapi import APIRouter, Depends
+from typing import Literal
+
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Path, Query, Request, Response, UploadFile, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
-from app.models import User
-from app.schemas import FieldLayerSchema, FieldSchema
-from app.services.fields import FieldService
+from app.models import User, UserRole
+from app.models.field import NEAREST_STATIONS
+from app.schemas import FieldImportResponse, FieldLayerSchema, FieldSchema, NearestStationResponse, ZonalStatsRequest
+from app.services.field_import import FieldImportService
+from app.services.fields import DEFAULT_PAGE_SIZE, MAX_NEAREST_STATIONS, MAX_PAGE_SIZE, FieldService
+from app.services.tiles import MAX_TILE_ZOOM, FieldTileService, tile_version
+from app.services.zonal import resolve_raster_path
+from app.tasks.fields import compute_zonal_stats
 
 router = APIRouter()
 
 
+def _bbox(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat (SIRGAS 2000)"),
+) -> tuple[float, float, float, float]:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        min_lon = min_lat = max_lon = max_lat = None
+    if min_lon is None or not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="bbox inválido: use min_lon,min_lat,max_lon,max_lat",
+        )
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _with_cursor(response: Response, page: tuple[list[FieldSchema], int | None]) -> list[FieldSchema]:
+    fields, next_cursor = page
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return fields
+
+
 @router.get("", response_model=list[FieldSchema])
-async def list_fields(db: AsyncSession = Depends(deps.get_db)) -> list[FieldSchema]:
-    return await FieldService(db).list_fields()
+async def list_fields(
+    response: Response,
+    after_id: int | None = Query(None, description="Cursor: id do último talhão da página anterior (X-Next-Cursor)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    output: Literal["json", "geojson"] = Query(
+        "json", alias="format", description="geojson: FeatureCollection serializada pelo PostGIS"
+    ),
+    db: AsyncSession = Depends(deps.get_db),
+) -> list[FieldSchema] | Response:
+    service = FieldService(db)
+    if output == "geojson":
+        body, next_cursor = await service.list_fields_geojson(after_id, limit)
+        headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else None
+        return Response(content=body, media_type="application/geo+json", headers=headers)
+    return _with_cursor(response, await service.list_fields(after_id, limit))
+
+
+@router.get("/within", response_model=list[FieldSchema], summary="Talhões que intersectam um bbox")
+async def fields_in_bbox(
+    response: Response,
+    bbox: tuple[float, float, float, float] = Depends(_bbox),
+    after_id: int | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(deps.get_db),
+) -> list[FieldSchema]:
+    return _with_cursor(response, await FieldService(db).fields_in_bbox(bbox, after_id, limit))
+
+
+@router.post("/within", response_model=list[FieldSchema], summary="Talhões que intersectam uma geometria GeoJSON")
+async def fields_intersecting(
+    response: Response,
+    geometry: dict = Body(..., description="Geometria GeoJSON (ex.: Polygon)"),
+    after_id: int | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(deps.get_db),
+) -> list[FieldSchema]:
+    return _with_cursor(response, await FieldService(db).fields_intersecting(geometry, after_id, limit))
+
+
+@router.get("/{field_id}/stations", response_model=list[NearestStationResponse])
+async def nearest_stations(
+    field_id: int,
+    k: int = Query(NEAREST_STATIONS, ge=1, le=MAX_NEAREST_STATIONS),
+    db: AsyncSession = Depends(deps.get_db),
+) -> list[NearestStationResponse]:
+    return await FieldService(db).nearest_stations(field_id, k)
+
+
+@router.get(
+    "/tiles/{z}/{x}/{y}.mvt",
+    response_class=Response,
+    responses={200: {"content": {"application/vnd.mapbox-vector-tile": {}}}, 204: {"description": "Tile vazio"}},
+    summary="Vector tile (MVT) dos talhões",
+)
+async def field_tile(
+    request: Request,
+    z: int = Path(ge=0, le=MAX_TILE_ZOOM),
+    x: int = Path(ge=0),
+    y: int = Path(ge=0),
+    db: AsyncSession = Depends(deps.get_db),
+) -> Response:
+    version = await tile_version()
+    headers = {"Cache-Control": "public, max-age=60"}
+    if version is not None:
+        headers["ETag"] = f'"fields-{version}-{z}-{x}-{y}"'
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+    tile = await FieldTileService(db).get(z, x, y, version)
+    if not tile:
+        return Response(status_code=204, headers=headers)
+    return Response(content=tile, media_type="application/vnd.mapbox-vector-tile", headers=headers)
 
 
 @router.post("", response_model=FieldSchema)
@@ -23,6 +121,31 @@ async def create_field(
     return await FieldService(db).create(payload, current_user.id)
 
 
+@router.post("/import", response_model=FieldImportResponse, summary="Importação em lote de uma FeatureCollection GeoJSON")
+async def import_fields(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> FieldImportResponse:
+    return await FieldImportService(db).import_geojson(file.file, current_user.id)
+
+
+@router.post("/layers/zonal", status_code=status.HTTP_202_ACCEPTED, summary="Estatísticas zonais de um raster")
+async def zonal_stats(
+    payload: ZonalStatsRequest,
+    _user: User = Depends(deps.require_roles(UserRole.gestor, UserRole.agronomo)),
+) -> dict[str, str]:
+    """Agenda no worker o cálculo das estatísticas do raster por talhão (grava em ``FieldLayer.stats``).
+
+    ``raster_path`` é relativo a ``RASTER_STORAGE_DIR``; caminhos fora dela são recusados.
+    """
+    raster_path = resolve_raster_path(payload.raster_path)
+    task = compute_zonal_stats.delay(
+        str(raster_path), payload.layer_type, payload.field_ids, payload.band, payload.raster_url
+    )
+    return {"task_id": task.id}
+
+
 @router.post("/{field_id}/layers", response_model=FieldLayerSchema)
 async def add_layer(field_id: int, payload: FieldLayerSchema, db: AsyncSession = Depends(deps.get_db)) -> FieldLayerSchema:
     return await FieldService(db).add_layer(field_id, payload)
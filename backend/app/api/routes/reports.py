@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db
@@ -9,10 +9,19 @@ router = APIRouter()
 
 
 @router.post("", response_model=ReportStatus)
-async def create_report(payload: ReportRequest, db: AsyncSession = Depends(get_db)) -> ReportStatus:
-    return await ReportService(db).enqueue(payload)
+async def create_report(
+    payload: ReportRequest,
+    idempotency_key: str | None = Header(default=None, min_length=1, max_length=128),
+    db: AsyncSession = Depends(get_db),
+) -> ReportStatus:
+    return await ReportService(db).enqueue(payload, idempotency_key)
 
 
 @router.get("", response_model=list[ReportStatus])
 async def list_reports(db: AsyncSession = Depends(get_db)) -> list[ReportStatus]:
     return await ReportService(db).list_jobs()
+
+
+@router.get("/{job_id}", response_model=ReportStatus)
+async def get_report(job_id: int, db: AsyncSession = Depends(get_db)) -> ReportStatus:
+    return await ReportService(db).get_job(job_id)
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db
-from app.schemas import ForecastResponse, HistoryResponse, StationResponse
-from app.services.weather import WeatherService
+from app.schemas import ForecastResponse, HistoryResponse, RainfallStatsResponse, StationResponse
+from app.services.weather import MAX_BATCH_STATIONS, WeatherService
 
 router = APIRouter()
 
 
+def _station_codes(
+    stations: list[str] = Query(..., description="Códigos de estação (repetidos ou separados por vírgula)"),
+) -> list[str]:
+    codes = list(dict.fromkeys(code.strip() for value in stations for code in value.split(",") if code.strip()))
+    if not codes or len(codes) > MAX_BATCH_STATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Informe entre 1 e {MAX_BATCH_STATIONS} estações",
+        )
+    return codes
+
+
 @router.get("/stations", response_model=list[StationResponse])
 async def stations(db: AsyncSession = Depends(get_db)) -> list[StationResponse]:
     service = WeatherService(db)
@@ -17,13 +31,44 @@ async def stations(db: AsyncSession = Depends(get_db)) -> list[StationResponse]:
 @router.get("/forecast", response_model=ForecastResponse)
 async def forecast(station: str, db: AsyncSession = Depends(get_db)) -> ForecastResponse:
     service = WeatherService(db)
-    try:
-        return await service.get_forecast(station)
-    except Exception as exc:  # noqa: BLE001
-        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return await service.get_forecast(station)
+
+
+@router.get("/forecast/field/{field_id}", response_model=ForecastResponse)
+async def field_forecast(field_id: int, db: AsyncSession = Depends(get_db)) -> ForecastResponse:
+    service = WeatherService(db)
+    return await service.get_field_forecast(field_id)
 
 
 @router.get("/history", response_model=HistoryResponse)
 async def history(station: str, db: AsyncSession = Depends(get_db)) -> HistoryResponse:
     service = WeatherService(db)
     return await service.get_history(station)
+
+
+@router.get("/rainfall/stats", response_model=RainfallStatsResponse)
+async def rainfall_stats(
+    station: str,
+    start: date | None = None,
+    end: date | None = None,
+    db: AsyncSession = Depends(get_db),
+) -> RainfallStatsResponse:
+    service = WeatherService(db)
+    stats = await service.get_rainfall_stats(station, start, end)
+    return RainfallStatsResponse(station_code=station, start=start, end=end, **stats)
+
+
+@router.get("/forecast/batch", response_model=list[ForecastResponse])
+async def forecast_batch(
+    codes: list[str] = Depends(_station_codes), db: AsyncSession = Depends(get_db)
+) -> list[ForecastResponse]:
+    service = WeatherService(db)
+    return await service.get_forecasts(codes)
+
+
+@router.get("/history/batch", response_model=list[HistoryResponse])
+async def history_batch(
+    codes: list[str] = Depends(_station_codes), db: AsyncSession = Depends(get_db)
+) -> list[HistoryResponse]:
+    service = WeatherService(db)
+    return await service.get_histories(codes)
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+from redis.asyncio import Redis
+
+from app.core.metrics import CACHE_HITS, CACHE_MISSES
+
+logger = logging.getLogger(__name__)
+
+
+class TwoTierCache:
+    """Cache LRU em memória com TTL, apoiado por uma camada Redis compartilhada.
+
+    A camada local é consultada primeiro; faltas vão ao Redis em um único ``MGET``.
+    Valores precisam ser serializáveis em JSON. Falhas do Redis nunca propagam: o
+    cache apenas degrada para a camada local. Como a invalidação local só alcança o
+    processo atual, ``local_ttl`` deve ser curto em relação a ``redis_ttl``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        redis: Redis | None,
+        maxsize: int = 1024,
+        local_ttl: float = 60,
+        redis_ttl: int = 3600,
+    ):
+        self.name = name
+        self.redis = redis
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self._local: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def _redis_key(self, key: Hashable) -> str:
+        return f"cache:{self.name}:{key}"
+
+    def _get_local(self, key: Hashable) -> Any | None:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return value
+
+    def _set_local(self, key: Hashable, value: Any) -> None:
+        self._local[key] = (time.monotonic() + self.local_ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+
+    async def get_many(self, keys: Iterable[Hashable]) -> dict[Hashable, Any]:
+        found: dict[Hashable, Any] = {}
+        missing = []
+        for key in keys:
+            value = self._get_local(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if found:
+            CACHE_HITS.labels(self.name, "local").inc(len(found))
+        remote_hits = 0
+        if missing and self.redis is not None:
+            try:
+                raw = await self.redis.mget([self._redis_key(key) for key in missing])
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(f"Cache {self.name}: Redis indisponível na leitura: {exc}")
+                raw = [None] * len(missing)
+            for key, payload in zip(missing, raw):
+                if payload is not None:
+                    value = json.loads(payload)
+                    self._set_local(key, value)
+                    found[key] = value
+                    remote_hits += 1
+            if remote_hits:
+                CACHE_HITS.labels(self.name, "redis").inc(remote_hits)
+        if len(missing) > remote_hits:
+            CACHE_MISSES.labels(self.name).inc(len(missing) - remote_hits)
+        return found
+
+    async def set_many(self, values: dict[Hashable, Any]) -> None:
+        for key, value in values.items():
+            self._set_local(key, value)
+        if not values or self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    pipe.set(self._redis_key(key), json.dumps(value), ex=self.redis_ttl)
+                await pipe.execute()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Cache {self.name}: Redis indisponível na escrita: {exc}")
+
+    def invalidate_local(self, keys: Iterable[Hashable]) -> None:
+        for key in keys:
+            self._local.pop(key, None)
+
+    async def invalidate(self, keys: Iterable[Hashable]) -> None:
+        keys = list(keys)
+        self.invalidate_local(keys)
+        if not keys or self.redis is None:
+            return
+        try:
+            await self.redis.delete(*[self._redis_key(key) for key in keys])
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Cache {self.name}: Redis indisponível na invalidação: {exc}")
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+
+Fetcher = Callable[[], Awaitable[Any]]
+
+# Libera o lock só se ainda pertencer a quem o adquiriu (evita apagar o lock de outro worker).
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class StaleWhileRevalidateCache:
+    """Cache com TTL suave/rígido para valores caros de buscar (ex.: cotações externas).
+
+    Até ``soft_ttl`` o valor é fresco. Entre ``soft_ttl`` e ``hard_ttl`` ele é servido
+    imediatamente enquanto uma única tarefa em segundo plano o renova. Depois de
+    ``hard_ttl`` a chave expira no Redis e a próxima leitura precisa aguardar a busca.
+    Cada busca é single-flight: uma tarefa por chave no processo e um lock Redis
+    (``SET NX PX``) entre workers; quem não obtém o lock aguarda o valor publicado pelo
+    dono do lock. Os dois TTLs recebem jitter para que as chaves não expirem juntas.
+    Uma cópia local dos envelopes cobre indisponibilidades do Redis.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        redis: Redis | None,
+        soft_ttl: float,
+        hard_ttl: float,
+        jitter: float = 0.1,
+        lock_ttl: float = 10,
+        wait_timeout: float = 2,
+    ):
+        self.name = name
+        self.redis = redis
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.jitter = jitter
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self._local: dict[str, dict] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._background: set[asyncio.Task] = set()
+
+    def _redis_key(self, key: str) -> str:
+        return f"swr:{self.name}:{key}"
+
+    def _lock_key(self, key: str) -> str:
+        return f"lock:{self.name}:{key}"
+
+    def _jittered(self, ttl: float) -> float:
+        return ttl * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _envelope(self, value: Any) -> dict:
+        now = time.time()
+        return {
+            "value": value,
+            "fresh_until": now + self._jittered(self.soft_ttl),
+            "expires_at": now + self._jittered(self.hard_ttl),
+        }
+
+    async def _read(self, keys: list[str]) -> dict[str, dict]:
+        envelopes = {key: self._local[key] for key in keys if key in self._local}
+        if self.redis is not None:
+            try:
+                raw = await self.redis.mget([self._redis_key(key) for key in keys])
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(f"Cache {self.name}: Redis indisponível na leitura: {exc}")
+            else:
+                for key, payload in zip(keys, raw):
+                    if payload is not None:
+                        envelopes[key] = self._local[key] = json.loads(payload)
+        now = time.time()
+        return {key: envelope for key, envelope in envelopes.items() if envelope["expires_at"] > now}
+
+    async def _store(self, key: str, value: Any) -> None:
+        envelope = self._local[key] = self._envelope(value)
+        if self.redis is None:
+            return
+        ttl_ms = max(int((envelope["expires_at"] - time.time()) * 1000), 1)
+        try:
+            await self.redis.set(self._redis_key(key), json.dumps(envelope), px=ttl_ms)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Cache {self.name}: Redis indisponível na escrita: {exc}")
+
+    async def _acquire(self, key: str) -> str | None | bool:
+        """Token do lock, ``False`` se outro worker o detém ou ``None`` sem Redis (segue sem lock)."""
+        if self.redis is None:
+            return None
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis.set(self._lock_key(key), token, nx=True, px=int(self.lock_ttl * 1000))
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Cache {self.name}: Redis indisponível no lock: {exc}")
+            return None
+        return token if acquired else False
+
+    async def _release(self, key: str, token: str) -> None:
+        try:
+            await self.redis.eval(_RELEASE_LOCK, 1, self._lock_key(key), token)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Cache {self.name}: falha ao liberar lock: {exc}")
+
+    async def _wait_for_peer(self, key: str, since: float) -> dict | None:
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            envelope = (await self._read([key])).get(key)
+            if envelope is not None and envelope["fresh_until"] > since:
+                return envelope
+        return None
+
+    async def _fetch(self, key: str, fetcher: Fetcher, wait: bool) -> Any:
+        started = time.time()
+        token = await self._acquire(key)
+        if token is False:
+            if not wait:
+                return None
+            envelope = await self._wait_for_peer(key, started)
+            if envelope is not None:
+                return envelope["value"]
+            # O dono do lock não publicou a tempo: busca por conta própria.
+        try:
+            CACHE_MISSES.labels(self.name).inc()
+            value = await fetcher()
+            if value is not None:
+                await self._store(key, value)
+            return value
+        finally:
+            if token:
+                await self._release(key, token)
+
+    def _single_flight(self, key: str, fetcher: Fetcher, wait: bool = True) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, fetcher, wait))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    def _revalidate(self, key: str, fetcher: Fetcher) -> None:
+        if key in self._inflight:
+            return
+        task = self._single_flight(key, fetcher, wait=False)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get_many(self, fetchers: dict[str, Fetcher]) -> dict[str, Any]:
+        """Um ``MGET`` para todas as chaves; só chaves sem valor utilizável aguardam a fonte."""
+        keys = list(fetchers)
+        envelopes = await self._read(keys)
+        now = time.time()
+        values: dict[str, Any] = {}
+        missing = []
+        for key in keys:
+            envelope = envelopes.get(key)
+            if envelope is None:
+                missing.append(key)
+                continue
+            values[key] = envelope["value"]
+            if envelope["fresh_until"] <= now:
+                CACHE_HITS.labels(self.name, "stale").inc()
+                self._revalidate(key, fetchers[key])
+            else:
+                CACHE_HITS.labels(self.name, "fresh").inc()
+        if missing:
+            tasks = [self._single_flight(key, fetchers[key]) for key in missing]
+            fetched = await asyncio.gather(*(asyncio.shield(task) for task in tasks), return_exceptions=True)
+            for key, value in zip(missing, fetched):
+                if isinstance(value, Exception):
+                    logger.warning(f"Cache {self.name}: falha ao buscar {key}: {value}")
+                elif value is not None:
+                    values[key] = value
+        return values
+
+    async def refresh(self, fetchers: dict[str, Fetcher]) -> dict[str, Any]:
+        """Força a renovação (ainda single-flight) e devolve os valores obtidos."""
+        keys = list(fetchers)
+        tasks = [self._single_flight(key, fetchers[key]) for key in keys]
+        fetched = await asyncio.gather(*(asyncio.shield(task) for task in tasks), return_exceptions=True)
+        return {key: value for key, value in zip(keys, fetched) if value is not None and not isinstance(value, Exception)}
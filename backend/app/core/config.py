@@ -30,9 +30,55 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_minutes: int = 60 * 24 * 7
+    refresh_token_prune_seconds: int = 3600
+    refresh_token_prune_batch: int = 5000
+
+    password_bcrypt_rounds: int = 12
+    # Reaplica o hash no login quando o custo configurado aumentou.
+    password_rehash_on_login: bool = True
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 256
 
     otlp_endpoint: str = "http://localhost:4317"
     rate_limit_per_minute: int = 120
+    # Multiplicador do limite por papel do JWT (anônimos e papéis ausentes usam 1).
+    rate_limit_role_factors: dict[str, float] = {"gestor": 4.0, "agronomo": 2.0, "produtor": 2.0, "visualizador": 1.0}
+    # Limites dedicados (req/min, antes do multiplicador) por endpoint "<módulo>.<função>".
+    rate_limit_routes: dict[str, int] = {
+        "auth.login": 10,
+        "auth.register": 5,
+        "crops.sweep_simulations": 10,
+        "etl.upload": 20,
+        "etl.load": 5,
+        "fields.import_fields": 5,
+        "fields.zonal_stats": 5,
+        "prices.refresh_prices": 2,
+    }
+    # Tokens reservados por chamada ao Redis e mantidos em memória por worker.
+    rate_limit_block_size: int = 10
+    rate_limit_redis_timeout: float = 0.2
+    # Falhas seguidas do Redis que abrem o circuito e por quantos segundos ele fica aberto.
+    rate_limit_breaker_failures: int = 3
+    rate_limit_breaker_cooldown: int = 30
+    price_poll_seconds: int = 300
+    # Atributos de FieldLayer.stats incluídos nos vector tiles (camada mais recente de cada tipo).
+    field_tile_stats: dict[str, list[str]] = {"ndvi": ["avg"], "produtividade": ["avg"], "solo": ["avg"]}
+    field_tile_cache_ttl: int = 60 * 60 * 24
+    # Estatísticas zonais de rasters (FieldLayer.stats): processos paralelos e resumo calculado.
+    zonal_workers: int = 4
+    zonal_percentiles: list[float] = [10, 25, 50, 75, 90]
+    zonal_histogram_bins: int = 10
+    # Raiz dos rasters aceitos pela API/worker de estatísticas zonais (caminhos fora dela são recusados).
+    raster_storage_dir: str = "storage/rasters"
+    # Relatórios em fila Celery dedicada: a concorrência é a do worker que a consome
+    # (``-Q reports -c N``). Falhas são repetidas com backoff exponencial (s) e uma
+    # execução que passa de ``report_time_limit`` (s) é interrompida e pode ser retomada.
+    report_queue: str = "reports"
+    report_max_retries: int = 3
+    report_retry_backoff: int = 10
+    report_time_limit: int = 300
+    # Porta das métricas Prometheus dos workers Celery (None desativa).
+    worker_metrics_port: int | None = 9808
 
     default_locale: str = "pt-BR"
 
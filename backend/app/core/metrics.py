@@ -0,0 +1,27 @@
+"""Métricas Prometheus da aplicação, expostas em ``/metrics`` pelo Instrumentator.
+
+Nos workers Celery (ex.: ``siad_report_*``) são servidas em ``WORKER_METRICS_PORT``.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+CACHE_HITS = Counter("siad_cache_hits_total", "Acertos de cache por camada", ["cache", "tier"])
+CACHE_MISSES = Counter("siad_cache_misses_total", "Faltas de cache (consulta à fonte)", ["cache"])
+RATE_LIMIT_DECISIONS = Counter(
+    "siad_rate_limit_decisions_total",
+    "Decisões do rate limiter por camada (local, redis, fallback)",
+    ["tier", "outcome"],
+)
+PASSWORD_HASH_PENDING = Gauge("siad_password_hash_pending", "Operações bcrypt em execução ou na fila")
+PASSWORD_HASH_REJECTED = Counter("siad_password_hash_rejected_total", "Operações bcrypt recusadas por fila cheia")
+PASSWORD_HASH_QUEUE_SECONDS = Histogram(
+    "siad_password_hash_queue_seconds", "Espera na fila do pool de bcrypt", ["operation"]
+)
+PASSWORD_HASH_SECONDS = Histogram("siad_password_hash_seconds", "Duração do cálculo bcrypt", ["operation"])
+REPORT_QUEUE_DEPTH = Gauge("siad_report_queue_depth", "Relatórios aguardando na fila do broker")
+REPORT_RENDER_SECONDS = Histogram(
+    "siad_report_render_seconds",
+    "Duração da geração de relatórios",
+    ["report_type"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+REPORT_JOBS = Counter("siad_report_jobs_total", "Execuções de relatórios por resultado", ["outcome"])
@@ -1,43 +1,210 @@
+import asyncio
 import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Iterable
+
 from fastapi import HTTPException, status
-from redis.asyncio import Redis
-from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import RedisError
 
 from app.core.config import get_settings
+from app.core.metrics import RATE_LIMIT_DECISIONS
+from app.core.redis import redis_client
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# Cria conexão Redis com timeout curto para não bloquear
-redis: Redis | None = Redis.from_url(
-    settings.redis_url,
-    decode_responses=True,
-    socket_connect_timeout=1,
-    socket_timeout=1,
-    retry_on_timeout=False,
-    health_check_interval=30
-)
+RATE_PERIOD_MS = 60_000
+LOCAL_BUCKETS_MAX = 10_000
 
+# GCRA (generic cell rate algorithm) sobre vários buckets em uma única chamada atômica.
+# Cada bucket guarda apenas o "theoretical arrival time" (TAT) em ms. O script concede
+# até ARGV[1] tokens de uma vez (o maior bloco que todos os buckets permitem); se nem
+# um token couber, nada é gravado e devolve o tempo de espera.
+# KEYS[i]: bucket; ARGV[2i]: intervalo de emissão (ms); ARGV[2i+1]: rajada (= limite).
+GCRA_SCRIPT = """
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local grant = tonumber(ARGV[1])
+local tats = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local tat = math.max(tonumber(redis.call("GET", key)) or now, now)
+    local available = math.floor((now + interval * burst - tat) / interval)
+    if available < 1 then
+        retry_after = math.max(retry_after, tat + interval - interval * burst - now)
+    end
+    grant = math.min(grant, available)
+    tats[i] = tat
+end
+if grant < 1 then
+    return {0, math.max(retry_after, 1)}
+end
+for i, key in ipairs(KEYS) do
+    local new_tat = tats[i] + tonumber(ARGV[i * 2]) * grant
+    redis.call("SET", key, new_tat, "PX", new_tat - now)
+end
+return {grant, 0}
+"""
 
-async def enforce(identifier: str, limit: int = 120, ttl: int = 60) -> None:
-    """
-    Enforce rate limiting. Se Redis não estiver disponível, permite todas as requisições.
-    Em desenvolvimento, rate limiting é opcional.
+# register_script usa EVALSHA (um round trip) e recarrega o script se o Redis o perder.
+_gcra = redis_client.register_script(GCRA_SCRIPT)
+
+Rule = tuple[str, int]
+
+
+class CircuitBreaker:
+    """Abre após ``failures`` erros seguidos e deixa uma tentativa passar a cada ``cooldown`` segundos."""
+
+    def __init__(self, failures: int, cooldown: float):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._retry_at = 0.0
+
+    @property
+    def open(self) -> bool:
+        return self._consecutive >= self.failures
+
+    def allow(self) -> bool:
+        if not self.open:
+            return True
+        now = time.monotonic()
+        if now < self._retry_at:
+            return False
+        # Meia-abertura: só esta requisição testa o Redis; as demais esperam o próximo ciclo.
+        self._retry_at = now + self.cooldown
+        return True
+
+    def success(self) -> None:
+        self._consecutive = 0
+
+    def failure(self) -> bool:
+        """Registra a falha; retorna True quando o circuito acaba de abrir."""
+        was_open = self.open
+        self._consecutive += 1
+        if self.open:
+            self._retry_at = time.monotonic() + self.cooldown
+        return self.open and not was_open
+
+
+class _Bucket:
+    __slots__ = ("tokens", "expires_at", "blocked_until")
+
+    def __init__(self):
+        self.tokens = 0
+        self.expires_at = 0.0
+        self.blocked_until = 0.0
+
+
+# Tokens reservados no Redis por este processo, por conjunto de buckets (LRU limitado).
+_buckets: OrderedDict[tuple[str, ...], _Bucket] = OrderedDict()
+# TATs locais usados apenas enquanto o circuito do Redis está aberto.
+_fallback_tats: OrderedDict[str, float] = OrderedDict()
+_breaker = CircuitBreaker(settings.rate_limit_breaker_failures, settings.rate_limit_breaker_cooldown)
+
+
+def limits_for(principal: str, roles: Iterable[str], route: str | None) -> list[Rule]:
+    """Buckets aplicáveis: limite global do principal e, se configurado, o da rota.
+
+    O limite base é ``rate_limit_per_minute``; papéis o multiplicam conforme
+    ``rate_limit_role_factors`` (anônimos e papéis desconhecidos usam 1).
     """
-    if not redis:
+    factor = max((settings.rate_limit_role_factors.get(role, 1.0) for role in roles), default=1.0)
+    rules = [(f"rate:{principal}", max(int(settings.rate_limit_per_minute * factor), 1))]
+    route_limit = settings.rate_limit_routes.get(route) if route else None
+    if route_limit:
+        rules.append((f"rate:{principal}:{route}", max(int(route_limit * factor), 1)))
+    return rules
+
+
+def _interval(limit: int) -> int:
+    return max(RATE_PERIOD_MS // limit, 1)
+
+
+def _block_size(rules: list[Rule]) -> int:
+    # Blocos pequenos para limites baixos: cada worker retém no máximo ~10% da cota.
+    return max(min(settings.rate_limit_block_size, min(limit for _, limit in rules) // 10), 1)
+
+
+def _remember(key: tuple[str, ...]) -> _Bucket:
+    bucket = _buckets.get(key)
+    if bucket is None:
+        bucket = _buckets[key] = _Bucket()
+        if len(_buckets) > LOCAL_BUCKETS_MAX:
+            _buckets.popitem(last=False)
+    else:
+        _buckets.move_to_end(key)
+    return bucket
+
+
+def _reject(tier: str, retry_after: float) -> None:
+    RATE_LIMIT_DECISIONS.labels(tier, "denied").inc()
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Limite de requisições excedido",
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+    )
+
+
+def _enforce_locally(rules: list[Rule]) -> None:
+    """Mesmo GCRA, em memória e por worker, enquanto o Redis está indisponível."""
+    now = time.monotonic() * 1000
+    tats = [max(_fallback_tats.get(key, now), now) for key, _ in rules]
+    retry_after = max(
+        (tat + _interval(limit) * (1 - limit) - now for tat, (_, limit) in zip(tats, rules)),
+        default=0,
+    )
+    if retry_after > 0:
+        _reject("fallback", retry_after / 1000)
+    for tat, (key, limit) in zip(tats, rules):
+        _fallback_tats[key] = tat + _interval(limit)
+        _fallback_tats.move_to_end(key)
+    while len(_fallback_tats) > LOCAL_BUCKETS_MAX:
+        _fallback_tats.popitem(last=False)
+    RATE_LIMIT_DECISIONS.labels("fallback", "allowed").inc()
+
+
+async def enforce(rules: list[Rule]) -> None:
+    """Aplica os limites (req/min), consultando o Redis só quando o bloco local acaba."""
+    key = tuple(bucket_key for bucket_key, _ in rules)
+    now = time.monotonic()
+    bucket = _buckets.get(key)
+    if bucket is not None:
+        if bucket.blocked_until > now:
+            _reject("local", bucket.blocked_until - now)
+        if bucket.tokens > 0 and bucket.expires_at > now:
+            bucket.tokens -= 1
+            RATE_LIMIT_DECISIONS.labels("local", "allowed").inc()
+            return
+
+    if not _breaker.allow():
+        _enforce_locally(rules)
         return
-    
+    args = [_block_size(rules)]
+    for _, limit in rules:
+        args.extend((_interval(limit), limit))
     try:
-        key = f"rate:{identifier}"
-        count = await redis.incr(key)
-        if count == 1:
-            await redis.expire(key, ttl)
-        if count > limit:
-            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Limite de requisições excedido")
-    except (RedisConnectionError, OSError, Exception) as e:
-        # Se houver erro de conexão, loga mas permite a requisição (especialmente em desenvolvimento)
-        if settings.app_env == "development":
-            logger.debug(f"Redis não disponível para rate limiting: {e}. Permitindo requisição em desenvolvimento.")
-        else:
-            logger.warning(f"Erro ao conectar com Redis durante rate limiting: {e}. Permitindo requisição.")
-        # Não levanta exceção, permite que a requisição continue
+        granted, retry_after_ms = await asyncio.wait_for(
+            _gcra(keys=list(key), args=args), settings.rate_limit_redis_timeout
+        )
+    except (RedisError, OSError, asyncio.TimeoutError) as e:
+        if _breaker.failure():
+            logger.warning(
+                f"Redis indisponível para rate limiting ({e!r}); limites aplicados por worker "
+                f"por {settings.rate_limit_breaker_cooldown}s."
+            )
+        _enforce_locally(rules)
+        return
+    _breaker.success()
+
+    bucket = _remember(key)
+    if not granted:
+        bucket.blocked_until = now + retry_after_ms / 1000
+        _reject("redis", retry_after_ms / 1000)
+    bucket.tokens = int(granted) - 1
+    bucket.expires_at = now + RATE_PERIOD_MS / 1000
+    RATE_LIMIT_DECISIONS.labels("redis", "allowed").inc()
@@ -0,0 +1,12 @@
+from redis.asyncio import Redis
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Cliente assíncrono compartilhado (pool de conexões único por processo).
+# Timeouts curtos para que uma indisponibilidade do Redis não bloqueie as requisições.
+_OPTIONS = dict(socket_connect_timeout=1, socket_timeout=1, retry_on_timeout=False, health_check_interval=30)
+redis_client = Redis.from_url(settings.redis_url, decode_responses=True, **_OPTIONS)
+# Valores binários (ex.: vector tiles) não podem passar pela decodificação UTF-8.
+binary_redis_client = Redis.from_url(settings.redis_url, decode_responses=False, **_OPTIONS)
@@ -1,14 +1,28 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from typing import Any, Callable, Optional, TypeVar
 
 import jwt
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
 from .config import get_settings
+from .metrics import PASSWORD_HASH_PENDING, PASSWORD_HASH_QUEUE_SECONDS, PASSWORD_HASH_REJECTED, PASSWORD_HASH_SECONDS
 
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 settings = get_settings()
+# min_rounds = custo atual: hashes com custo menor são marcados por needs_update.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.password_bcrypt_rounds,
+    bcrypt__min_rounds=settings.password_bcrypt_rounds,
+)
+
+T = TypeVar("T")
 
 
 def create_token(data: dict[str, Any], expires_delta: timedelta, secret: str) -> str:
@@ -26,7 +40,13 @@ def create_access_token(subject: str, roles: list[str]) -> str:
 
 def create_refresh_token(subject: str) -> str:
     expires_delta = timedelta(minutes=settings.refresh_token_expire_minutes)
-    return create_token({"sub": subject, "type": "refresh"}, expires_delta, settings.jwt_refresh_secret)
+    # jti torna únicos os tokens emitidos no mesmo segundo para o mesmo usuário.
+    claims = {"sub": subject, "type": "refresh", "jti": uuid.uuid4().hex}
+    return create_token(claims, expires_delta, settings.jwt_refresh_secret)
+
+
+def hash_token(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -37,6 +57,56 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """Executa bcrypt em um pool de threads dedicado, fora do event loop.
+
+    bcrypt libera o GIL, então ``workers`` threads calculam hashes em paralelo sem travar
+    as demais requisições do worker. Acima de ``max_pending`` operações em andamento ou
+    na fila, novas chamadas recebem 503 em vez de aumentar a fila indefinidamente.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._pending = 0
+
+    async def _run(self, operation: str, fn: Callable[..., T], *args: Any) -> T:
+        if self._pending >= self.max_pending:
+            PASSWORD_HASH_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Serviço de autenticação sobrecarregado, tente novamente",
+                headers={"Retry-After": "1"},
+            )
+        queued_at = time.perf_counter()
+
+        def job() -> T:
+            started = time.perf_counter()
+            PASSWORD_HASH_QUEUE_SECONDS.labels(operation).observe(started - queued_at)
+            try:
+                return fn(*args)
+            finally:
+                PASSWORD_HASH_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+        self._pending += 1
+        PASSWORD_HASH_PENDING.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self._pending -= 1
+            PASSWORD_HASH_PENDING.dec()
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """Verifica a senha; se o hash estiver com custo desatualizado, devolve também o novo hash."""
+        return await self._run("verify", pwd_context.verify_and_update, password, hashed_password)
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_max_pending)
+
+
 def decode_token(token: str, refresh: bool = False) -> Optional[dict[str, Any]]:
     secret = settings.jwt_refresh_secret if refresh else settings.jwt_secret
     try:
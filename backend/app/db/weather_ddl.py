@@ -0,0 +1,120 @@
+"""DDL de ``weather_history`` fora do alcance do ORM: partições anuais, índice único e rollups.
+
+Usado apenas pelo caminho ``create_all`` (eventos ``after_create`` em ``app.models.weather``).
+As migrações 0002 (partições) e 0003 (rollups) guardam cópias congeladas destas instruções e
+não importam este módulo; mudanças aqui exigem uma nova migração que aplique a diferença em
+bancos existentes.
+"""
+
+# Índice único (station_id, reading_date DESC): atende get_history (filtro por estação,
+# ordenação decrescente por data) e serve de alvo para ON CONFLICT nas cargas.
+UNIQUE_INDEX = "CREATE UNIQUE INDEX uq_weather_history_station_date ON weather_history (station_id, reading_date DESC)"
+
+DEFAULT_PARTITION = "CREATE TABLE weather_history_default PARTITION OF weather_history DEFAULT"
+
+# Cria (se necessário) a partição anual, movendo para ela as linhas que tenham caído
+# na partição default. O advisory lock serializa cargas concorrentes.
+ENSURE_PARTITION_FN = """
+CREATE OR REPLACE FUNCTION weather_history_ensure_partition(p_year integer) RETURNS void AS $$
+DECLARE
+    part text := format('weather_history_y%s', p_year);
+    lo date := make_date(p_year, 1, 1);
+    hi date := make_date(p_year + 1, 1, 1);
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('weather_history_partitions'));
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE weather_history INCLUDING DEFAULTS)', part);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM weather_history_default WHERE reading_date >= %L AND reading_date < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved', lo, hi, part
+    );
+    EXECUTE format(
+        'ALTER TABLE weather_history ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', part, lo, hi
+    );
+END
+$$ LANGUAGE plpgsql
+"""
+
+ENSURE_PARTITIONS_FN = """
+CREATE OR REPLACE FUNCTION weather_history_ensure_partitions(p_from date, p_to date) RETURNS void AS $$
+BEGIN
+    IF p_from IS NULL OR p_to IS NULL THEN
+        RETURN;
+    END IF;
+    FOR y IN extract(year FROM p_from)::integer..extract(year FROM p_to)::integer LOOP
+        PERFORM weather_history_ensure_partition(y);
+    END LOOP;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# Manutenção incremental dos rollups: triggers por comando com tabelas de transição
+# aplicam deltas (+ linhas novas, - linhas antigas) via upsert. Somar deltas, em vez de
+# recalcular o bucket, mantém o resultado correto com escritas concorrentes.
+ROLLUP_BUCKETS = {
+    "weather_rainfall_monthly": ("month", "date_trunc('month', reading_date)::date"),
+    "weather_rainfall_seasonal": (
+        "season_start",
+        "make_date(extract(year FROM reading_date - interval '6 months')::integer, 7, 1)",
+    ),
+}
+ROLLUP_SOURCES = {
+    "insert": "SELECT station_id, reading_date, rainfall_mm, 1 AS sign FROM new_rows",
+    "delete": "SELECT station_id, reading_date, rainfall_mm, -1 AS sign FROM old_rows",
+    "update": (
+        "SELECT station_id, reading_date, rainfall_mm, 1 AS sign FROM new_rows "
+        "UNION ALL SELECT station_id, reading_date, rainfall_mm, -1 FROM old_rows"
+    ),
+}
+_TRANSITION_TABLES = {
+    "insert": "NEW TABLE AS new_rows",
+    "delete": "OLD TABLE AS old_rows",
+    "update": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+}
+
+
+def rollup_upsert(table: str, source: str) -> str:
+    """Upsert de deltas em um rollup a partir de ``source`` (station_id, reading_date, rainfall_mm, sign)."""
+    bucket, expression = ROLLUP_BUCKETS[table]
+    return f"""
+        INSERT INTO {table} AS r (station_id, {bucket}, rainfall_sum, reading_count, rainy_days)
+        SELECT station_id, {expression}, sum(sign * rainfall_mm), sum(sign), coalesce(sum(sign) FILTER (WHERE rainfall_mm > 0), 0)
+        FROM ({source}) d
+        WHERE station_id IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (station_id, {bucket}) DO UPDATE
+        SET rainfall_sum = r.rainfall_sum + EXCLUDED.rainfall_sum,
+            reading_count = r.reading_count + EXCLUDED.reading_count,
+            rainy_days = r.rainy_days + EXCLUDED.rainy_days;
+    """
+
+
+def rainfall_rollup_ddl() -> list[str]:
+    """Funções e triggers por comando (insert/delete/update) que mantêm os rollups."""
+    statements = []
+    for operation, source in ROLLUP_SOURCES.items():
+        body = "".join(rollup_upsert(table, source) for table in ROLLUP_BUCKETS)
+        statements.append(
+            f"""
+            CREATE OR REPLACE FUNCTION weather_rainfall_on_{operation}() RETURNS trigger AS $$
+            BEGIN
+                {body}
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+        statements.append(
+            f"""
+            CREATE TRIGGER weather_rainfall_{operation} AFTER {operation.upper()} ON weather_history
+            REFERENCING {_TRANSITION_TABLES[operation]}
+            FOR EACH STATEMENT EXECUTE FUNCTION weather_rainfall_on_{operation}()
+            """
+        )
+    return statements
+
+
+# Estado criado junto com a tabela particionada (espelha a migração 0002).
+PARTITION_DDL = [UNIQUE_INDEX, DEFAULT_PARTITION, ENSURE_PARTITION_FN, ENSURE_PARTITIONS_FN]
@@ -1,19 +1,32 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_fastapi_instrumentator import Instrumentator
 
 from app.api.routes import api_router
+from app.core import metrics  # noqa: F401  (registra as métricas da aplicação no registry padrão)
 from app.core.config import get_settings
 from app.core.logging import setup_logging
 from app.core.telemetry import init_tracing
+from app.db.session import get_session
+from app.services.weather import warm_station_registry
 
 settings = get_settings()
 setup_logging()
 init_tracing()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    async with get_session() as db:
+        await warm_station_registry(db)
+    yield
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.app_name, version="0.1.0", debug=settings.debug)
+    app = FastAPI(title=settings.app_name, version="0.1.0", debug=settings.debug, lifespan=lifespan)
 
     origins = settings.backend_cors_origins if isinstance(settings.backend_cors_origins, list) else ["*"]
     app.add_middleware(
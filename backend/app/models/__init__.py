@@ -1,11 +1,20 @@
 from .user import AuditLog, RefreshToken, User, UserRole
-from .field import Field, FieldLayer, FieldSensor
-from .weather import WeatherForecast, WeatherHistory, WeatherStation, RadarSnapshot, ClimaticIndicator
+from .field import Field, FieldLayer, FieldSensor, FieldWeatherStation
+from .weather import (
+    ClimaticIndicator,
+    RadarSnapshot,
+    WeatherForecast,
+    WeatherHistory,
+    WeatherRainfallMonthly,
+    WeatherRainfallSeasonal,
+    WeatherStation,
+)
 from .crop import Season, CropProductivity, CropSimulation
 from .scenario import Scenario, ScenarioEvaluation
 from .soil import SoilSample, SoilLayerStat
 from .input_cost import InputItem, InputCostAnalysis
-from .report import ReportJob, ReportType
+from .report import ReportJob, ReportJobStatus, ReportType
+from .price import PriceQuote
 
 __all__ = [
     "User",
@@ -15,9 +24,12 @@ __all__ = [
     "Field",
     "FieldLayer",
     "FieldSensor",
+    "FieldWeatherStation",
     "WeatherStation",
     "WeatherHistory",
     "WeatherForecast",
+    "WeatherRainfallMonthly",
+    "WeatherRainfallSeasonal",
     "RadarSnapshot",
     "ClimaticIndicator",
     "Season",
@@ -30,5 +42,7 @@ __all__ = [
     "InputItem",
     "InputCostAnalysis",
     "ReportJob",
+    "ReportJobStatus",
     "ReportType",
+    "PriceQuote",
 ]
@@ -1,7 +1,7 @@
 from datetime import date, datetime
 
-from sqlalchemy import Float, ForeignKey, Integer, JSON, Numeric, String, TIMESTAMP
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Float, ForeignKey, Index, Integer, JSON, Numeric, String, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.session import Base
 
@@ -21,6 +21,8 @@ class Season(Base):
 
 class CropProductivity(Base):
     __tablename__ = "crop_productivity"
+    # Um registro de produtividade por safra: chave natural da carga em lote (ON CONFLICT).
+    __table_args__ = (Index("uq_crop_productivity_season", "season_id", unique=True),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     season_id: Mapped[int] = mapped_column(Integer, ForeignKey("seasons.id", ondelete="CASCADE"))
@@ -44,5 +46,3 @@ class CropSimulation(Base):
     expected_margin_per_ha: Mapped[float]
     payload: Mapped[dict | None] = mapped_column(JSON)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
-
-    season: Mapped[Season] = relationship(lazy="joined")
@@ -2,7 +2,7 @@ from datetime import datetime
 from enum import Enum
 
 from geoalchemy2 import Geometry
-from sqlalchemy import JSON, Float, ForeignKey, Integer, Numeric, String, TIMESTAMP
+from sqlalchemy import DDL, JSON, Float, ForeignKey, Integer, Numeric, SmallInteger, String, TIMESTAMP, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -36,7 +36,7 @@ class FieldLayer(Base):
     __tablename__ = "field_layers"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    field_id: Mapped[int] = mapped_column(Integer, ForeignKey("fields.id", ondelete="CASCADE"))
+    field_id: Mapped[int] = mapped_column(Integer, ForeignKey("fields.id", ondelete="CASCADE"), index=True)
     layer_type: Mapped[LayerType] = mapped_column(String(32), nullable=False)
     source: Mapped[str | None] = mapped_column(String(128))
     stats: Mapped[dict | None] = mapped_column(JSON)
@@ -56,3 +56,91 @@ class FieldSensor(Base):
     last_value: Mapped[float | None] = mapped_column(Numeric(10, 2))
     sensor_metadata: Mapped[dict | None] = mapped_column("metadata", JSON)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+
+
+# Fixado no SQL congelado da migração 0008: alterar exige uma nova migração.
+NEAREST_STATIONS = 3
+
+
+class FieldWeatherStation(Base):
+    """Estações mais próximas do centroide de cada talhão, mantidas por triggers."""
+
+    __tablename__ = "field_weather_stations"
+
+    field_id: Mapped[int] = mapped_column(Integer, ForeignKey("fields.id", ondelete="CASCADE"), primary_key=True)
+    rank: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    station_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("weather_stations.id", ondelete="CASCADE"), index=True
+    )
+    distance_m: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+# Recalcula o mapeamento dos talhões informados (NULL = todos) com KNN (<->) sobre o
+# índice GiST de weather_stations.location. Talhões são recalculados quando inseridos
+# ou quando a geometria muda; qualquer alteração de estação recalcula todos.
+# A migração 0008 é a dona deste DDL; esta lista é apenas a cópia usada pelo create_all
+# (seed) e precisa reproduzir o estado final das migrações. Qualquer mudança nas funções
+# ou triggers entra primeiro em uma nova migração e só então é espelhada aqui.
+FIELD_WEATHER_STATIONS_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION field_weather_stations_refresh(p_field_ids integer[]) RETURNS void AS $$
+    BEGIN
+        DELETE FROM field_weather_stations WHERE p_field_ids IS NULL OR field_id = ANY(p_field_ids);
+        INSERT INTO field_weather_stations (field_id, rank, station_id, distance_m)
+        SELECT f.id, row_number() OVER (PARTITION BY f.id ORDER BY s.distance_m, s.id), s.id, s.distance_m
+        FROM fields f
+        CROSS JOIN LATERAL (SELECT ST_Centroid(ST_Transform(f.geometry, 4326))::geography AS centroid) c
+        CROSS JOIN LATERAL (
+            SELECT ws.id, ST_Distance(ws.location, c.centroid) AS distance_m
+            FROM weather_stations ws
+            ORDER BY ws.location <-> c.centroid
+            LIMIT {NEAREST_STATIONS}
+        ) s
+        WHERE p_field_ids IS NULL OR f.id = ANY(p_field_ids)
+        ON CONFLICT (field_id, rank) DO UPDATE
+        SET station_id = EXCLUDED.station_id, distance_m = EXCLUDED.distance_m;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION fields_refresh_weather_stations() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM field_weather_stations_refresh(ARRAY(SELECT id FROM new_rows));
+        ELSE
+            PERFORM field_weather_stations_refresh(ARRAY(
+                SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.geometry IS DISTINCT FROM o.geometry
+            ));
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER fields_weather_stations_insert AFTER INSERT ON fields
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION fields_refresh_weather_stations()
+    """,
+    """
+    CREATE TRIGGER fields_weather_stations_update AFTER UPDATE ON fields
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION fields_refresh_weather_stations()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION weather_stations_refresh_fields() RETURNS trigger AS $$
+    BEGIN
+        PERFORM field_weather_stations_refresh(NULL);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER weather_stations_refresh_fields
+    AFTER INSERT OR DELETE OR UPDATE OF latitude, longitude ON weather_stations
+    FOR EACH STATEMENT EXECUTE FUNCTION weather_stations_refresh_fields()
+    """,
+]
+for statement in FIELD_WEATHER_STATIONS_DDL:
+    ddl = DDL(statement.replace("%", "%%")).execute_if(dialect="postgresql")
+    event.listen(FieldWeatherStation.__table__, "after_create", ddl)
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Float, Index, JSON, String, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class PriceQuote(Base):
+    """Cotação coletada pelo poller de preços (tabela somente de inserção)."""
+
+    __tablename__ = "price_quotes"
+    __table_args__ = (Index("ix_price_quotes_commodity_ts", "commodity", "ts"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    commodity: Mapped[str] = mapped_column(String(64))
+    ts: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+    price: Mapped[float] = mapped_column(Float)
+    unit: Mapped[str] = mapped_column(String(16))
+    source: Mapped[str] = mapped_column(String(128))
+    payload: Mapped[dict] = mapped_column(JSON)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import JSON, Enum as PgEnum, Integer, String, TIMESTAMP
+from sqlalchemy import JSON, Enum as PgEnum, Integer, String, Text, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.session import Base
@@ -15,13 +15,27 @@ class ReportType(str, Enum):
     mapas = "mapas"
 
 
+class ReportJobStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    finished = "finished"
+    failed = "failed"
+
+
 class ReportJob(Base):
     __tablename__ = "report_jobs"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     report_type: Mapped[ReportType] = mapped_column(PgEnum(ReportType, name="report_type"))
-    status: Mapped[str] = mapped_column(String(32), default="pending")
+    status: Mapped[str] = mapped_column(String(32), default=ReportJobStatus.pending.value)
     payload: Mapped[dict | None] = mapped_column(JSON)
+    # Chave enviada pelo cliente: reenvios do mesmo pedido devolvem o job existente.
+    idempotency_key: Mapped[str | None] = mapped_column(String(128), unique=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    error: Mapped[str | None] = mapped_column(Text)
     file_url: Mapped[str | None] = mapped_column(String(512))
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    # Última publicação de uma mensagem para o job (envio, nova tentativa ou republicação).
+    dispatched_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
+    started_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
     finished_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
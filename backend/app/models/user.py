@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import JSON, TIMESTAMP, Boolean, Enum as PgEnum, Integer, String, Text
+from sqlalchemy import JSON, TIMESTAMP, Boolean, Enum as PgEnum, Index, Integer, LargeBinary, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.session import Base
@@ -44,9 +44,14 @@ class AuditLog(Base):
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    # Só o SHA-256 do token é guardado; a busca é por igualdade, então um índice hash
+    # (custo constante, chave de 32 bytes) substitui o índice único sobre o JWT inteiro.
+    __table_args__ = (Index("ix_refresh_tokens_token_hash", "token_hash", postgresql_using="hash"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
-    token: Mapped[str] = mapped_column(Text, unique=True, nullable=False)
+    token_hash: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    # Revogar também antecipa expires_at, de modo que a limpeza filtra apenas por esta coluna.
+    expires_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False, index=True)
     revoked: Mapped[bool] = mapped_column(Boolean, default=False)
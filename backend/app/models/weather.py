@@ -1,8 +1,10 @@
 from datetime import date, datetime
 
-from sqlalchemy import Float, ForeignKey, Integer, JSON, Numeric, String, TIMESTAMP
+from geoalchemy2 import Geography
+from sqlalchemy import DDL, Computed, Float, ForeignKey, Index, Integer, JSON, Numeric, String, TIMESTAMP, event
 from sqlalchemy.orm import Mapped, mapped_column
 
+from app.db import weather_ddl
 from app.db.session import Base
 
 
@@ -15,23 +17,70 @@ class WeatherStation(Base):
     latitude: Mapped[float] = mapped_column(Float)
     longitude: Mapped[float] = mapped_column(Float)
     elevation: Mapped[float | None] = mapped_column(Float)
+    # Derivada de latitude/longitude; o GeoAlchemy2 cria o índice GiST (idx_weather_stations_location)
+    # usado pela ordenação KNN (<->) das estações mais próximas de cada talhão.
+    location: Mapped[str] = mapped_column(
+        Geography("POINT", srid=4326),
+        Computed("ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography", persisted=True),
+        deferred=True,
+    )
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
 
 
 class WeatherHistory(Base):
+    """Série histórica diária, particionada por ano em ``reading_date`` (ver migração 0002)."""
+
     __tablename__ = "weather_history"
+    # O índice único (station_id, reading_date DESC) vem de ``app.db.weather_ddl``.
+    __table_args__ = {"postgresql_partition_by": "RANGE (reading_date)"}
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     station_id: Mapped[int] = mapped_column(Integer, ForeignKey("weather_stations.id", ondelete="CASCADE"))
-    reading_date: Mapped[date]
+    reading_date: Mapped[date] = mapped_column(primary_key=True)
     rainfall_mm: Mapped[float]
     temperature_c: Mapped[float]
     eto: Mapped[float]
     ndvi: Mapped[float]
 
 
+# Mantém o caminho create_all (seed) equivalente às migrações 0002/0003: índice único,
+# partição default, funções que criam as partições anuais e triggers dos rollups.
+for statement in [*weather_ddl.PARTITION_DDL, *weather_ddl.rainfall_rollup_ddl()]:
+    ddl = DDL(statement.replace("%", "%%")).execute_if(dialect="postgresql")
+    event.listen(WeatherHistory.__table__, "after_create", ddl)
+
+
+class WeatherRainfallMonthly(Base):
+    """Rollup mensal de chuva por estação, mantido por triggers em ``weather_history``."""
+
+    __tablename__ = "weather_rainfall_monthly"
+
+    station_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("weather_stations.id", ondelete="CASCADE"), primary_key=True
+    )
+    month: Mapped[date] = mapped_column(primary_key=True)
+    rainfall_sum: Mapped[float] = mapped_column(Float, default=0)
+    reading_count: Mapped[int] = mapped_column(Integer, default=0)
+    rainy_days: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class WeatherRainfallSeasonal(Base):
+    """Rollup por ano-safra (1º de julho a 30 de junho) por estação."""
+
+    __tablename__ = "weather_rainfall_seasonal"
+
+    station_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("weather_stations.id", ondelete="CASCADE"), primary_key=True
+    )
+    season_start: Mapped[date] = mapped_column(primary_key=True)
+    rainfall_sum: Mapped[float] = mapped_column(Float, default=0)
+    reading_count: Mapped[int] = mapped_column(Integer, default=0)
+    rainy_days: Mapped[int] = mapped_column(Integer, default=0)
+
+
 class WeatherForecast(Base):
     __tablename__ = "weather_forecasts"
+    __table_args__ = (Index("ix_weather_forecasts_station_date", "station_id", "forecast_date"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     station_id: Mapped[int] = mapped_column(Integer, ForeignKey("weather_stations.id", ondelete="CASCADE"))
@@ -1,31 +1,40 @@
-from .user import UserRead, UserCreate, TokenPair
+from .user import UserRead, UserCreate, TokenPair, TokenPayload
 from .auth import LoginRequest, LoginResponse, RefreshRequest
-from .field import FieldSchema, FieldLayerSchema
-from .weather import ForecastResponse, HistoryResponse, StationResponse
-from .crop import SeasonSchema, ProductivitySchema, SimulationRequest, SimulationResult, SimulationCompareRequest
+from .field import FieldSchema, FieldLayerSchema, FieldImportResponse, ZonalStatsRequest, ZonalStatsResponse
+from .weather import ForecastResponse, HistoryResponse, NearestStationResponse, RainfallMonth, RainfallStatsResponse, StationResponse
+from .crop import SeasonSchema, ProductivitySchema, SimulationRequest, SimulationResult, SimulationCompareRequest, SimulationSweepRequest
 from .scenario import ScenarioSchema, ScenarioEvaluationSchema
 from .soil import SoilSampleSchema, SoilAnalysisResponse
 from .input import InputItemSchema, CostAnalysisSchema, CostComparisonResponse
 from .report import ReportRequest, ReportStatus
-from .etl import ETLJobResponse, UploadMapping, GeoValidationResult
+from .price import PriceCandle, PriceHistoryResponse, PriceInterval, PricePoint
+from .etl import ETLJobResponse, ETLLoadRequest, ETLLoadResponse, UploadMapping, GeoValidationResult
 
 __all__ = [
     "UserRead",
     "UserCreate",
     "TokenPair",
+    "TokenPayload",
     "LoginRequest",
     "LoginResponse",
     "RefreshRequest",
     "FieldSchema",
     "FieldLayerSchema",
+    "FieldImportResponse",
+    "ZonalStatsRequest",
+    "ZonalStatsResponse",
     "ForecastResponse",
     "HistoryResponse",
     "StationResponse",
+    "NearestStationResponse",
+    "RainfallMonth",
+    "RainfallStatsResponse",
     "SeasonSchema",
     "ProductivitySchema",
     "SimulationRequest",
     "SimulationResult",
     "SimulationCompareRequest",
+    "SimulationSweepRequest",
     "ScenarioSchema",
     "ScenarioEvaluationSchema",
     "SoilSampleSchema",
@@ -36,6 +45,12 @@ __all__ = [
     "ReportRequest",
     "ReportStatus",
     "ETLJobResponse",
+    "ETLLoadRequest",
+    "ETLLoadResponse",
     "UploadMapping",
     "GeoValidationResult",
+    "PriceCandle",
+    "PriceHistoryResponse",
+    "PriceInterval",
+    "PricePoint",
 ]
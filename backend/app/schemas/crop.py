@@ -1,6 +1,8 @@
+import math
 from datetime import date
+from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class SeasonSchema(BaseModel):
@@ -44,3 +46,41 @@ class SimulationResult(BaseModel):
 
 class SimulationCompareRequest(BaseModel):
     scenarios: list[SimulationRequest]
+
+
+class SweepRange(BaseModel):
+    start: float
+    stop: float
+    step: float = Field(gt=0)
+
+    @model_validator(mode="after")
+    def check_bounds(self) -> "SweepRange":
+        if self.stop < self.start:
+            raise ValueError("stop deve ser maior ou igual a start")
+        return self
+
+    @property
+    def size(self) -> int:
+        return int(math.floor((self.stop - self.start) / self.step + 1e-9)) + 1
+
+
+class SimulationSweepRequest(BaseModel):
+    field_id: int
+    cultivar: str
+    rainfall_delta_pct: SweepRange
+    input_cost_delta_pct: SweepRange
+    fertilizer_delta_pct: SweepRange
+    bag_prices: list[float] = Field(min_length=1)
+    top_k: int | None = Field(default=None, gt=0)
+    order_by: Literal["projected_margin", "risk_score"] = "projected_margin"
+    format: Literal["ndjson", "arrow"] = "ndjson"
+    persist: bool = False
+
+    @property
+    def cells(self) -> int:
+        return (
+            self.rainfall_delta_pct.size
+            * self.input_cost_delta_pct.size
+            * self.fertilizer_delta_pct.size
+            * len(self.bag_prices)
+        )
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic import BaseModel, FilePath
 
@@ -19,3 +20,17 @@ class GeoValidationResult(BaseModel):
     features: int
     invalid_features: int
     suggested_fixes: list[str]
+
+
+class ETLLoadRequest(BaseModel):
+    file_path: Path
+    target: Literal["weather_history", "crop_productivity"]
+
+
+class ETLLoadResponse(BaseModel):
+    target: str
+    rows_read: int
+    inserted: int
+    updated: int
+    rejected: int
+    elapsed_seconds: float
@@ -1,8 +1,11 @@
 from datetime import datetime
+from pathlib import Path
 from typing import Literal
 
 from pydantic import BaseModel, Field as PydanticField
 
+from .etl import GeoValidationResult
+
 
 class FieldLayerSchema(BaseModel):
     id: int | None = None
@@ -32,3 +35,28 @@ class FieldLayerCreate(BaseModel):
     layer_type: Literal["solo", "drenagem", "ndvi", "clima", "produtividade"]
     stats: dict | None = None
     raster_url: str | None = None
+
+
+class FieldImportResponse(BaseModel):
+    inserted: int
+    repaired: int
+    rejected: int
+    elapsed_seconds: float
+    validation: GeoValidationResult
+
+
+class ZonalStatsRequest(BaseModel):
+    raster_path: Path
+    layer_type: Literal["solo", "drenagem", "ndvi", "clima", "produtividade"]
+    field_ids: list[int] | None = None
+    band: int = PydanticField(1, ge=1)
+    raster_url: str | None = None
+
+
+class ZonalStatsResponse(BaseModel):
+    layer_type: str
+    raster_url: str
+    fields: int
+    computed: int
+    skipped: int
+    elapsed_seconds: float
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+PriceInterval = Literal["1h", "1d", "1w"]
+
+
+class PricePoint(BaseModel):
+    ts: datetime
+    price: float
+
+
+class PriceCandle(BaseModel):
+    bucket: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    samples: int
+
+
+class PriceHistoryResponse(BaseModel):
+    commodity: str
+    unit: str
+    start: datetime
+    end: datetime
+    interval: PriceInterval | None = None
+    points: list[PricePoint] = []
+    candles: list[PriceCandle] = []
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.models.report import ReportType
 
@@ -8,14 +8,19 @@ from app.models.report import ReportType
 class ReportRequest(BaseModel):
     report_type: ReportType
     params: dict | None = None
+    # Alternativa ao cabeçalho Idempotency-Key.
+    idempotency_key: str | None = Field(default=None, min_length=1, max_length=128)
 
 
 class ReportStatus(BaseModel):
     id: int
     report_type: ReportType
     status: str
+    attempts: int = 0
+    error: str | None = None
     file_url: str | None = None
     created_at: datetime
+    started_at: datetime | None = None
     finished_at: datetime | None = None
 
     class Config:
@@ -36,3 +36,24 @@ class StationResponse(BaseModel):
     latitude: float
     longitude: float
     elevation: float | None
+
+
+class NearestStationResponse(StationResponse):
+    rank: int
+    distance_km: float
+
+
+class RainfallMonth(BaseModel):
+    month: date
+    rainfall_mm: float
+    rainy_days: int
+
+
+class RainfallStatsResponse(BaseModel):
+    station_code: str
+    start: date | None = None
+    end: date | None = None
+    avg: float
+    total: float
+    readings: int
+    rainy_days: int
@@ -0,0 +1,254 @@
+"""Benchmarks de desempenho dos motores de simulação e consultas."""
+from __future__ import annotations
+
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import Executor, Future
+
+import typer
+from sqlalchemy import create_engine, text
+
+from app.core.config import get_settings
+from app.services.analytics import monte_carlo_margin
+
+app = typer.Typer(help="Benchmarks de desempenho do SIAD")
+
+
+def _legacy_monte_carlo(iterations: int, rainfall_pct: float, input_pct: float) -> dict[str, float]:
+    """Implementação original (loop Python) mantida apenas como referência de comparação."""
+    results = []
+    for _ in range(iterations):
+        rainfall = 1 + random.gauss(rainfall_pct / 100, 0.05)
+        inputs = 1 - random.gauss(input_pct / 100, 0.05)
+        yield_base = random.uniform(45, 65)
+        margin_base = random.uniform(1400, 2200)
+        results.append({"yield": yield_base * rainfall, "margin": margin_base * rainfall * inputs})
+    avg_yield = sum(r["yield"] for r in results) / iterations
+    avg_margin = sum(r["margin"] for r in results) / iterations
+    return {"yield": avg_yield, "margin": avg_margin}
+
+
+def _timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@app.command()
+def monte_carlo(
+    iterations: int = typer.Option(1_000_000, help="Número de iterações por execução"),
+    repeat: int = typer.Option(3, help="Repetições (considera o melhor tempo)"),
+) -> None:
+    """Compara o motor NumPy com o loop Python original."""
+    legacy = _timeit(lambda: _legacy_monte_carlo(iterations, 10, -5), repeat)
+    vectorized = _timeit(lambda: monte_carlo_margin(iterations, 10, -5, seed=42), repeat)
+    typer.echo(f"iterações:   {iterations}")
+    typer.echo(f"loop Python: {legacy * 1000:.1f} ms")
+    typer.echo(f"NumPy:       {vectorized * 1000:.1f} ms")
+    typer.echo(f"speedup:     {legacy / vectorized:.1f}x")
+
+
+BENCH_STATION_PREFIX = "BENCH"
+
+_SEED_STATIONS = """
+INSERT INTO weather_stations (code, name, latitude, longitude, created_at)
+SELECT :prefix || lpad(g::text, 5, '0'), 'Estação sintética ' || g, -15 - random() * 10, -45 - random() * 10, now()
+FROM generate_series(1, :stations) g
+ON CONFLICT (code) DO NOTHING
+"""
+_SEED_HISTORY_YEAR = """
+INSERT INTO weather_history (station_id, reading_date, rainfall_mm, temperature_c, eto, ndvi)
+SELECT s.id, d::date, random() * 40, 18 + random() * 14, 3 + random() * 3, 0.3 + random() * 0.6
+FROM weather_stations s
+CROSS JOIN generate_series(greatest(:start, make_date(:year, 1, 1)), least(:stop, make_date(:year, 12, 31)), interval '1 day') d
+WHERE s.code LIKE :prefix || '%'
+ON CONFLICT (station_id, reading_date) DO NOTHING
+"""
+_SEED_FORECASTS = """
+INSERT INTO weather_forecasts (station_id, forecast_date, min_temp_c, max_temp_c, rainfall_mm, risk_index, created_at)
+SELECT s.id, current_date + d, 16 + random() * 4, 26 + random() * 8, random() * 30, random(), now()
+FROM weather_stations s CROSS JOIN generate_series(0, :days - 1) d
+WHERE s.code LIKE :prefix || '%'
+"""
+_HISTORY_QUERY = """
+SELECT reading_date, rainfall_mm, temperature_c, eto, ndvi FROM weather_history
+WHERE station_id = :station_id ORDER BY reading_date DESC LIMIT 30
+"""
+_FORECAST_QUERY = """
+SELECT forecast_date, min_temp_c, max_temp_c, rainfall_mm, risk_index FROM weather_forecasts
+WHERE station_id = :station_id ORDER BY forecast_date LIMIT 10
+"""
+
+
+def _latencies(connection, query: str, station_ids: list[int], samples: int) -> list[float]:
+    timings = []
+    for station_id in random.choices(station_ids, k=samples):
+        start = time.perf_counter()
+        connection.execute(text(query), {"station_id": station_id}).all()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(label: str, timings: list[float]) -> None:
+    cuts = statistics.quantiles(timings, n=100)
+    typer.echo(f"{label:<10} p50 {cuts[49]:.2f} ms   p95 {cuts[94]:.2f} ms   máx {max(timings):.2f} ms")
+
+
+@app.command("weather-queries")
+def weather_queries(
+    rows: int = typer.Option(50_000_000, help="Linhas sintéticas em weather_history"),
+    stations: int = typer.Option(2_000, help="Estações sintéticas"),
+    forecast_days: int = typer.Option(365, help="Dias de previsão por estação"),
+    samples: int = typer.Option(500, help="Consultas medidas por endpoint"),
+    seed: bool = typer.Option(True, help="Gera os dados sintéticos antes de medir"),
+    cleanup: bool = typer.Option(False, help="Remove as estações sintéticas ao final"),
+) -> None:
+    """Mede a latência das consultas de histórico/previsão por estação (requer a migração 0002)."""
+    engine = create_engine(str(get_settings().sync_database_url))
+    params = {"prefix": BENCH_STATION_PREFIX}
+    if seed:
+        days = max(rows // stations, 1)
+        with engine.begin() as connection:
+            connection.execute(text(_SEED_STATIONS), {**params, "stations": stations})
+            stop = connection.execute(text("SELECT current_date")).scalar_one()
+            start = connection.execute(text("SELECT current_date - :days + 1"), {"days": days}).scalar_one()
+            connection.execute(text("SELECT weather_history_ensure_partitions(:start, :stop)"), {"start": start, "stop": stop})
+        # Uma transação por ano (= uma partição) mantém o volume de WAL e locks por commit limitado.
+        for year in range(start.year, stop.year + 1):
+            with engine.begin() as connection:
+                seeded = time.perf_counter()
+                inserted = connection.execute(
+                    text(_SEED_HISTORY_YEAR), {**params, "year": year, "start": start, "stop": stop}
+                ).rowcount
+                typer.echo(f"{year}: {inserted} linhas em {time.perf_counter() - seeded:.1f} s")
+        with engine.begin() as connection:
+            connection.execute(
+                text("DELETE FROM weather_forecasts USING weather_stations s WHERE s.id = station_id AND s.code LIKE :prefix || '%'"),
+                params,
+            )
+            connection.execute(text(_SEED_FORECASTS), {**params, "days": forecast_days})
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("ANALYZE weather_history"))
+            connection.execute(text("ANALYZE weather_forecasts"))
+
+    with engine.connect() as connection:
+        station_ids = list(
+            connection.execute(text("SELECT id FROM weather_stations WHERE code LIKE :prefix || '%'"), params).scalars()
+        )
+        if not station_ids:
+            raise typer.BadParameter("Nenhuma estação sintética encontrada; execute com --seed.")
+        total = connection.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'weather_history'")).scalar()
+        partitions = connection.execute(
+            text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'weather_history'::regclass")
+        ).scalar_one()
+        typer.echo(f"weather_history: ~{total} linhas em {partitions} partições; {len(station_ids)} estações")
+        # Aquecimento: as primeiras execuções incluem planejamento e cache frio.
+        _latencies(connection, _HISTORY_QUERY, station_ids, min(samples, 20))
+        _report("histórico", _latencies(connection, _HISTORY_QUERY, station_ids, samples))
+        _report("previsão", _latencies(connection, _FORECAST_QUERY, station_ids, samples))
+
+    if cleanup:
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM weather_stations WHERE code LIKE :prefix || '%'"), params)
+    engine.dispose()
+
+
+BENCH_LOGIN_EMAIL = "bench-login@example.com"
+BENCH_LOGIN_PASSWORD = "bench-login-123"
+
+
+class _InlineExecutor(Executor):
+    """Executa a tarefa no próprio event loop: reproduz o comportamento anterior ao pool."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future: Future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+async def _login_burst(logins: int, probe_interval: float) -> tuple[list[float], list[float], float]:
+    import httpx
+
+    from app.api import deps
+    from app.main import app as api
+
+    # O limite de /auth/login recusaria a rajada antes de chegar ao bcrypt.
+    api.dependency_overrides[deps.rate_limit_dep] = lambda: None
+    transport = httpx.ASGITransport(app=api, raise_app_exceptions=False)
+    credentials = {"email": BENCH_LOGIN_EMAIL, "password": BENCH_LOGIN_PASSWORD}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def probe(until: asyncio.Event | None, samples: int = 0) -> list[float]:
+            timings = []
+            while (until is not None and not until.is_set()) or len(timings) < samples:
+                start = time.perf_counter()
+                (await client.get("/health/z")).raise_for_status()
+                timings.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(probe_interval)
+            return timings
+
+        await client.post("/auth/login", json=credentials)
+        baseline = await probe(None, samples=200)
+        done = asyncio.Event()
+        prober = asyncio.create_task(probe(done))
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.post("/auth/login", json=credentials) for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        during = await prober
+    api.dependency_overrides.pop(deps.rate_limit_dep)
+    failed = [response.status_code for response in responses if response.status_code != 200]
+    if failed:
+        typer.echo(f"logins com erro: {len(failed)} (status {sorted(set(failed))})")
+    return baseline, during, elapsed
+
+
+@app.command("login-burst")
+def login_burst(
+    logins: int = typer.Option(100, help="Logins simultâneos na rajada"),
+    probe_interval: float = typer.Option(0.005, help="Intervalo entre chamadas ao endpoint de controle (s)"),
+    inline: bool = typer.Option(False, help="Calcula o bcrypt no event loop, como antes do pool dedicado"),
+) -> None:
+    """Latência de um endpoint sem relação (/health/z) durante uma rajada de logins.
+
+    Roda a API no próprio processo (ASGI) contra o banco configurado; cria o usuário
+    de benchmark se necessário.
+    """
+    from app.core import security
+
+    engine = create_engine(str(get_settings().sync_database_url))
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                """
+                INSERT INTO users (email, hashed_password, full_name, role, locale, preferences, is_active, created_at, updated_at)
+                VALUES (:email, :hashed, 'Benchmark login', 'visualizador', 'pt-BR', '{}', true, now(), now())
+                ON CONFLICT (email) DO UPDATE SET hashed_password = EXCLUDED.hashed_password
+                """
+            ),
+            {"email": BENCH_LOGIN_EMAIL, "hashed": security.get_password_hash(BENCH_LOGIN_PASSWORD)},
+        )
+    engine.dispose()
+    if inline:
+        security.password_hasher._executor = _InlineExecutor()
+
+    baseline, during, elapsed = asyncio.run(_login_burst(logins, probe_interval))
+    typer.echo(f"modo bcrypt: {'event loop' if inline else 'pool dedicado'}; {logins} logins em {elapsed:.2f} s")
+    for label, timings in (("repouso", baseline), ("rajada", during)):
+        if len(timings) < 2:
+            typer.echo(f"{label:<10} {len(timings)} amostra(s): {max(timings, default=0):.1f} ms")
+            continue
+        cuts = statistics.quantiles(timings, n=100)
+        typer.echo(
+            f"{label:<10} n={len(timings):<5} p50 {cuts[49]:.1f} ms   p95 {cuts[94]:.1f} ms   "
+            f"p99 {cuts[98]:.1f} ms   máx {max(timings):.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    app()
@@ -4,19 +4,81 @@ import asyncio
 from pathlib import Path
 
 import typer
+from sqlalchemy import select
 
+from app.db.session import get_session
+from app.models import User
+from app.models.field import LayerType
 from app.services.etl import ETLService
+from app.services.field_import import IMPORT_BATCH_SIZE, FieldImportService
+from app.services.zonal import ZonalStatsService
+from app.services.etl_load import ETLLoadService, LoadTarget
 
 app = typer.Typer(help="CLI para pipelines ETL")
+STORAGE_DIR = Path("/workspace/storage/uploads")
 
 
 @app.command()
 def run(file_path: Path) -> None:
-    service = ETLService(Path("/workspace/storage/uploads"))
+    service = ETLService(STORAGE_DIR)
     result = asyncio.run(service.ingest_file(_build_upload(file_path)))
     typer.echo(result.model_dump())
 
 
+@app.command()
+def load(
+    file_path: Path,
+    target: str = typer.Option(..., help="Tabela de destino: weather_history ou crop_productivity"),
+) -> None:
+    """Carrega um arquivo normalizado (CSV/XLSX ou dataset Parquet) via COPY."""
+    if target not in LoadTarget.__args__:
+        raise typer.BadParameter(f"destino inválido: {target}")
+
+    async def _load():
+        async with get_session() as session:
+            return await ETLLoadService(session, ETLService(STORAGE_DIR)).load(file_path, target)
+
+    typer.echo(asyncio.run(_load()).model_dump())
+
+
+@app.command()
+def fields(
+    file_path: Path,
+    owner_email: str = typer.Option(..., help="E-mail do usuário dono dos talhões importados"),
+    batch_size: int = typer.Option(IMPORT_BATCH_SIZE, min=1, help="Feições por lote (um COPY e um commit por lote)"),
+) -> None:
+    """Importa talhões de uma FeatureCollection GeoJSON, lida e gravada em lotes."""
+
+    async def _import():
+        async with get_session() as session:
+            owner_id = await session.scalar(select(User.id).where(User.email == owner_email))
+            if owner_id is None:
+                raise typer.BadParameter(f"usuário não encontrado: {owner_email}")
+            with file_path.open("rb") as source:
+                return await FieldImportService(session).import_geojson(source, owner_id, batch_size)
+
+    typer.echo(asyncio.run(_import()).model_dump())
+
+
+@app.command()
+def zonal(
+    raster_path: Path,
+    layer_type: str = typer.Option(..., help="Tipo da camada: ndvi, solo, drenagem, clima ou produtividade"),
+    field_id: list[int] = typer.Option(None, help="Talhões a processar (padrão: todos os que cruzam o raster)"),
+    band: int = typer.Option(1, min=1),
+    raster_url: str = typer.Option(None, help="URL gravada em FieldLayer.raster_url (padrão: caminho relativo a RASTER_STORAGE_DIR)"),
+) -> None:
+    """Calcula estatísticas zonais do raster por talhão e grava em FieldLayer.stats."""
+    if layer_type not in LayerType.__members__:
+        raise typer.BadParameter(f"tipo de camada inválido: {layer_type}")
+
+    async def _compute():
+        async with get_session() as session:
+            return await ZonalStatsService(session).compute(raster_path, layer_type, field_id or None, band, raster_url)
+
+    typer.echo(asyncio.run(_compute()).model_dump())
+
+
 def _build_upload(file_path: Path):
     from fastapi import UploadFile
 
@@ -171,25 +171,31 @@ async def seed_fields(session: AsyncSession, owner_id: int) -> list[Field]:
     return fields
 
 
+SEASON_PLANTING_DATE = date(2024, 10, 15)
+SEASON_HARVEST_DATE = date(2025, 2, 20)
+
+
 async def seed_seasons(session: AsyncSession, field: Field) -> None:
-    plant_date = date(2024, 10, 15)
-    harvest_date = date(2025, 2, 20)
     season = Season(
         field_id=field.id,
         cultivar="SOJA RR",
-        planting_date=plant_date,
-        harvest_date=harvest_date,
+        planting_date=SEASON_PLANTING_DATE,
+        harvest_date=SEASON_HARVEST_DATE,
         expected_yield_bag_ha=60,
         cost_per_ha=4200,
     )
     session.add(season)
     await session.flush()
+
+
+async def seed_season_weather(session: AsyncSession) -> None:
+    # Inserida uma única vez: (station_id, reading_date) é único em weather_history.
     for idx in range(1, 6):
         await session.execute(
             WeatherHistory.__table__.insert(),
             {
                 "station_id": 1,
-                "reading_date": plant_date + timedelta(days=idx * 10),
+                "reading_date": SEASON_PLANTING_DATE + timedelta(days=idx * 10),
                 "rainfall_mm": 15 + idx,
                 "temperature_c": 28 + idx * 0.3,
                 "eto": 4.2,
@@ -247,6 +253,7 @@ async def seed_all(dataset: str) -> None:
         for field in fields:
             await seed_seasons(session, field)
             await seed_soil_samples(session, field)
+        await seed_season_weather(session)
         await seed_inputs(session)
         await seed_scenarios(session, users[0].id)
         await session.commit()
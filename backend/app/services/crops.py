@@ -1,8 +1,14 @@
+import asyncio
 from typing import Sequence
 
-from sqlalchemy import Select, func, select
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import Select, event, func, insert, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from app.core.cache import TwoTierCache
+from app.core.redis import redis_client
 from app.models import CropProductivity, CropSimulation, Season
 from app.schemas import (
     ProductivitySchema,
@@ -10,9 +16,81 @@ from app.schemas import (
     SimulationCompareRequest,
     SimulationRequest,
     SimulationResult,
+    SimulationSweepRequest,
 )
 
 
+DEFAULT_BASELINE_YIELD = 55.0
+DEFAULT_BASELINE_MARGIN = 1800.0
+MAX_SWEEP_CELLS = 1_000_000
+MAX_PERSISTED_CELLS = 10_000
+
+# Baseline (produtividade/eficiência médias) por field_id, invalidada em escritas de
+# CropProductivity/Season pelos eventos de sessão abaixo.
+baseline_cache = TwoTierCache("crop_baseline", redis_client, maxsize=4096, local_ttl=60, redis_ttl=3600)
+_pending_invalidations: set[asyncio.Task] = set()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_baseline_invalidations(session: Session, _flush_context) -> None:
+    field_ids: set[int] = set()
+    season_ids: set[int] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Season):
+            field_ids.add(obj.field_id)
+            field_ids.update(inspect(obj).attrs.field_id.history.deleted or ())
+        elif isinstance(obj, CropProductivity):
+            season_ids.add(obj.season_id)
+            season_ids.update(inspect(obj).attrs.season_id.history.deleted or ())
+    season_ids.discard(None)
+    if season_ids:
+        rows = session.execute(select(Season.field_id).where(Season.id.in_(season_ids)))
+        field_ids.update(rows.scalars())
+    field_ids.discard(None)
+    if field_ids:
+        session.info.setdefault("baseline_invalidations", set()).update(field_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_baseline_invalidations(session: Session) -> None:
+    field_ids = session.info.pop("baseline_invalidations", None)
+    if not field_ids:
+        return
+    baseline_cache.invalidate_local(field_ids)
+    try:
+        task = asyncio.get_running_loop().create_task(baseline_cache.invalidate(field_ids))
+    except RuntimeError:
+        return
+    _pending_invalidations.add(task)
+    task.add_done_callback(_pending_invalidations.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_baseline_invalidations(session: Session) -> None:
+    session.info.pop("baseline_invalidations", None)
+
+
+def _simulate_margin_arrays(
+    rainfall_delta_pct: np.ndarray,
+    input_cost_delta_pct: np.ndarray,
+    fertilizer_delta_pct: np.ndarray,
+    baseline_yield: np.ndarray,
+    baseline_margin: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """Versão colunar de ``_simulate_margin``: mesmas fórmulas aplicadas a vetores."""
+    rainfall_factor = 1 + rainfall_delta_pct / 100
+    input_factor = 1 - input_cost_delta_pct / 100
+    fertilizer_factor = 1 + fertilizer_delta_pct / 100
+    return {
+        "rainfall_factor": rainfall_factor,
+        "input_factor": input_factor,
+        "fertilizer_factor": fertilizer_factor,
+        "projected_yield": baseline_yield * rainfall_factor * fertilizer_factor,
+        "projected_margin": baseline_margin * rainfall_factor * input_factor,
+        "risk_score": np.maximum(0.1, 1 - (np.abs(rainfall_delta_pct) + np.abs(input_cost_delta_pct)) / 200),
+    }
+
+
 def _simulate_margin(payload: SimulationRequest, baseline_yield: float, baseline_margin: float) -> SimulationResult:
     rainfall_factor = 1 + payload.rainfall_delta_pct / 100
     input_factor = 1 - payload.input_cost_delta_pct / 100
@@ -59,33 +137,166 @@ class CropService:
             for row in records
         ]
 
-    async def run_simulation(self, payload: SimulationRequest) -> SimulationResult:
-        baseline_stmt = (
-            select(func.avg(CropProductivity.yield_bag_ha), func.avg(CropProductivity.efficiency_index))
+    async def _baselines(self, field_ids: set[int]) -> dict[int, tuple[float, float]]:
+        """Produtividade e eficiência médias por talhão.
+
+        Consulta o ``baseline_cache`` e calcula apenas os talhões ausentes, em uma
+        única consulta agrupada.
+        """
+        baselines = {field_id: tuple(value) for field_id, value in (await baseline_cache.get_many(field_ids)).items()}
+        missing = field_ids - baselines.keys()
+        if not missing:
+            return baselines
+
+        stmt = (
+            select(
+                Season.field_id,
+                func.avg(CropProductivity.yield_bag_ha),
+                func.avg(CropProductivity.efficiency_index),
+            )
             .join(Season, Season.id == CropProductivity.season_id)
-            .where(Season.field_id == payload.field_id)
+            .where(Season.field_id.in_(missing))
+            .group_by(Season.field_id)
         )
-        row = (await self.db.execute(baseline_stmt)).one_or_none()
-        baseline_yield = float(row[0] or 55)
-        baseline_margin = float(row[1] or 1800)
-        result = _simulate_margin(payload, baseline_yield, baseline_margin)
+        rows = (await self.db.execute(stmt)).all()
+        computed = {field_id: (DEFAULT_BASELINE_YIELD, DEFAULT_BASELINE_MARGIN) for field_id in missing}
+        for field_id, avg_yield, avg_efficiency in rows:
+            computed[field_id] = (
+                float(avg_yield or DEFAULT_BASELINE_YIELD),
+                float(avg_efficiency or DEFAULT_BASELINE_MARGIN),
+            )
+        await baseline_cache.set_many(computed)
+        return {**baselines, **computed}
 
-        sim = CropSimulation(
-            field_id=payload.field_id,
-            scenario_name=result.scenario_name,
-            delta_rainfall=payload.rainfall_delta_pct,
-            delta_inputs=payload.input_cost_delta_pct,
-            cultivar=payload.cultivar,
-            density_plants_ha=55000,
-            expected_margin_per_ha=result.projected_margin,
-            payload=result.breakdown,
-        )
-        self.db.add(sim)
+    @staticmethod
+    def _simulation_row(payload: SimulationRequest, result: SimulationResult) -> dict:
+        return {
+            "field_id": payload.field_id,
+            "scenario_name": result.scenario_name,
+            "delta_rainfall": payload.rainfall_delta_pct,
+            "delta_inputs": payload.input_cost_delta_pct,
+            "cultivar": payload.cultivar,
+            "density_plants_ha": 55000,
+            "expected_margin_per_ha": result.projected_margin,
+            "payload": result.breakdown,
+        }
+
+    async def run_simulation(self, payload: SimulationRequest) -> SimulationResult:
+        baseline_yield, baseline_margin = (await self._baselines({payload.field_id}))[payload.field_id]
+        result = _simulate_margin(payload, baseline_yield, baseline_margin)
+        self.db.add(CropSimulation(**self._simulation_row(payload, result)))
         await self.db.commit()
         return result
 
     async def compare(self, payload: SimulationCompareRequest) -> list[SimulationResult]:
-        results = []
-        for scenario in payload.scenarios:
-            results.append(await self.run_simulation(scenario))
+        """Simula todos os cenários em lote: uma consulta de baseline, um insert e um commit."""
+        scenarios = payload.scenarios
+        if not scenarios:
+            return []
+        baselines = await self._baselines({scenario.field_id for scenario in scenarios})
+        base = np.array([baselines[scenario.field_id] for scenario in scenarios], dtype=float)
+        columns = _simulate_margin_arrays(
+            np.array([scenario.rainfall_delta_pct for scenario in scenarios], dtype=float),
+            np.array([scenario.input_cost_delta_pct for scenario in scenarios], dtype=float),
+            np.array([scenario.fertilizer_delta_pct for scenario in scenarios], dtype=float),
+            base[:, 0],
+            base[:, 1],
+        )
+        columns = {key: values.tolist() for key, values in columns.items()}
+
+        results = [
+            SimulationResult(
+                scenario_name=f"{scenario.cultivar}-{scenario.bag_price}",
+                projected_yield=round(columns["projected_yield"][i], 2),
+                projected_margin=round(columns["projected_margin"][i], 2),
+                risk_score=round(columns["risk_score"][i], 2),
+                breakdown={
+                    "rainfall_effect": columns["rainfall_factor"][i],
+                    "input_savings": columns["input_factor"][i],
+                    "fertilizer_effect": columns["fertilizer_factor"][i],
+                    "bag_price": scenario.bag_price,
+                },
+            )
+            for i, scenario in enumerate(scenarios)
+        ]
+        await self.db.execute(
+            insert(CropSimulation),
+            [self._simulation_row(scenario, result) for scenario, result in zip(scenarios, results)],
+        )
+        await self.db.commit()
         return results
+
+    async def sweep(self, payload: SimulationSweepRequest) -> dict[str, np.ndarray]:
+        """Avalia a grade cartesiana de deltas × preços da saca e devolve colunas NumPy.
+
+        Nada é persistido, a menos que ``persist`` seja solicitado (limitado a
+        ``MAX_PERSISTED_CELLS`` linhas, normalmente combinado com ``top_k``).
+        """
+        if payload.cells > MAX_SWEEP_CELLS:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Grade com {payload.cells} células excede o limite de {MAX_SWEEP_CELLS}",
+            )
+        baseline_yield, baseline_margin = (await self._baselines({payload.field_id}))[payload.field_id]
+        axes = [
+            r.start + np.arange(r.size) * r.step
+            for r in (payload.rainfall_delta_pct, payload.input_cost_delta_pct, payload.fertilizer_delta_pct)
+        ]
+        rainfall, inputs, fertilizer, bag_price = (
+            axis.ravel() for axis in np.meshgrid(*axes, np.asarray(payload.bag_prices, dtype=float), indexing="ij")
+        )
+        simulated = _simulate_margin_arrays(
+            rainfall, inputs, fertilizer, np.float64(baseline_yield), np.float64(baseline_margin)
+        )
+        columns = {
+            "rainfall_delta_pct": rainfall,
+            "input_cost_delta_pct": inputs,
+            "fertilizer_delta_pct": fertilizer,
+            "bag_price": bag_price,
+            "projected_yield": simulated["projected_yield"].round(2),
+            "projected_margin": simulated["projected_margin"].round(2),
+            "risk_score": simulated["risk_score"].round(2),
+        }
+
+        if payload.top_k and payload.top_k < rainfall.size:
+            ranking = -columns[payload.order_by]
+            top = np.argpartition(ranking, payload.top_k - 1)[: payload.top_k]
+            top = top[np.argsort(ranking[top], kind="stable")]
+            columns = {name: values[top] for name, values in columns.items()}
+
+        if payload.persist:
+            await self._persist_sweep(payload, columns)
+        return columns
+
+    async def _persist_sweep(self, payload: SimulationSweepRequest, columns: dict[str, np.ndarray]) -> None:
+        cells = columns["projected_margin"].size
+        if cells > MAX_PERSISTED_CELLS:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Persistência limitada a {MAX_PERSISTED_CELLS} células; utilize top_k",
+            )
+        rows = []
+        for i in range(cells):
+            scenario = SimulationRequest(
+                field_id=payload.field_id,
+                rainfall_delta_pct=float(columns["rainfall_delta_pct"][i]),
+                input_cost_delta_pct=float(columns["input_cost_delta_pct"][i]),
+                fertilizer_delta_pct=float(columns["fertilizer_delta_pct"][i]),
+                cultivar=payload.cultivar,
+                bag_price=float(columns["bag_price"][i]),
+            )
+            result = SimulationResult(
+                scenario_name=f"{scenario.cultivar}-{scenario.bag_price}",
+                projected_yield=float(columns["projected_yield"][i]),
+                projected_margin=float(columns["projected_margin"][i]),
+                risk_score=float(columns["risk_score"][i]),
+                breakdown={
+                    "rainfall_effect": 1 + scenario.rainfall_delta_pct / 100,
+                    "input_savings": 1 - scenario.input_cost_delta_pct / 100,
+                    "fertilizer_effect": 1 + scenario.fertilizer_delta_pct / 100,
+                    "bag_price": scenario.bag_price,
+                },
+            )
+            rows.append(self._simulation_row(scenario, result))
+        await self.db.execute(insert(CropSimulation), rows)
+        await self.db.commit()
@@ -1,44 +1,365 @@
+import asyncio
 import csv
 import json
+import shutil
+from datetime import date, datetime
 from pathlib import Path
+from typing import BinaryIO
+from uuid import uuid4
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
 from fastapi import UploadFile
+from openpyxl import load_workbook
+from pyarrow import fs
 
 from app.schemas import ETLJobResponse, UploadMapping
 
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+VALIDATION_CHUNK_ROWS = 100_000
+MAX_REPORTED_ISSUES = 100
+STAGING_BLOCK_BYTES = 16 * 1024 * 1024
+MAX_STAGED_PARTITIONS = 65_536
+COLUMN_ORDER_KEY = b"siad.columns"
+
+# Séries por estação são particionadas em diretórios Hive por estação (station_code=...);
+# a coluna ``month`` (AAAAMM) acompanha os dados e permite podar row groups pelas
+# estatísticas do Parquet sem gerar um arquivo minúsculo por estação/mês.
+STATION_PARTITIONING = ds.partitioning(pa.schema([("station_code", pa.string())]), flavor="hive")
+# Tipos fixos no staging: a inferência do Arrow olha só o primeiro bloco e falharia se um
+# bloco posterior mudasse o tipo (ex.: inteiro seguido de "60.5"). Colunas fora desta lista
+# são lidas como texto.
+KNOWN_COLUMN_TYPES = {
+    "station_code": pa.string(),
+    "date": pa.string(),
+    "rainfall_mm": pa.float64(),
+    "temperature_c": pa.float64(),
+    "eto": pa.float64(),
+    "ndvi": pa.float64(),
+    "field_id": pa.int64(),
+    "season_id": pa.int64(),
+    "season": pa.string(),
+    "area_ha": pa.float64(),
+    "yield_bag_ha": pa.float64(),
+    "ndvi_avg": pa.float64(),
+    "rainfall_total": pa.float64(),
+    "efficiency_index": pa.float64(),
+}
+# Formatos de data aceitos no staging, tentados em ordem; datas fora deles viram nulas.
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y")
+# Leituras via mmap: o Parquet é paginado pelo SO em vez de copiado para o heap.
+MMAP_FS = fs.LocalFileSystem(use_mmap=True)
+
+
+def _null_issues(chunk_index: int, first_row: int, null_counts: dict[str, int]) -> list[str]:
+    return [
+        f"Valores ausentes no bloco {chunk_index} (linhas {first_row}+): coluna '{column}' ({count})"
+        for column, count in null_counts.items()
+        if count
+    ]
+
+
+def _validate_csv(path: Path) -> list[str]:
+    issues: list[str] = []
+    first_row = 0
+    with pd.read_csv(path, chunksize=VALIDATION_CHUNK_ROWS) as reader:
+        for index, chunk in enumerate(reader):
+            issues.extend(_null_issues(index, first_row, chunk.isnull().sum().to_dict()))
+            first_row += len(chunk)
+    return issues
+
+
+def _validate_xlsx(path: Path) -> list[str]:
+    issues: list[str] = []
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(col) for col in next(rows, ())]
+        counts = dict.fromkeys(header, 0)
+        index = first_row = row_number = 0
+        for row_number, row in enumerate(rows):
+            for column, value in zip(header, row):
+                if value is None:
+                    counts[column] += 1
+            if (row_number + 1) % VALIDATION_CHUNK_ROWS == 0:
+                issues.extend(_null_issues(index, first_row, counts))
+                counts = dict.fromkeys(header, 0)
+                index += 1
+                first_row = row_number + 1
+        issues.extend(_null_issues(index, first_row, counts))
+    finally:
+        workbook.close()
+    return issues
+
+
+def _validate_json(path: Path) -> list[str]:
+    with path.open("rb") as fp:
+        json.load(fp)
+    return []
+
+
+VALIDATORS = {".csv": _validate_csv, ".xlsx": _validate_xlsx, ".json": _validate_json}
+STAGEABLE_SUFFIXES = {".csv", ".xlsx"}
+
+
+def _as_date(column: pa.ChunkedArray | pa.Array) -> pa.Array:
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    if pa.types.is_date32(column.type):
+        return column
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        column = pc.utf8_trim_whitespace(column)
+        parsed = [pc.strptime(column, format=fmt, unit="s", error_is_null=True) for fmt in DATE_FORMATS]
+        column = pc.coalesce(*parsed)
+    return column.cast(pa.date32())
+
+
+def _column_types(header: list[str]) -> dict[str, pa.DataType]:
+    return {name: KNOWN_COLUMN_TYPES.get(name, pa.string()) for name in header}
+
+
+def _csv_header(source: Path, delimiter: str) -> list[str]:
+    with source.open(newline="", encoding="utf-8-sig") as fp:
+        return next(csv.reader(fp, delimiter=delimiter), [])
+
+
+def _xlsx_value(value, type_: pa.DataType):
+    if value is None or value == "":
+        return None
+    if pa.types.is_string(type_):
+        if isinstance(value, datetime):
+            return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat()
+        return value.isoformat() if isinstance(value, date) else str(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value) if pa.types.is_integer(type_) else float(value)
+    try:
+        return int(str(value)) if pa.types.is_integer(type_) else float(str(value).replace(",", "."))
+    except ValueError:
+        return None
+
+
+def _xlsx_batches(source: Path) -> pa.RecordBatchReader:
+    """Lê a planilha em modo ``read_only`` (linha a linha), em lotes de ``VALIDATION_CHUNK_ROWS``."""
+    workbook = load_workbook(source, read_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    header = [str(col) for col in next(rows, ())]
+    types = _column_types(header)
+    schema = pa.schema([(name, types[name]) for name in header])
+
+    def batch(chunk: list[tuple]) -> pa.RecordBatch:
+        columns = [
+            pa.array([_xlsx_value(row[index] if index < len(row) else None, field.type) for row in chunk], field.type)
+            for index, field in enumerate(schema)
+        ]
+        return pa.record_batch(columns, schema=schema)
+
+    def batches():
+        try:
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == VALIDATION_CHUNK_ROWS:
+                    yield batch(chunk)
+                    chunk = []
+            if chunk:
+                yield batch(chunk)
+        finally:
+            workbook.close()
+
+    return pa.RecordBatchReader.from_batches(schema, batches())
+
+
+def _source_batches(source: Path, delimiter: str) -> pa.RecordBatchReader:
+    if source.suffix.lower() == ".xlsx":
+        return _xlsx_batches(source)
+    return pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=STAGING_BLOCK_BYTES),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=_column_types(_csv_header(source, delimiter)), strings_can_be_null=True
+        ),
+    )
+
+
+def _is_station_series(schema: pa.Schema) -> bool:
+    return "station_code" in schema.names and "date" in schema.names
+
+
+def _write_dataset(reader: pa.RecordBatchReader, target: Path) -> int:
+    """Grava os lotes como Parquet, particionando séries de estação por código e mês.
+
+    Devolve quantas datas não puderam ser interpretadas (gravadas como nulas).
+    """
+    schema = reader.schema
+    metadata = {COLUMN_ORDER_KEY: json.dumps(schema.names).encode()}
+    if not _is_station_series(schema):
+        reader = pa.RecordBatchReader.from_batches(schema.with_metadata(metadata), reader)
+        ds.write_dataset(reader, target, format="parquet")
+        return 0
+
+    date_index = schema.get_field_index("date")
+    out_schema = schema.set(date_index, pa.field("date", pa.date32())).append(pa.field("month", pa.int32()))
+    out_schema = out_schema.with_metadata(metadata)
+
+    invalid_dates = 0
+
+    def batches():
+        nonlocal invalid_dates
+        for batch in reader:
+            dates = _as_date(batch.column("date"))
+            invalid_dates += dates.null_count - batch.column("date").null_count
+            month = pc.add(pc.multiply(pc.year(dates), 100), pc.month(dates)).cast(pa.int32())
+            columns = batch.columns
+            columns[date_index] = dates
+            yield pa.record_batch([*columns, month], schema=out_schema)
+
+    ds.write_dataset(
+        batches(),
+        target,
+        format="parquet",
+        schema=out_schema,
+        partitioning=STATION_PARTITIONING,
+        max_partitions=MAX_STAGED_PARTITIONS,
+    )
+    return invalid_dates
+
 
 class ETLService:
     def __init__(self, storage_dir: Path):
         self.storage_dir = storage_dir
         self.storage_dir.mkdir(parents=True, exist_ok=True)
 
+    @staticmethod
+    def _store(source: BinaryIO, target: Path) -> None:
+        with target.open("wb") as out:
+            shutil.copyfileobj(source, out, UPLOAD_CHUNK_BYTES)
+
     async def ingest_file(self, file: UploadFile) -> ETLJobResponse:
-        target = self.storage_dir / file.filename
-        content = await file.read()
-        target.write_bytes(content)
-        issues: list[str] = []
-        if file.filename.endswith(".csv"):
-            df = pd.read_csv(target)
-            if df.isnull().sum().any():
-                issues.append("Valores ausentes detectados")
-        elif file.filename.endswith(".xlsx"):
-            pd.read_excel(target)
-        elif file.filename.endswith(".json"):
-            json.loads(target.read_text())
-        else:
-            issues.append("Formato não suportado, realizar conversão")
+        """Grava o upload em disco e valida em blocos, fora do event loop.
+
+        A cópia e a validação rodam em threads de trabalho; a memória usada é limitada
+        pelo tamanho do bloco, independentemente do tamanho do arquivo.
+        """
+        target = self.storage_dir / Path(file.filename).name
+        await file.seek(0)
+        await asyncio.to_thread(self._store, file.file, target)
+
+        validator = VALIDATORS.get(target.suffix.lower())
+        if validator is None:
+            return ETLJobResponse(
+                job_id=file.filename, status="stored", issues=["Formato não suportado, realizar conversão"]
+            )
+        issues = await asyncio.to_thread(validator, target)
+        if target.suffix.lower() in STAGEABLE_SUFFIXES:
+            try:
+                await asyncio.to_thread(self.stage, target, issues=issues)
+            except (pa.ArrowException, ValueError, OSError) as exc:
+                # O arquivo fica armazenado; o staging é refeito na próxima leitura.
+                issues.append(f"Falha ao converter para Parquet: {exc}")
+        if len(issues) > MAX_REPORTED_ISSUES:
+            omitted = len(issues) - MAX_REPORTED_ISSUES
+            issues = issues[:MAX_REPORTED_ISSUES] + [f"... {omitted} ocorrências adicionais omitidas"]
         return ETLJobResponse(job_id=file.filename, status="stored", issues=issues)
 
+    @property
+    def staging_dir(self) -> Path:
+        return self.storage_dir / "staged"
+
+    def staged_path(self, source: Path) -> Path:
+        # Nome e extensão do arquivo armazenado: rainfall.csv e rainfall.xlsx não colidem.
+        return self.staging_dir / f"{source.stem}_{source.suffix.lstrip('.').lower()}"
+
+    def stage(self, source: Path, delimiter: str = ",", issues: list[str] | None = None) -> Path:
+        """Converte o arquivo (CSV/XLSX) uma única vez em um dataset Parquet em ``staged/``.
+
+        Séries por estação (``station_code`` + ``date``) são particionadas por estação e
+        ganham a coluna ``month``. O dataset é refeito apenas quando a origem é mais nova,
+        em um diretório temporário que só substitui o anterior quando completo.
+        """
+        target = self.staged_path(source)
+        if target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+            return target
+        building = target.with_name(f".{target.name}.{uuid4().hex}")
+        try:
+            invalid_dates = _write_dataset(_source_batches(source, delimiter), building)
+            if target.exists():
+                shutil.rmtree(target)
+            building.rename(target)
+        finally:
+            shutil.rmtree(building, ignore_errors=True)
+        if invalid_dates and issues is not None:
+            issues.append(
+                f"Datas em formato não reconhecido (aceitos: {', '.join(DATE_FORMATS)}): {invalid_dates} linhas"
+            )
+        return target
+
+    def open_staged(self, source: Path, delimiter: str = ",") -> ds.Dataset:
+        """Abre o dataset Parquet (fazendo o staging se necessário) com leitura via mmap."""
+        path = source if source.is_dir() else self.stage(source, delimiter)
+        partitioned = any(child.name.startswith("station_code=") for child in path.iterdir())
+        return ds.dataset(
+            path,
+            format="parquet",
+            partitioning=STATION_PARTITIONING if partitioned else None,
+            filesystem=MMAP_FS,
+        )
+
+    def read_staged(
+        self,
+        source: Path,
+        columns: list[str] | None = None,
+        filter: ds.Expression | None = None,
+        delimiter: str = ",",
+    ):
+        """Itera sobre lotes Arrow lendo apenas as colunas e row groups necessários."""
+        return self.open_staged(source, delimiter).to_batches(columns=columns, filter=filter)
+
+    @staticmethod
+    def _original_columns(dataset: ds.Dataset) -> list[str]:
+        metadata = dataset.schema.metadata or {}
+        names = json.loads(metadata.get(COLUMN_ORDER_KEY, b"[]")) or dataset.schema.names
+        return [name for name in names if name in dataset.schema.names]
+
     def normalize_rainfall(self, csv_path: Path) -> Path:
-        df = pd.read_csv(csv_path)
-        df["rainfall_mm"] = df["rainfall_mm"].clip(lower=0)
-        df["date"] = pd.to_datetime(df["date"])
-        out = csv_path.with_name(f"{csv_path.stem}_normalized.csv")
-        df.to_csv(out, index=False)
+        """Normaliza a série de chuva lendo o staging Parquet e grava um novo dataset Parquet.
+
+        Se o dataset normalizado já for mais novo que o staging, é reutilizado.
+        """
+        staged = csv_path if csv_path.is_dir() else self.stage(csv_path)
+        out = self.staging_dir / f"{staged.name}_normalized"
+        if out.exists() and out.stat().st_mtime >= staged.stat().st_mtime:
+            return out
+        if out.exists():
+            shutil.rmtree(out)
+
+        dataset = self.open_staged(staged)
+        date_index = dataset.schema.get_field_index("date")
+        schema = dataset.schema.set(date_index, pa.field("date", pa.date32()))
+        rainfall_index = schema.get_field_index("rainfall_mm")
+
+        def batches():
+            for batch in dataset.to_batches():
+                columns = batch.columns
+                columns[rainfall_index] = pc.max_element_wise(columns[rainfall_index], pa.scalar(0.0))
+                columns[date_index] = _as_date(columns[date_index])
+                yield pa.record_batch(columns, schema=schema)
+
+        partitioned = _is_station_series(schema)
+        ds.write_dataset(
+            pa.RecordBatchReader.from_batches(schema, batches()),
+            out,
+            format="parquet",
+            partitioning=STATION_PARTITIONING if partitioned else None,
+            max_partitions=MAX_STAGED_PARTITIONS,
+        )
         return out
 
     def preview_mapping(self, mapping: UploadMapping) -> dict:
-        df = pd.read_csv(mapping.file_path, delimiter=mapping.delimiter)
-        preview = df.head().rename(columns=mapping.column_map)
+        dataset = self.open_staged(Path(mapping.file_path), mapping.delimiter)
+        columns = self._original_columns(dataset)
+        preview = dataset.head(5, columns=columns).to_pandas().rename(columns=mapping.column_map)
         return {"columns": list(preview.columns), "sample": preview.to_dict(orient="records")}
@@ -0,0 +1,266 @@
+import asyncio
+import re
+import time
+from datetime import date
+from pathlib import Path
+from typing import Iterator, Literal
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas import ETLLoadResponse
+from app.services.crops import baseline_cache
+from app.services.etl import ETLService
+from app.services.weather import station_registry
+
+LoadTarget = Literal["weather_history", "crop_productivity"]
+
+WEATHER_MEASURES = ["rainfall_mm", "temperature_c", "eto", "ndvi"]
+PRODUCTIVITY_MEASURES = ["area_ha", "yield_bag_ha", "ndvi_avg", "rainfall_total", "efficiency_index"]
+PRODUCTIVITY_ALIASES = {"rainfall_mm": "rainfall_total"}
+
+_WEATHER_STAGE_DDL = """
+CREATE TEMP TABLE _load_weather_history (
+    station_id integer, reading_date date,
+    rainfall_mm double precision, temperature_c double precision, eto double precision, ndvi double precision
+) ON COMMIT DROP
+"""
+_WEATHER_UPDATE = """
+UPDATE weather_history w
+SET rainfall_mm = COALESCE(s.rainfall_mm, w.rainfall_mm),
+    temperature_c = COALESCE(s.temperature_c, w.temperature_c),
+    eto = COALESCE(s.eto, w.eto),
+    ndvi = COALESCE(s.ndvi, w.ndvi)
+FROM (
+    SELECT DISTINCT ON (station_id, reading_date) * FROM _load_weather_history
+    ORDER BY station_id, reading_date
+) s
+WHERE w.station_id = s.station_id AND w.reading_date = s.reading_date
+"""
+_WEATHER_INSERT = """
+INSERT INTO weather_history (station_id, reading_date, rainfall_mm, temperature_c, eto, ndvi)
+SELECT DISTINCT ON (s.station_id, s.reading_date)
+    s.station_id, s.reading_date, s.rainfall_mm, s.temperature_c, s.eto, s.ndvi
+FROM _load_weather_history s
+WHERE s.rainfall_mm IS NOT NULL AND s.temperature_c IS NOT NULL AND s.eto IS NOT NULL AND s.ndvi IS NOT NULL
+ORDER BY s.station_id, s.reading_date
+ON CONFLICT (station_id, reading_date) DO NOTHING
+"""
+_WEATHER_PARTITIONS = "SELECT weather_history_ensure_partitions(min(reading_date), max(reading_date)) FROM _load_weather_history"
+_WEATHER_LEFTOVER = """
+SELECT count(*) FROM (SELECT DISTINCT station_id, reading_date FROM _load_weather_history) s
+WHERE NOT EXISTS (
+    SELECT 1 FROM weather_history w WHERE w.station_id = s.station_id AND w.reading_date = s.reading_date
+)
+"""
+
+_PRODUCTIVITY_STAGE_DDL = """
+CREATE TEMP TABLE _load_crop_productivity (
+    position bigint, season_id integer, field_id integer, planted_from date, planted_until date,
+    area_ha double precision, yield_bag_ha double precision,
+    ndvi_avg double precision, rainfall_total double precision, efficiency_index double precision
+) ON COMMIT DROP
+"""
+# Linhas com field_id + rótulo de safra: a safra do talhão plantada na janela do rótulo.
+_PRODUCTIVITY_RESOLVE = """
+UPDATE _load_crop_productivity s
+SET season_id = (
+    SELECT se.id FROM seasons se
+    WHERE se.field_id = s.field_id AND se.planting_date >= s.planted_from AND se.planting_date < s.planted_until
+    ORDER BY se.planting_date, se.id
+    LIMIT 1
+)
+WHERE s.season_id IS NULL AND s.field_id IS NOT NULL AND s.planted_from IS NOT NULL
+"""
+# Chave natural: uma produtividade por safra (uq_crop_productivity_season). Repetições da
+# mesma safra no arquivo: vale a última linha.
+_PRODUCTIVITY_UPSERT = """
+INSERT INTO crop_productivity (season_id, area_ha, yield_bag_ha, ndvi_avg, rainfall_total, efficiency_index)
+SELECT DISTINCT ON (s.season_id)
+    s.season_id, s.area_ha, s.yield_bag_ha, s.ndvi_avg, s.rainfall_total, s.efficiency_index
+FROM _load_crop_productivity s
+JOIN seasons ON seasons.id = s.season_id
+WHERE s.area_ha IS NOT NULL AND s.yield_bag_ha IS NOT NULL AND s.ndvi_avg IS NOT NULL
+    AND s.rainfall_total IS NOT NULL AND s.efficiency_index IS NOT NULL
+ORDER BY s.season_id, s.position DESC
+ON CONFLICT (season_id) DO UPDATE SET
+    area_ha = EXCLUDED.area_ha,
+    yield_bag_ha = EXCLUDED.yield_bag_ha,
+    ndvi_avg = EXCLUDED.ndvi_avg,
+    rainfall_total = EXCLUDED.rainfall_total,
+    efficiency_index = EXCLUDED.efficiency_index
+RETURNING xmax = 0
+"""
+_PRODUCTIVITY_FIELDS = """
+SELECT DISTINCT seasons.field_id FROM seasons
+WHERE seasons.id IN (SELECT season_id FROM _load_crop_productivity)
+"""
+
+_SEASON_LABEL = re.compile(r"^\s*(safra|safrinha)\s+(\d{4}|\d{2})(?:\s*/\s*(?:\d{4}|\d{2}))?\s*$", re.IGNORECASE)
+
+
+def season_window(label: str | None) -> tuple[date, date] | None:
+    """Janela de plantio de um rótulo de safra: ``[início, fim)``.
+
+    "Safra 23/24" é a safra de verão plantada no 2º semestre de 2023; "Safrinha 24", a
+    segunda safra plantada no 1º semestre de 2024. Outros rótulos devolvem ``None``.
+    """
+    match = _SEASON_LABEL.match(label or "")
+    if match is None:
+        return None
+    kind, year = match.group(1).lower(), int(match.group(2))
+    year += 2000 if year < 100 else 0
+    if kind == "safra":
+        return date(year, 7, 1), date(year + 1, 1, 1)
+    return date(year, 1, 1), date(year, 7, 1)
+
+
+def _planting_windows(labels: pa.Array) -> tuple[pa.Array, pa.Array]:
+    labels = labels.cast(pa.string())
+    unique = pc.unique(labels)
+    windows = [season_window(label) for label in unique.to_pylist()]
+    positions = pc.index_in(labels, unique)
+    starts = pa.array([window[0] if window else None for window in windows], pa.date32())
+    ends = pa.array([window[1] if window else None for window in windows], pa.date32())
+    return pc.take(starts, positions), pc.take(ends, positions)
+
+
+def _records(columns: list[pa.Array]) -> Iterator[tuple]:
+    return zip(*(column.to_pylist() for column in columns))
+
+
+class ETLLoadService:
+    """Carga em lote de arquivos normalizados via ``COPY`` (asyncpg) com upsert por tabela de staging.
+
+    Os lotes Arrow são lidos do staging Parquet em uma thread e copiados para uma
+    tabela temporária com ``copy_records_to_table``; o upsert na tabela final usa a
+    chave natural de cada tabela (estação + data; safra) em ``ON CONFLICT``, tudo em
+    uma única transação.
+    """
+
+    def __init__(self, db: AsyncSession, etl: ETLService):
+        self.db = db
+        self.etl = etl
+
+    async def load(self, source: Path, target: LoadTarget) -> ETLLoadResponse:
+        started = time.perf_counter()
+        if target == "weather_history":
+            stats = await self._load_weather(source)
+        else:
+            stats = await self._load_productivity(source)
+        return ETLLoadResponse(target=target, elapsed_seconds=round(time.perf_counter() - started, 3), **stats)
+
+    async def _driver_connection(self):
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        return raw.driver_connection
+
+    async def _batches(
+        self, source: Path, required: list[str], optional: list[str], alternatives: list[list[str]] | None = None
+    ):
+        """Lotes do staging; ``alternatives`` lista conjuntos de colunas dos quais ao menos um deve existir."""
+        dataset = await asyncio.to_thread(self.etl.open_staged, source)
+        available = set(dataset.schema.names)
+        missing = [name for name in required if name not in available]
+        if alternatives and not any(available.issuperset(option) for option in alternatives):
+            missing.append(" ou ".join("+".join(option) for option in alternatives))
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Colunas obrigatórias ausentes: {', '.join(missing)}",
+            )
+        columns = [*required, *optional]
+        reader = dataset.to_batches(columns=[name for name in columns if name in available])
+        while (batch := await asyncio.to_thread(next, reader, None)) is not None:
+            yield batch
+
+    async def _copy(self, table: str, columns: list[str], records: Iterator[tuple]) -> None:
+        driver = await self._driver_connection()
+        await driver.copy_records_to_table(table, records=records, columns=columns)
+
+    async def _load_weather(self, source: Path) -> dict[str, int]:
+        # Carga em lote é rara: recarrega o registro para não rejeitar estações recém-criadas.
+        await station_registry.load(self.db)
+        stations = await station_registry.ids(self.db)
+        code_set = pa.array(list(stations), type=pa.string())
+        id_values = pa.array(list(stations.values()), type=pa.int32())
+
+        await self.db.execute(text("LOCK TABLE weather_history IN SHARE ROW EXCLUSIVE MODE"))
+        await self.db.execute(text(_WEATHER_STAGE_DDL))
+        rows_read = rejected = 0
+        async for batch in self._batches(source, ["station_code", "date", "rainfall_mm"], WEATHER_MEASURES[1:]):
+            rows_read += batch.num_rows
+            station_ids = pc.take(id_values, pc.index_in(batch.column("station_code").cast(pa.string()), code_set))
+            # Estação desconhecida ou data não reconhecida no staging: linha rejeitada.
+            known = pc.and_(pc.is_valid(station_ids), pc.is_valid(batch.column("date")))
+            rejected += batch.num_rows - known.true_count
+            batch = batch.filter(known)
+            measures = [
+                batch.column(name) if name in batch.schema.names else pa.nulls(batch.num_rows, pa.float64())
+                for name in WEATHER_MEASURES
+            ]
+            await self._copy(
+                "_load_weather_history",
+                ["station_id", "reading_date", *WEATHER_MEASURES],
+                _records([station_ids.filter(known), batch.column("date"), *measures]),
+            )
+
+        await self.db.execute(text(_WEATHER_PARTITIONS))
+        updated = (await self.db.execute(text(_WEATHER_UPDATE))).rowcount
+        inserted = (await self.db.execute(text(_WEATHER_INSERT))).rowcount
+        rejected += (await self.db.execute(text(_WEATHER_LEFTOVER))).scalar_one()
+        await self.db.commit()
+        return {"rows_read": rows_read, "inserted": inserted, "updated": updated, "rejected": rejected}
+
+    async def _load_productivity(self, source: Path) -> dict[str, int]:
+        await self.db.execute(text("LOCK TABLE crop_productivity IN SHARE ROW EXCLUSIVE MODE"))
+        await self.db.execute(text(_PRODUCTIVITY_STAGE_DDL))
+        rows_read = 0
+        batches = self._batches(
+            source,
+            [],
+            ["season_id", "field_id", "season", *PRODUCTIVITY_MEASURES, *PRODUCTIVITY_ALIASES],
+            alternatives=[["season_id"], ["field_id", "season"]],
+        )
+        async for batch in batches:
+            batch = batch.rename_columns([PRODUCTIVITY_ALIASES.get(name, name) for name in batch.schema.names])
+            names = batch.schema.names
+
+            def column(name: str, type_: pa.DataType) -> pa.Array:
+                return batch.column(name).cast(type_) if name in names else pa.nulls(batch.num_rows, type_)
+
+            if "season" in names:
+                planted_from, planted_until = _planting_windows(batch.column("season"))
+            else:
+                planted_from = planted_until = pa.nulls(batch.num_rows, pa.date32())
+            positions = pa.array(range(rows_read, rows_read + batch.num_rows), pa.int64())
+            rows_read += batch.num_rows
+            await self._copy(
+                "_load_crop_productivity",
+                ["position", "season_id", "field_id", "planted_from", "planted_until", *PRODUCTIVITY_MEASURES],
+                _records(
+                    [
+                        positions,
+                        column("season_id", pa.int32()),
+                        column("field_id", pa.int32()),
+                        planted_from,
+                        planted_until,
+                        *(column(name, pa.float64()) for name in PRODUCTIVITY_MEASURES),
+                    ]
+                ),
+            )
+
+        await self.db.execute(text(_PRODUCTIVITY_RESOLVE))
+        outcomes = (await self.db.execute(text(_PRODUCTIVITY_UPSERT))).scalars().all()
+        inserted = sum(outcomes)
+        updated = len(outcomes) - inserted
+        field_ids = set((await self.db.execute(text(_PRODUCTIVITY_FIELDS))).scalars())
+        await self.db.commit()
+        # Escritas via SQL não disparam os eventos do ORM: invalida as baselines explicitamente.
+        await baseline_cache.invalidate(field_ids)
+        # Rejeitadas: safra não encontrada, medida ausente ou linha substituída por outra da mesma safra.
+        rejected = rows_read - inserted - updated
+        return {"rows_read": rows_read, "inserted": inserted, "updated": updated, "rejected": rejected}
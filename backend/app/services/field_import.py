@@ -0,0 +1,285 @@
+import asyncio
+import codecs
+import json
+import re
+import time
+from typing import Any, BinaryIO, Iterator, NamedTuple
+
+import numpy as np
+import shapely
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas import FieldImportResponse, GeoValidationResult
+from app.services.etl import MAX_REPORTED_ISSUES
+from app.services.tiles import invalidate_tiles
+
+IMPORT_BATCH_SIZE = 2_000
+PARSE_CHUNK_BYTES = 1024 * 1024
+POLYGONAL_TYPE_IDS = (3, 6)  # Polygon, MultiPolygon (shapely.GeometryType)
+FIELD_COLUMNS = ("name", "area_ha", "soil_type", "drainage_class")
+STAGE_COLUMNS = ["position", "name", "area_ha", "soil_type", "drainage_class", "metadata", "wkb"]
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+_STAGE_DDL = """
+CREATE TEMP TABLE _import_fields (
+    position integer, name text, area_ha double precision, soil_type text, drainage_class text,
+    metadata json, wkb bytea
+) ON COMMIT DROP
+"""
+# A geometria chega como WKB 2D já validado; ST_Multi ajusta Polygon à coluna MULTIPOLYGON
+# e a área ausente é calculada no elipsoide (geography).
+_INSERT = """
+INSERT INTO fields (name, area_ha, soil_type, drainage_class, owner_id, metadata, geometry, created_at)
+SELECT
+    s.name,
+    coalesce(s.area_ha, round((ST_Area(s.geom::geography) / 10000)::numeric, 4)::double precision),
+    s.soil_type,
+    s.drainage_class,
+    :owner_id,
+    s.metadata,
+    s.geom,
+    now()
+FROM (SELECT *, ST_Multi(ST_GeomFromWKB(wkb, 4674)) AS geom FROM _import_fields) s
+ORDER BY s.position
+"""
+
+
+class _JSONStream:
+    """Leitor incremental de JSON: decodifica um valor por vez de um arquivo binário."""
+
+    def __init__(self, source: BinaryIO, chunk_size: int):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.source.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.pos :] + self.utf8.decode(chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    def _skip_whitespace(self) -> None:
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return
+
+    def consume(self, char: str) -> bool:
+        self._skip_whitespace()
+        if self.buffer.startswith(char, self.pos):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, char: str) -> None:
+        if not self.consume(char):
+            found = self.buffer[self.pos : self.pos + 20] or "fim do arquivo"
+            raise ValueError(f"esperado '{char}', encontrado '{found}'")
+
+    def value(self) -> Any:
+        return self.raw_value()[0]
+
+    def raw_value(self) -> tuple[Any, str]:
+        """Próximo valor decodificado e o trecho de texto de onde veio."""
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as exc:
+                if self._fill():
+                    continue
+                raise ValueError(exc.msg) from None
+            # Um número no fim do buffer pode continuar no próximo bloco.
+            if end == len(self.buffer) and self._fill():
+                continue
+            start, self.pos = self.pos, end
+            return value, self.buffer[start:end]
+
+
+def iter_features(source: BinaryIO, chunk_size: int = PARSE_CHUNK_BYTES) -> Iterator[tuple[Any, str]]:
+    """Feições de uma FeatureCollection, lidas em blocos: só a feição corrente fica em memória.
+
+    Cada item traz a feição decodificada e o texto JSON original, que o Shapely lê
+    direto (sem reserializar a geometria).
+    """
+    stream = _JSONStream(source, chunk_size)
+    stream.expect("{")
+    if stream.consume("}"):
+        raise ValueError("FeatureCollection sem 'features'")
+    has_features = False
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == "features":
+            has_features = True
+            stream.expect("[")
+            if not stream.consume("]"):
+                while True:
+                    yield stream.raw_value()
+                    if stream.consume("]"):
+                        break
+                    stream.expect(",")
+        else:
+            value = stream.value()
+            if key == "type" and value != "FeatureCollection":
+                raise ValueError("o arquivo não é uma FeatureCollection")
+        if stream.consume("}"):
+            break
+        stream.expect(",")
+    if not has_features:
+        raise ValueError("FeatureCollection sem 'features'")
+
+
+class PreparedBatch(NamedTuple):
+    records: list[tuple]
+    features: int
+    repaired: int
+    rejected: int
+    issues: list[str]
+
+
+def _text(value: Any, size: int) -> str | None:
+    return str(value)[:size] if value not in (None, "") else None
+
+
+def _area(value: Any) -> float | None:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0 else None
+
+
+def _polygonal_parts(geometry: shapely.Geometry) -> shapely.Geometry | None:
+    # make_valid pode devolver GeometryCollection com linhas/pontos do contorno colapsado.
+    parts = shapely.get_parts(shapely.get_parts(geometry))
+    polygons = parts[shapely.get_type_id(parts) == 3]
+    return shapely.multipolygons(polygons) if len(polygons) else None
+
+
+def prepare_batch(features: list[tuple[Any, str]], first_index: int = 0) -> PreparedBatch:
+    """Valida e corrige um lote de feições com as funções vetorizadas do Shapely 2.
+
+    Geometrias inválidas passam por ``make_valid``; vazias, nulas ou não poligonais são
+    rejeitadas. O resultado são registros com a geometria em WKB 2D para o COPY.
+    """
+    # O leitor GeoJSON do GEOS aceita a Feature inteira e devolve a geometria (None se nula).
+    geometries = shapely.from_geojson([raw for _, raw in features], on_invalid="ignore")
+    features = [feature if isinstance(feature, dict) else {} for feature, _ in features]
+    geometries = shapely.force_2d(geometries)
+    polygonal = np.isin(shapely.get_type_id(geometries), POLYGONAL_TYPE_IDS)
+    broken = polygonal & ~shapely.is_valid(geometries)
+    reasons = dict(zip(np.flatnonzero(broken), shapely.is_valid_reason(geometries[broken])))
+    geometries[broken] = shapely.make_valid(geometries[broken])
+    for index in np.flatnonzero(broken & ~np.isin(shapely.get_type_id(geometries), POLYGONAL_TYPE_IDS)):
+        geometries[index] = _polygonal_parts(geometries[index])
+    accepted = polygonal & ~shapely.is_missing(geometries) & ~shapely.is_empty(geometries)
+    wkb = shapely.to_wkb(geometries, include_srid=False)
+
+    records, issues = [], []
+    for index, feature in enumerate(features):
+        position = first_index + index
+        if index in reasons:
+            outcome = "corrigida com make_valid" if accepted[index] else "descartada (sem área após correção)"
+            issues.append(f"Feição {position}: {reasons[index]} — {outcome}")
+        elif not accepted[index]:
+            issues.append(f"Feição {position}: geometria ausente ou não poligonal — descartada")
+        if not accepted[index]:
+            continue
+        properties = feature.get("properties") if isinstance(feature.get("properties"), dict) else {}
+        metadata = {key: value for key, value in properties.items() if key not in FIELD_COLUMNS}
+        if feature.get("id") is not None:
+            metadata.setdefault("feature_id", feature["id"])
+        records.append(
+            (
+                position,
+                _text(properties.get("name"), 128) or f"Talhão importado {position + 1}",
+                _area(properties.get("area_ha")),
+                _text(properties.get("soil_type"), 64),
+                _text(properties.get("drainage_class"), 64),
+                json.dumps(metadata, ensure_ascii=False),
+                wkb[index],
+            )
+        )
+    repaired = sum(1 for index in reasons if accepted[index])
+    return PreparedBatch(records, len(features), repaired, len(features) - len(records), issues)
+
+
+def prepared_batches(source: BinaryIO, batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[PreparedBatch]:
+    batch, first_index = [], 0
+    for feature in iter_features(source):
+        batch.append(feature)
+        if len(batch) == batch_size:
+            yield prepare_batch(batch, first_index)
+            first_index += len(batch)
+            batch = []
+    if batch:
+        yield prepare_batch(batch, first_index)
+
+
+class FieldImportService:
+    """Importação em lote de talhões a partir de uma FeatureCollection GeoJSON.
+
+    O arquivo é lido e validado por lotes em uma thread; cada lote vai ao banco por
+    ``COPY`` (WKB) em uma tabela temporária e entra em ``fields`` com um único
+    ``INSERT ... SELECT`` e um commit.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def import_geojson(
+        self, source: BinaryIO, owner_id: int, batch_size: int = IMPORT_BATCH_SIZE
+    ) -> FieldImportResponse:
+        started = time.perf_counter()
+        batches = prepared_batches(source, batch_size)
+        features = inserted = repaired = rejected = 0
+        issues: list[str] = []
+        try:
+            while True:
+                try:
+                    batch = await asyncio.to_thread(next, batches, None)
+                except ValueError as exc:
+                    detail = f"GeoJSON inválido: {exc}"
+                    if inserted:
+                        detail += f" ({inserted} talhões já importados)"
+                    raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail) from None
+                if batch is None:
+                    break
+                features += batch.features
+                repaired += batch.repaired
+                rejected += batch.rejected
+                issues.extend(batch.issues[: MAX_REPORTED_ISSUES + 1 - len(issues)])
+                if batch.records:
+                    inserted += await self._insert(batch.records, owner_id)
+        finally:
+            # INSERT via SQL não passa pelos eventos do ORM que invalidam os tiles.
+            if inserted:
+                await invalidate_tiles()
+        if len(issues) > MAX_REPORTED_ISSUES:
+            omitted = repaired + rejected - MAX_REPORTED_ISSUES
+            issues = issues[:MAX_REPORTED_ISSUES] + [f"... {omitted} ocorrências adicionais omitidas"]
+        return FieldImportResponse(
+            inserted=inserted,
+            repaired=repaired,
+            rejected=rejected,
+            elapsed_seconds=round(time.perf_counter() - started, 3),
+            validation=GeoValidationResult(
+                features=features, invalid_features=repaired + rejected, suggested_fixes=issues
+            ),
+        )
+
+    async def _insert(self, records: list[tuple], owner_id: int) -> int:
+        await self.db.execute(text(_STAGE_DDL))
+        connection = await self.db.connection()
+        driver = (await connection.get_raw_connection()).driver_connection
+        await driver.copy_records_to_table("_import_fields", records=records, columns=STAGE_COLUMNS)
+        inserted = (await self.db.execute(text(_INSERT), {"owner_id": owner_id})).rowcount
+        await self.db.commit()
+        return inserted
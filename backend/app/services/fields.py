@@ -1,21 +1,187 @@
+import json
+
 from fastapi import HTTPException, status
-from geoalchemy2.shape import to_shape
+from geoalchemy2 import Geography
+from shapely.errors import ShapelyError
 from shapely.geometry import mapping, shape
-from sqlalchemy import select
+from sqlalchemy import Integer, any_, cast, func, literal, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, defer
+
+from app.models import Field, FieldLayer, FieldWeatherStation, WeatherStation
+from app.models.field import NEAREST_STATIONS
+from app.schemas import FieldLayerSchema, FieldSchema, NearestStationResponse
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 10_000
+MAX_NEAREST_STATIONS = 20
+FIELD_SRID = 4674
 
-from app.models import Field, FieldLayer
-from app.schemas import FieldLayerSchema, FieldSchema
+# Página inteira serializada pelo PostGIS como FeatureCollection: uma consulta, sem
+# conversão de geometria nem montagem de objetos em Python.
+_GEOJSON_PAGE = text(
+    """
+    WITH page AS (
+        SELECT id, name, area_ha, soil_type, drainage_class, created_at, geometry
+        FROM fields
+        WHERE id > :after_id
+        ORDER BY id
+        LIMIT :limit
+    )
+    SELECT
+        json_build_object(
+            'type', 'FeatureCollection',
+            'features', coalesce(
+                json_agg(
+                    json_build_object(
+                        'type', 'Feature',
+                        'id', p.id,
+                        'geometry', ST_AsGeoJSON(p.geometry)::json,
+                        'properties', json_build_object(
+                            'name', p.name,
+                            'area_ha', p.area_ha,
+                            'soil_type', p.soil_type,
+                            'drainage_class', p.drainage_class,
+                            'created_at', p.created_at,
+                            'layers', coalesce(l.layers, '[]'::json)
+                        )
+                    )
+                    ORDER BY p.id
+                ),
+                '[]'::json
+            )
+        )::text AS body,
+        count(*) AS total,
+        max(p.id) AS last_id
+    FROM page p
+    LEFT JOIN (
+        SELECT field_id, json_agg(
+            json_build_object('id', id, 'layer_type', layer_type, 'stats', stats, 'raster_url', raster_url)
+            ORDER BY id
+        ) AS layers
+        FROM field_layers
+        WHERE field_id IN (SELECT id FROM page)
+        GROUP BY field_id
+    ) l ON l.field_id = p.id
+    """
+)
 
 
 class FieldService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def list_fields(self) -> list[FieldSchema]:
-        result = await self.db.execute(select(Field))
-        fields = result.scalars().all()
-        return [self._to_schema(field) for field in fields]
+    async def list_fields(
+        self, after_id: int | None = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> tuple[list[FieldSchema], int | None]:
+        """Página de talhões por keyset (``id > after_id``) e o cursor da próxima página.
+
+        Camadas vêm de um único SELECT ... WHERE field_id = ANY(:ids) por página (o selectinload
+        quebraria páginas grandes em lotes de 500 ids) e a geometria já chega como GeoJSON do
+        PostGIS, sem passar pelo Shapely.
+        """
+        return await self._page(after_id, limit)
+
+    async def fields_in_bbox(
+        self, bbox: tuple[float, float, float, float], after_id: int | None = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> tuple[list[FieldSchema], int | None]:
+        """Talhões que intersectam ``(min_lon, min_lat, max_lon, max_lat)``, paginados como ``list_fields``."""
+        return await self._page(after_id, limit, func.ST_MakeEnvelope(*bbox, FIELD_SRID))
+
+    async def fields_intersecting(
+        self, geometry: dict, after_id: int | None = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> tuple[list[FieldSchema], int | None]:
+        """Talhões que intersectam uma geometria GeoJSON (em SIRGAS 2000 / WGS 84)."""
+        try:
+            area = shape(geometry)
+        except (AttributeError, KeyError, TypeError, ValueError, ShapelyError):
+            area = None
+        if area is None or area.is_empty or not area.is_valid:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Geometria inválida")
+        return await self._page(after_id, limit, func.ST_GeomFromText(area.wkt, FIELD_SRID))
+
+    async def _page(self, after_id: int | None, limit: int, area=None) -> tuple[list[FieldSchema], int | None]:
+        stmt = (
+            select(Field, func.ST_AsGeoJSON(Field.geometry))
+            .options(defer(Field.geometry), defer(Field.field_metadata))
+            .where(Field.id > (after_id or 0))
+            .order_by(Field.id)
+            .limit(limit)
+        )
+        if area is not None:
+            # ST_Intersects filtra primeiro por && no índice GiST de fields.geometry.
+            stmt = stmt.where(func.ST_Intersects(Field.geometry, area))
+        rows = (await self.db.execute(stmt)).all()
+        layers: dict[int, list[FieldLayer]] = {field.id: [] for field, _ in rows}
+        if layers:
+            # Um único parâmetro array (= ANY): a página inteira em uma consulta, seja qual for o tamanho.
+            layer_stmt = (
+                select(FieldLayer)
+                .where(FieldLayer.field_id == any_(literal(list(layers), ARRAY(Integer))))
+                .order_by(FieldLayer.id)
+            )
+            for layer in (await self.db.execute(layer_stmt)).scalars():
+                layers[layer.field_id].append(layer)
+        fields = [self._to_schema(field, json.loads(geometry), layers[field.id]) for field, geometry in rows]
+        next_cursor = rows[-1][0].id if len(rows) == limit else None
+        return fields, next_cursor
+
+    async def nearest_stations(self, field_id: int, k: int = NEAREST_STATIONS) -> list[NearestStationResponse]:
+        """Estações mais próximas do centroide do talhão, da mais próxima para a mais distante.
+
+        Até ``NEAREST_STATIONS`` vêm do mapeamento pré-calculado em ``field_weather_stations``;
+        acima disso a busca KNN (``<->``) é feita na hora.
+        """
+        if k <= NEAREST_STATIONS:
+            stmt = (
+                select(WeatherStation, FieldWeatherStation.rank, FieldWeatherStation.distance_m)
+                .join(FieldWeatherStation, FieldWeatherStation.station_id == WeatherStation.id)
+                .where(FieldWeatherStation.field_id == field_id, FieldWeatherStation.rank <= k)
+                .order_by(FieldWeatherStation.rank)
+            )
+            rows = (await self.db.execute(stmt)).all()
+        else:
+            centroid = (
+                select(cast(func.ST_Centroid(func.ST_Transform(Field.geometry, 4326)), Geography(srid=4326)))
+                .where(Field.id == field_id)
+                .scalar_subquery()
+            )
+            ranked = (
+                select(WeatherStation, func.ST_Distance(WeatherStation.location, centroid).label("distance_m"))
+                .where(centroid.is_not(None))
+                .order_by(WeatherStation.location.op("<->")(centroid))
+                .limit(k)
+                .subquery()
+            )
+            station = aliased(WeatherStation, ranked)
+            stmt = select(
+                station,
+                func.row_number().over(order_by=(ranked.c.distance_m, ranked.c.id)),
+                ranked.c.distance_m,
+            ).order_by(ranked.c.distance_m, ranked.c.id)
+            rows = (await self.db.execute(stmt)).all()
+        if not rows and await self.db.scalar(select(Field.id).where(Field.id == field_id)) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Talhão não encontrado")
+        return [
+            NearestStationResponse(
+                code=station.code,
+                name=station.name,
+                latitude=station.latitude,
+                longitude=station.longitude,
+                elevation=station.elevation,
+                rank=rank,
+                distance_km=round(distance_m / 1000, 3),
+            )
+            for station, rank, distance_m in rows
+        ]
+
+    async def list_fields_geojson(
+        self, after_id: int | None = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> tuple[str, int | None]:
+        """Mesma página de ``list_fields`` como FeatureCollection já serializada."""
+        row = (await self.db.execute(_GEOJSON_PAGE, {"after_id": after_id or 0, "limit": limit})).one()
+        return row.body, row.last_id if row.total == limit else None
 
     async def create(self, payload: FieldSchema, owner_id: int) -> FieldSchema:
         geometry = shape(payload.geometry)
@@ -30,7 +196,7 @@ class FieldService:
         self.db.add(field)
         await self.db.commit()
         await self.db.refresh(field)
-        return self._to_schema(field)
+        return self._to_schema(field, mapping(geometry), [])
 
     async def add_layer(self, field_id: int, payload: FieldLayerSchema) -> FieldLayerSchema:
         field = await self.db.get(Field, field_id)
@@ -47,9 +213,7 @@ class FieldService:
         await self.db.refresh(layer)
         return FieldLayerSchema.model_validate(layer)
 
-    def _to_schema(self, field: Field) -> FieldSchema:
-        geometry = mapping(to_shape(field.geometry))
-        layers = [FieldLayerSchema.model_validate(layer) for layer in field.layers]
+    def _to_schema(self, field: Field, geometry: dict, layers: list[FieldLayer]) -> FieldSchema:
         return FieldSchema(
             id=field.id,
             name=field.name,
@@ -57,6 +221,6 @@ class FieldService:
             soil_type=field.soil_type,
             drainage_class=field.drainage_class,
             geometry=geometry,
-            layers=layers,
+            layers=[FieldLayerSchema.model_validate(layer) for layer in layers],
             created_at=field.created_at,
         )
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, column, func, insert, select, true, values
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.cache import Fetcher, StaleWhileRevalidateCache
+from app.core.config import get_settings
+from app.core.redis import redis_client
+from app.db.session import get_session
+from app.models import PriceQuote
+from app.schemas import PriceCandle, PriceHistoryResponse, PriceInterval, PricePoint
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# O poller grava a cada ``price_poll_seconds``; o snapshot lido do banco fica em cache
+# (TTL suave curto) para que as requisições não consultem o banco a cada chamada.
+CACHE_TTL = 30
+CACHE_HARD_TTL = settings.price_poll_seconds * 3
+MAX_HISTORY_POINTS = 10_000
+DEFAULT_HISTORY_DAYS = 30
+INTERVALS: dict[str, timedelta] = {"1h": timedelta(hours=1), "1d": timedelta(days=1), "1w": timedelta(weeks=1)}
+# Origem dos buckets do date_bin: segunda-feira, para candles semanais alinhados.
+BUCKET_ORIGIN = datetime(2000, 1, 3, tzinfo=timezone.utc)
+
+
+async def fetch_cepea_soybean_price() -> Optional[dict]:
+    """
+    Busca preço de soja do CEPEA/ESALQ.
+    Em produção, implementar chamada real à API.
+    """
+    try:
+        # Mock - implementar chamada real
+        return {
+            "price_r_sc": 185.50,
+            "price_r_t": 3108.33,  # 185.50 * 16.67
+            "source": "CEPEA/ESALQ",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception:
+        logger.warning("Erro ao buscar CEPEA", exc_info=True)
+        return None
+
+
+async def fetch_b3_contract_price() -> Optional[dict]:
+    """
+    Busca preço de contrato da B3.
+    """
+    try:
+        # Mock - implementar chamada real
+        return {
+            "price_r_sc": 188.20,
+            "maturity": "2025-03",
+            "source": "B3",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception:
+        logger.warning("Erro ao buscar B3", exc_info=True)
+        return None
+
+
+async def fetch_fertilizer_price() -> Optional[dict]:
+    """
+    Busca preço de fertilizante.
+    """
+    try:
+        # Mock - implementar chamada real
+        return {
+            "price_r_t": 3450.00,
+            "source": "ANDA",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception:
+        logger.warning("Erro ao buscar fertilizante", exc_info=True)
+        return None
+
+
+async def fetch_freight_price() -> Optional[dict]:
+    """
+    Busca preço de frete.
+    """
+    try:
+        # Mock - implementar chamada real
+        return {
+            "price_r_t": 85.00,
+            "route": "Fazenda → Port",
+            "distance_km": 120,
+            "source": "AgroFreight API",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception:
+        logger.warning("Erro ao buscar frete", exc_info=True)
+        return None
+
+
+# Commodity → função de coleta na fonte externa (na ordem em que aparecem na resposta).
+PRICE_SOURCES: dict[str, Fetcher] = {
+    "soybean_spot": fetch_cepea_soybean_price,
+    "soybean_contract": fetch_b3_contract_price,
+    "fertilizer_npk": fetch_fertilizer_price,
+    "freight": fetch_freight_price,
+}
+# Commodity → (campo da cotação usado como preço, unidade).
+PRICE_FIELDS = {
+    "soybean_spot": ("price_r_sc", "R$/sc"),
+    "soybean_contract": ("price_r_sc", "R$/sc"),
+    "fertilizer_npk": ("price_r_t", "R$/t"),
+    "freight": ("price_r_t", "R$/t"),
+}
+
+price_cache = StaleWhileRevalidateCache("prices", redis_client, soft_ttl=CACHE_TTL, hard_ttl=CACHE_HARD_TTL)
+
+
+def _quote_ts(quote: dict) -> datetime:
+    ts = datetime.fromisoformat(quote["timestamp"])
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _quote_row(commodity: str, quote: dict) -> dict:
+    """Linha de ``price_quotes`` para a cotação; ``ValueError`` se faltar ou for inválido algum campo."""
+    field, unit = PRICE_FIELDS[commodity]
+    try:
+        price = quote[field]
+        if isinstance(price, bool) or not isinstance(price, (int, float)):
+            raise ValueError(f"preço não numérico em '{field}': {price!r}")
+        source = quote["source"]
+        if not isinstance(source, str) or not source:
+            raise ValueError(f"fonte inválida: {source!r}")
+        ts = _quote_ts(quote)
+    except KeyError as exc:
+        raise ValueError(f"campo ausente: {exc}") from None
+    except TypeError as exc:
+        raise ValueError(str(exc)) from None
+    return {"commodity": commodity, "ts": ts, "price": float(price), "unit": unit, "source": source, "payload": quote}
+
+
+class PriceService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def poll(self) -> dict[str, dict]:
+        """Busca todas as fontes em paralelo e acrescenta as cotações ao histórico."""
+        commodities = list(PRICE_SOURCES)
+        fetched = await asyncio.gather(*(PRICE_SOURCES[name]() for name in commodities), return_exceptions=True)
+        rows = []
+        quotes = {}
+        for commodity, quote in zip(commodities, fetched):
+            if isinstance(quote, Exception) or not quote:
+                logger.warning(f"Falha ao coletar preço de {commodity}: {quote}")
+                continue
+            # Uma cotação malformada é descartada sem impedir a gravação das demais.
+            try:
+                rows.append(_quote_row(commodity, quote))
+            except ValueError as exc:
+                logger.warning(f"Cotação inválida de {commodity} descartada: {exc}")
+                continue
+            quotes[commodity] = quote
+        if rows:
+            await self.db.execute(insert(PriceQuote), rows)
+            await self.db.commit()
+        return quotes
+
+    async def latest(self) -> dict[str, dict]:
+        """Última cotação de cada commodity (``LATERAL ... LIMIT 1`` sobre o índice ``(commodity, ts)``)."""
+        names = values(column("commodity", String), name="names").data([(name,) for name in PRICE_SOURCES])
+        last = (
+            select(PriceQuote)
+            .where(PriceQuote.commodity == names.c.commodity)
+            .order_by(PriceQuote.ts.desc())
+            .limit(1)
+            .lateral("last")
+        )
+        stmt = select(aliased(PriceQuote, last)).select_from(names).join(last, true())
+        return {quote.commodity: quote.payload for quote in (await self.db.execute(stmt)).scalars()}
+
+    async def history(
+        self,
+        commodity: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        interval: PriceInterval | None = None,
+    ) -> PriceHistoryResponse:
+        if commodity not in PRICE_FIELDS:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Commodity desconhecida")
+        end = end or datetime.now(timezone.utc)
+        start = start or end - timedelta(days=DEFAULT_HISTORY_DAYS)
+        window = (PriceQuote.commodity == commodity, PriceQuote.ts >= start, PriceQuote.ts < end)
+        response = PriceHistoryResponse(
+            commodity=commodity, unit=PRICE_FIELDS[commodity][1], start=start, end=end, interval=interval
+        )
+        if interval is None:
+            stmt = select(PriceQuote.ts, PriceQuote.price).where(*window).order_by(PriceQuote.ts).limit(MAX_HISTORY_POINTS)
+            response.points = [PricePoint(ts=ts, price=price) for ts, price in (await self.db.execute(stmt)).all()]
+            return response
+
+        bucket = func.date_bin(INTERVALS[interval], PriceQuote.ts, BUCKET_ORIGIN).label("bucket")
+        stmt = (
+            select(
+                bucket,
+                array_agg(aggregate_order_by(PriceQuote.price, PriceQuote.ts))[1].label("open"),
+                func.max(PriceQuote.price).label("high"),
+                func.min(PriceQuote.price).label("low"),
+                array_agg(aggregate_order_by(PriceQuote.price, PriceQuote.ts.desc()))[1].label("close"),
+                func.count().label("samples"),
+            )
+            .where(*window)
+            .group_by(bucket)
+            .order_by(bucket)
+            .limit(MAX_HISTORY_POINTS)
+        )
+        response.candles = [PriceCandle(**row._mapping) for row in (await self.db.execute(stmt)).all()]
+        return response
+
+
+async def _latest_from_store() -> dict[str, dict]:
+    async with get_session() as db:
+        return await PriceService(db).latest()
+
+
+async def current_prices() -> dict[str, dict]:
+    """Snapshot das últimas cotações, servido do cache SWR (renovado a partir do banco)."""
+    return (await price_cache.get_many({"latest": _latest_from_store})).get("latest", {})
+
+
+async def publish_latest(quotes: dict[str, dict]) -> None:
+    """Após uma coleta, renova o snapshot em cache para todos os workers."""
+    if quotes:
+        await price_cache.refresh({"latest": _latest_from_store})
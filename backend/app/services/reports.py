@@ -1,50 +1,195 @@
 import asyncio
 import io
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
 
+import redis
+from fastapi import HTTPException, status
+from kombu.exceptions import OperationalError
+from redis.exceptions import RedisError
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-from sqlalchemy import select
+from sqlalchemy import Row, and_, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
-from app.models import ReportJob, ReportType
+from app.core.config import get_settings
+from app.core.metrics import REPORT_QUEUE_DEPTH
+from app.models import ReportJob, ReportJobStatus, ReportType
 from app.schemas import ReportRequest, ReportStatus
+from app.tasks.simulations import celery_app
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+RENDER_TASK = "reports.render"
+MAX_ERROR_LENGTH = 2000
+
+
+def render_pdf(report_type: ReportType, params: dict | None) -> bytes:
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    c.drawString(72, 800, f"Relatório {report_type.value.upper()}")
+    c.drawString(72, 780, f"Gerado em: {datetime.utcnow().isoformat()}Z")
+    if params:
+        y = 760
+        for key, value in params.items():
+            c.drawString(72, y, f"{key}: {value}")
+            y -= 16
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+_broker: redis.Redis | None = None
+
+
+def queue_depth() -> float:
+    """Mensagens na fila de relatórios do broker (lista no Redis), lida a cada coleta de ``/metrics``."""
+    global _broker
+    if _broker is None:
+        _broker = redis.Redis.from_url(settings.redis_url, socket_timeout=0.2, socket_connect_timeout=0.2)
+    try:
+        return float(_broker.llen(settings.report_queue))
+    except (RedisError, OSError):
+        return float("nan")
+
+
+REPORT_QUEUE_DEPTH.set_function(queue_depth)
 
 
 class ReportService:
+    """Jobs de relatório: a API registra e publica na fila Celery; o worker gera o PDF."""
+
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def enqueue(self, payload: ReportRequest) -> ReportStatus:
-        job = ReportJob(report_type=payload.report_type, payload=payload.params)
-        self.db.add(job)
+    async def enqueue(self, payload: ReportRequest, idempotency_key: str | None = None) -> ReportStatus:
+        key = idempotency_key or payload.idempotency_key
+        # Sem chave o INSERT sempre entra (NULLs não conflitam na constraint única).
+        stmt = (
+            insert(ReportJob)
+            .values(
+                report_type=payload.report_type, payload=payload.params, idempotency_key=key, dispatched_at=func.now()
+            )
+            .on_conflict_do_nothing(index_elements=[ReportJob.idempotency_key])
+            .returning(ReportJob.id)
+        )
+        job_id = (await self.db.execute(stmt)).scalar_one_or_none()
+        if job_id is None:
+            job = (await self.db.execute(select(ReportJob).where(ReportJob.idempotency_key == key))).scalar_one()
+            if job.report_type != payload.report_type or job.payload != payload.params:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT, detail="Idempotency-Key já usada em outro pedido de relatório"
+                )
+            if job.status != ReportJobStatus.failed.value:
+                await self.db.commit()
+                return ReportStatus.model_validate(job)
+            # Reenvio de um pedido que falhou: o mesmo job volta para a fila com um novo ciclo
+            # de tentativas e sem o erro anterior.
+            job.status = ReportJobStatus.pending.value
+            job.attempts = 0
+            job.error = None
+            job.started_at = job.finished_at = None
+            job.dispatched_at = func.now()
+            job_id = job.id
         await self.db.commit()
-        await self.db.refresh(job)
-        asyncio.create_task(self._render_pdf(job.id, payload))
-        return ReportStatus.model_validate(job)
+        await self._dispatch(job_id)
+        return ReportStatus.model_validate(await self.db.get(ReportJob, job_id))
 
-    async def _render_pdf(self, job_id: int, payload: ReportRequest) -> None:
-        buf = io.BytesIO()
-        c = canvas.Canvas(buf, pagesize=A4)
-        c.drawString(72, 800, f"Relatório {payload.report_type.value.upper()}")
-        c.drawString(72, 780, f"Gerado em: {datetime.utcnow().isoformat()}Z")
-        if payload.params:
-            y = 760
-            for key, value in payload.params.items():
-                c.drawString(72, y, f"{key}: {value}")
-                y -= 16
-        c.showPage()
-        c.save()
-        buf.seek(0)
-        async with get_session() as session:
-            job = await session.get(ReportJob, job_id)
-            job.status = "finished"
-            job.file_url = f"s3://siad-reports/{job_id}.pdf"
-            job.finished_at = datetime.utcnow()
-            await session.commit()
+    async def _dispatch(self, job_id: int) -> None:
+        try:
+            # A publicação é síncrona (com novas tentativas do kombu): fica fora do event loop.
+            await asyncio.to_thread(celery_app.send_task, RENDER_TASK, args=[job_id])
+        except OperationalError as exc:
+            logger.error(f"Falha ao publicar o relatório {job_id} na fila: {exc}")
+            await self.db.execute(
+                update(ReportJob)
+                .where(ReportJob.id == job_id)
+                .values(status=ReportJobStatus.failed.value, error=f"Fila indisponível: {exc}", finished_at=func.now())
+            )
+            await self.db.commit()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Fila de relatórios indisponível, tente novamente"
+            )
+
+    async def get_job(self, job_id: int) -> ReportStatus:
+        job = await self.db.get(ReportJob, job_id)
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Relatório não encontrado")
+        return ReportStatus.model_validate(job)
 
     async def list_jobs(self) -> list[ReportStatus]:
         result = await self.db.execute(select(ReportJob).order_by(ReportJob.created_at.desc()))
         jobs = result.scalars().all()
         return [ReportStatus.model_validate(job) for job in jobs]
+
+    async def claim(self, job_id: int, stale_after: timedelta) -> Row | None:
+        """Passa o job para ``running`` e devolve tipo, parâmetros e o número desta tentativa.
+
+        Devolve ``None`` se não for a vez do job.
+
+        Mensagens repetidas de um job já em execução, concluído ou com falha definitiva
+        são ignoradas; um ``running`` mais antigo que ``stale_after`` (worker perdido) é retomado.
+        """
+        stmt = (
+            update(ReportJob)
+            .where(
+                ReportJob.id == job_id,
+                or_(
+                    ReportJob.status == ReportJobStatus.pending.value,
+                    and_(
+                        ReportJob.status == ReportJobStatus.running.value,
+                        ReportJob.started_at < func.now() - stale_after,
+                    ),
+                ),
+            )
+            .values(status=ReportJobStatus.running.value, started_at=func.now(), attempts=ReportJob.attempts + 1)
+            .returning(ReportJob.report_type, ReportJob.payload, ReportJob.attempts)
+        )
+        row = (await self.db.execute(stmt)).one_or_none()
+        await self.db.commit()
+        return row
+
+    async def finish(self, job_id: int, file_url: str) -> None:
+        await self.db.execute(
+            update(ReportJob)
+            .where(ReportJob.id == job_id)
+            .values(status=ReportJobStatus.finished.value, file_url=file_url, error=None, finished_at=func.now())
+        )
+        await self.db.commit()
+
+    async def fail(self, job_id: int, error: BaseException, final: bool) -> None:
+        """Registra o erro; o job volta a ``pending`` (nova tentativa já agendada) ou fica ``failed``."""
+        values = {"error": f"{type(error).__name__}: {error}"[:MAX_ERROR_LENGTH]}
+        if final:
+            values.update(status=ReportJobStatus.failed.value, finished_at=func.now())
+        else:
+            values.update(status=ReportJobStatus.pending.value, dispatched_at=func.now())
+        await self.db.execute(update(ReportJob).where(ReportJob.id == job_id).values(**values))
+        await self.db.commit()
+
+    async def redispatch_stalled(self, pending_after: timedelta | None, running_after: timedelta) -> list[int]:
+        """Marca como republicados e devolve os jobs cuja mensagem não pode mais estar pendente.
+
+        ``running`` cuja execução passou de ``running_after`` teve o worker perdido. ``pending``
+        só entra com ``pending_after`` (o chamador o omite enquanto a fila do broker não está
+        vazia): sem publicação há mais que esse tempo, que cobre o maior backoff de nova tentativa.
+        """
+        stalled = and_(
+            ReportJob.status == ReportJobStatus.running.value,
+            ReportJob.started_at < func.now() - running_after,
+            ReportJob.dispatched_at < func.now() - running_after,
+        )
+        if pending_after is not None:
+            stalled = or_(
+                stalled,
+                and_(
+                    ReportJob.status == ReportJobStatus.pending.value,
+                    ReportJob.dispatched_at < func.now() - pending_after,
+                ),
+            )
+        stmt = update(ReportJob).where(stalled).values(dispatched_at=func.now()).returning(ReportJob.id)
+        job_ids = list((await self.db.execute(stmt)).scalars())
+        await self.db.commit()
+        return job_ids
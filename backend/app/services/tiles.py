@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+
+from fastapi import HTTPException, status
+from redis.exceptions import RedisError
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.metrics import CACHE_HITS, CACHE_MISSES
+from app.core.redis import binary_redis_client, redis_client
+from app.models import Field, FieldLayer
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MAX_TILE_ZOOM = 22
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+# Largura do mundo em EPSG:3857 (m): a tolerância de simplificação é ~1 pixel do tile.
+WEB_MERCATOR_WIDTH = 40075016.68557849
+VERSION_KEY = "tiles:fields:version"
+VERSION_TTL = 5
+
+# Geometrias recortadas ao tile e simplificadas conforme o zoom; o filtro && usa o
+# índice GiST de fields.geometry. Atributos de FieldLayer.stats vão como jsonb, cujas
+# chaves o ST_AsMVT grava como propriedades da feição (ex.: ndvi_avg).
+_TILE_QUERY = text(
+    """
+    WITH bounds AS (
+        SELECT
+            ST_TileEnvelope(:z, :x, :y) AS tile,
+            ST_Transform(ST_TileEnvelope(:z, :x, :y, margin => :margin), 4674) AS search
+    ),
+    features AS (
+        SELECT
+            f.id,
+            f.name,
+            f.area_ha,
+            f.soil_type,
+            f.drainage_class,
+            coalesce(l.stats, '{}'::jsonb) AS stats,
+            ST_AsMVTGeom(
+                ST_Simplify(ST_Transform(f.geometry, 3857), :tolerance, true), b.tile, :extent, :buffer, true
+            ) AS geom
+        FROM fields f
+        CROSS JOIN bounds b
+        LEFT JOIN LATERAL (
+            SELECT jsonb_object_agg(sel.layer_type || '_' || sel.stat_key, latest.stats -> sel.stat_key) AS stats
+            FROM unnest(CAST(:layer_types AS text[]), CAST(:stat_keys AS text[])) AS sel(layer_type, stat_key)
+            JOIN LATERAL (
+                SELECT fl.stats::jsonb AS stats
+                FROM field_layers fl
+                WHERE fl.field_id = f.id AND fl.layer_type = sel.layer_type
+                ORDER BY fl.created_at DESC, fl.id DESC
+                LIMIT 1
+            ) latest ON latest.stats ? sel.stat_key
+        ) l ON true
+        WHERE f.geometry && b.search
+    )
+    SELECT ST_AsMVT(features.*, 'fields', :extent, 'geom', 'id') FROM features WHERE geom IS NOT NULL
+    """
+)
+
+_version: tuple[float, int | None] = (0.0, None)
+# Incrementado a cada invalidação: leituras do Redis iniciadas antes dela não são memorizadas.
+_generation = 0
+_pending_bumps: set[asyncio.Task] = set()
+
+
+async def tile_version() -> int | None:
+    """Versão dos dados de talhões (contador no Redis, memorizado por ``VERSION_TTL`` s).
+
+    ``None`` quando o Redis está indisponível ou há um INCR pendente: os tiles são gerados
+    sem cache até a nova versão estar gravada.
+    """
+    global _version
+    if _pending_bumps:
+        return None
+    checked_at, version = _version
+    if time.monotonic() - checked_at < VERSION_TTL:
+        return version
+    generation = _generation
+    try:
+        version = int(await redis_client.get(VERSION_KEY) or 0)
+    except (RedisError, OSError) as exc:
+        logger.warning(f"Versão dos tiles indisponível no Redis: {exc}")
+        version = None
+    if generation != _generation or _pending_bumps:
+        return None
+    _version = (time.monotonic(), version)
+    return version
+
+
+def _forget_version() -> None:
+    global _version, _generation
+    _generation += 1
+    _version = (0.0, None)
+
+
+async def _bump_version() -> None:
+    try:
+        await redis_client.incr(VERSION_KEY)
+    except (RedisError, OSError) as exc:
+        logger.warning(f"Falha ao invalidar tiles de talhões: {exc}")
+
+
+async def invalidate_tiles() -> None:
+    """Invalida os tiles após escritas em ``fields`` feitas fora do ORM (ex.: importação em lote)."""
+    await _bump_version()
+    _forget_version()
+
+
+class FieldTileService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def render(self, z: int, x: int, y: int) -> bytes:
+        if x >= 2**z or y >= 2**z:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tile fora da grade")
+        selected = [(layer, key) for layer, keys in settings.field_tile_stats.items() for key in keys]
+        params = {
+            "z": z,
+            "x": x,
+            "y": y,
+            "margin": TILE_BUFFER / TILE_EXTENT,
+            "tolerance": WEB_MERCATOR_WIDTH / 2**z / TILE_EXTENT,
+            "extent": TILE_EXTENT,
+            "buffer": TILE_BUFFER,
+            "layer_types": [layer for layer, _ in selected],
+            "stat_keys": [key for _, key in selected],
+        }
+        tile = (await self.db.execute(_TILE_QUERY, params)).scalar_one()
+        return bytes(tile or b"")
+
+    async def get(self, z: int, x: int, y: int, version: int | None) -> bytes:
+        """Tile em cache para a versão atual dos dados ou gerado pelo PostGIS."""
+        if version is None:
+            return await self.render(z, x, y)
+        key = f"tile:fields:{version}:{z}:{x}:{y}"
+        try:
+            cached = await binary_redis_client.get(key)
+        except (RedisError, OSError):
+            cached = None
+        if cached is not None:
+            CACHE_HITS.labels("field_tiles", "redis").inc()
+            return cached
+        CACHE_MISSES.labels("field_tiles").inc()
+        tile = await self.render(z, x, y)
+        try:
+            await binary_redis_client.set(key, tile, ex=settings.field_tile_cache_ttl)
+        except (RedisError, OSError) as exc:
+            logger.warning(f"Falha ao gravar tile {z}/{x}/{y} no cache: {exc}")
+        return tile
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_tile_changes(session: Session, _flush_context) -> None:
+    if any(isinstance(obj, (Field, FieldLayer)) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["field_tiles_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_tiles(session: Session) -> None:
+    # Nova versão: chaves antigas deixam de ser lidas e expiram pelo TTL. Até o INCR
+    # terminar, tile_version devolve None (sem cache), para não servir a versão antiga.
+    if not session.info.pop("field_tiles_changed", False):
+        return
+    _forget_version()
+    try:
+        task = asyncio.get_running_loop().create_task(_bump_version())
+    except RuntimeError:
+        return
+    _pending_bumps.add(task)
+    task.add_done_callback(_bump_done)
+
+
+def _bump_done(task: asyncio.Task) -> None:
+    _pending_bumps.discard(task)
+    _forget_version()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tile_changes(session: Session) -> None:
+    session.info.pop("field_tiles_changed", None)
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.security import create_refresh_token, decode_token, hash_token
+from app.models import RefreshToken, User
+
+settings = get_settings()
+
+
+class RefreshTokenService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def issue(self, user_id: int) -> str:
+        """Cria um refresh token e registra seu digest na sessão (o commit fica com quem chama)."""
+        token = create_refresh_token(str(user_id))
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.refresh_token_expire_minutes)
+        self.db.add(RefreshToken(user_id=user_id, token_hash=hash_token(token), expires_at=expires_at))
+        return token
+
+    async def rotate(self, token: str) -> tuple[User, str]:
+        """Revoga o token apresentado e emite o sucessor na mesma transação.
+
+        O UPDATE condicional garante uso único: entre requisições concorrentes com o
+        mesmo token, apenas uma encontra a linha ainda válida.
+        """
+        claims = decode_token(token, refresh=True)
+        if not claims or claims.get("type") != "refresh":
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh inválido")
+        now = datetime.now(timezone.utc)
+        stmt = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == hash_token(token),
+                RefreshToken.revoked.is_(False),
+                RefreshToken.expires_at > now,
+            )
+            .values(revoked=True, expires_at=now)
+            .returning(RefreshToken.user_id)
+        )
+        user_id = (await self.db.execute(stmt)).scalar_one_or_none()
+        if user_id is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh inválido")
+        user = await self.db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
+        if not user.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuário inativo")
+        successor = self.issue(user.id)
+        await self.db.commit()
+        return user, successor
+
+    async def prune(self, batch_size: int | None = None) -> int:
+        """Remove tokens expirados ou revogados em lotes, um commit por lote."""
+        batch_size = batch_size or settings.refresh_token_prune_batch
+        total = 0
+        while True:
+            batch = (
+                select(RefreshToken.id)
+                .where(RefreshToken.expires_at < func.now())
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            deleted = (await self.db.execute(delete(RefreshToken).where(RefreshToken.id.in_(batch)))).rowcount
+            await self.db.commit()
+            total += deleted
+            if deleted < batch_size:
+                return total
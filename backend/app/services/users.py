@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import TwoTierCache
+from app.core.redis import redis_client
+from app.models import User, UserRole
+
+# Snapshot do usuário autenticado por id (sem o hash da senha), invalidado em escritas
+# de User pelos eventos de sessão abaixo. Outros processos enxergam a mudança quando a
+# entrada local expira, por isso ``local_ttl`` é curto.
+principal_cache = TwoTierCache("principals", redis_client, maxsize=10_000, local_ttl=15, redis_ttl=300)
+_pending_invalidations: set[asyncio.Task] = set()
+
+
+def _snapshot(user: User) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "full_name": user.full_name,
+        "role": user.role.value,
+        "locale": user.locale,
+        "preferences": user.preferences,
+        "is_active": user.is_active,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+        "updated_at": user.updated_at.isoformat() if user.updated_at else None,
+    }
+
+
+def _from_snapshot(data: dict) -> User:
+    return User(
+        **{
+            **data,
+            "role": UserRole(data["role"]),
+            "created_at": datetime.fromisoformat(data["created_at"]) if data["created_at"] else None,
+            "updated_at": datetime.fromisoformat(data["updated_at"]) if data["updated_at"] else None,
+        }
+    )
+
+
+async def get_principal(db: AsyncSession, user_id: int) -> User | None:
+    """Usuário autenticado, do cache quando possível.
+
+    Em um acerto devolve uma instância transitória (fora da sessão): serve para leitura;
+    para alterar o usuário, carregue-o com ``db.get``.
+    """
+    cached = (await principal_cache.get_many([user_id])).get(user_id)
+    if cached is not None:
+        return _from_snapshot(cached)
+    user = await db.get(User, user_id)
+    if user is not None:
+        await principal_cache.set_many({user_id: _snapshot(user)})
+    return user
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_principal_invalidations(session: Session, _flush_context) -> None:
+    user_ids = {obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)}
+    user_ids.discard(None)
+    if user_ids:
+        session.info.setdefault("principal_invalidations", set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_principal_invalidations(session: Session) -> None:
+    user_ids = session.info.pop("principal_invalidations", None)
+    if not user_ids:
+        return
+    principal_cache.invalidate_local(user_ids)
+    try:
+        task = asyncio.get_running_loop().create_task(principal_cache.invalidate(user_ids))
+    except RuntimeError:
+        return
+    _pending_invalidations.add(task)
+    task.add_done_callback(_pending_invalidations.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_invalidations(session: Session) -> None:
+    session.info.pop("principal_invalidations", None)
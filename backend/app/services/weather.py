@@ -1,47 +1,266 @@
-from datetime import datetime
-from typing import Sequence
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, NamedTuple
 
-from sqlalchemy import Select, func, select
+from fastapi import HTTPException, status
+from sqlalchemy import and_, event, func, literal, or_, select, true, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 
-from app.models import WeatherForecast, WeatherHistory, WeatherStation
+from app.models import (
+    FieldWeatherStation,
+    WeatherForecast,
+    WeatherHistory,
+    WeatherRainfallMonthly,
+    WeatherRainfallSeasonal,
+    WeatherStation,
+)
 from app.schemas.weather import ForecastResponse, ForecastDay, HistoryResponse, StationResponse, WeatherSummary
 
+logger = logging.getLogger(__name__)
+
+FORECAST_DAYS = 10
+HISTORY_DAYS = 30
+MAX_BATCH_STATIONS = 100
+
+SEASON_START_MONTH = 7
+
+DateRange = tuple[date | None, date | None]
+
+
+class RollupRanges(NamedTuple):
+    """Janela decomposta em intervalos semiabertos ``[início, fim)``; ``None`` = sem limite."""
+
+    days: list[DateRange]
+    months: list[DateRange]
+    seasons: list[DateRange]
+
+
+def _month_floor(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _month_ceil(day: date) -> date:
+    if day.day == 1:
+        return day
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _season_floor(day: date) -> date:
+    year = day.year if day.month >= SEASON_START_MONTH else day.year - 1
+    return date(year, SEASON_START_MONTH, 1)
+
+
+def _season_ceil(day: date) -> date:
+    floor = _season_floor(day)
+    return floor if floor == day else floor.replace(year=floor.year + 1)
+
+
+def rollup_ranges(start: date | None, end: date | None) -> RollupRanges:
+    """Cobre ``[start, end]`` (inclusivo) com o menor número de buckets: anos-safra
+    completos, meses completos nas bordas e leituras diárias só nos meses parciais."""
+    stop = end + timedelta(days=1) if end else None
+    if start and stop and start >= stop:
+        return RollupRanges([], [], [])
+    month_lo = _month_ceil(start) if start else None
+    month_hi = _month_floor(stop) if stop else None
+    if month_lo and month_hi and month_lo >= month_hi:
+        return RollupRanges([(start, stop)], [], [])
+    days = []
+    if start and start < month_lo:
+        days.append((start, month_lo))
+    if stop and month_hi < stop:
+        days.append((month_hi, stop))
+
+    season_lo = _season_ceil(month_lo) if month_lo else None
+    season_hi = _season_floor(month_hi) if month_hi else None
+    if season_lo and season_hi and season_lo >= season_hi:
+        return RollupRanges(days, [(month_lo, month_hi)], [])
+    months = []
+    if month_lo and month_lo < season_lo:
+        months.append((month_lo, season_lo))
+    if month_hi and season_hi < month_hi:
+        months.append((season_hi, month_hi))
+    return RollupRanges(days, months, [(season_lo, season_hi)])
+
+
+def _in_ranges(column, ranges: list[DateRange]):
+    clauses = []
+    for lo, hi in ranges:
+        bounds = [column >= lo] if lo else []
+        if hi:
+            bounds.append(column < hi)
+        clauses.append(and_(true(), *bounds))
+    return or_(*clauses)
+
+
+class StationRegistry:
+    """Mapa ``code → id`` das estações mantido em memória por processo.
+
+    A lista de estações é pequena e quase estática: é carregada na inicialização e
+    recarregada quando uma escrita em ``WeatherStation`` é confirmada neste processo,
+    quando expira (``ttl``, cobre alterações feitas por outros processos) ou quando um
+    código desconhecido é consultado (no máximo uma vez a cada ``miss_interval``).
+    """
+
+    def __init__(self, ttl: float = 300, miss_interval: float = 5):
+        self.ttl = ttl
+        self.miss_interval = miss_interval
+        self._ids: dict[str, int] = {}
+        self._stations: list[StationResponse] = []
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    async def load(self, db: AsyncSession) -> None:
+        rows = (await db.execute(select(WeatherStation).order_by(WeatherStation.id))).scalars().all()
+        self._ids = {row.code: row.id for row in rows}
+        self._stations = [
+            StationResponse(
+                code=row.code,
+                name=row.name,
+                latitude=row.latitude,
+                longitude=row.longitude,
+                elevation=row.elevation,
+            )
+            for row in rows
+        ]
+        self._loaded_at = time.monotonic()
+
+    async def _refresh(self, db: AsyncSession, force: bool = False) -> None:
+        loaded_at = self._loaded_at
+        async with self._lock:
+            # Outra corrotina pode ter recarregado enquanto esperávamos o lock.
+            if self._loaded_at != loaded_at and not self.stale:
+                return
+            if force or self.stale:
+                await self.load(db)
+
+    async def stations(self, db: AsyncSession) -> list[StationResponse]:
+        if self.stale:
+            await self._refresh(db)
+        return self._stations
+
+    async def ids(self, db: AsyncSession) -> dict[str, int]:
+        if self.stale:
+            await self._refresh(db)
+        return self._ids
+
+    async def resolve(self, db: AsyncSession, code: str) -> int:
+        return (await self.resolve_many(db, [code]))[code]
+
+    async def resolve_many(self, db: AsyncSession, codes: Iterable[str]) -> dict[str, int]:
+        codes = list(dict.fromkeys(codes))
+        ids = await self.ids(db)
+        if any(code not in ids for code in codes) and time.monotonic() - (self._loaded_at or 0) > self.miss_interval:
+            await self._refresh(db, force=True)
+            ids = self._ids
+        unknown = [code for code in codes if code not in ids]
+        if unknown:
+            detail = "Estação não encontrada" if len(codes) == 1 else f"Estações não encontradas: {', '.join(unknown)}"
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+        return {code: ids[code] for code in codes}
+
+
+station_registry = StationRegistry()
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_station_changes(session: Session, _flush_context) -> None:
+    if any(isinstance(obj, WeatherStation) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["stations_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_station_registry(session: Session) -> None:
+    if session.info.pop("stations_changed", False):
+        station_registry.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_station_changes(session: Session) -> None:
+    session.info.pop("stations_changed", None)
+
+
+async def warm_station_registry(db: AsyncSession) -> None:
+    try:
+        await station_registry.load(db)
+    except Exception:  # noqa: BLE001
+        logger.warning("Falha ao carregar o registro de estações; será carregado sob demanda", exc_info=True)
+
 
 class WeatherService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def list_stations(self) -> list[StationResponse]:
-        stmt = select(WeatherStation)
-        result = await self.db.execute(stmt)
-        stations = result.scalars().all()
-        return [
-            StationResponse(
-                code=s.code,
-                name=s.name,
-                latitude=s.latitude,
-                longitude=s.longitude,
-                elevation=s.elevation,
-            )
-            for s in stations
-        ]
+        return await station_registry.stations(self.db)
 
     async def get_forecast(self, station_code: str) -> ForecastResponse:
-        station_stmt: Select[tuple[WeatherStation]] = select(WeatherStation).where(WeatherStation.code == station_code)
-        station = (await self.db.execute(station_stmt)).scalar_one()
-
+        station_id = await station_registry.resolve(self.db, station_code)
         stmt = (
             select(WeatherForecast)
-            .where(WeatherForecast.station_id == station.id)
+            .where(WeatherForecast.station_id == station_id)
+            .order_by(WeatherForecast.forecast_date)
+            .limit(FORECAST_DAYS)
+        )
+        forecasts = (await self.db.execute(stmt)).scalars().all()
+        return self._forecast_response(station_code, forecasts, datetime.utcnow())
+
+    async def get_field_forecast(self, field_id: int) -> ForecastResponse:
+        """Previsão da estação mais próxima do talhão (``field_weather_stations``, rank 1) em uma consulta."""
+        stmt = (
+            select(WeatherStation.code, WeatherForecast)
+            .select_from(FieldWeatherStation)
+            .join(WeatherStation, WeatherStation.id == FieldWeatherStation.station_id)
+            .outerjoin(WeatherForecast, WeatherForecast.station_id == FieldWeatherStation.station_id)
+            .where(FieldWeatherStation.field_id == field_id, FieldWeatherStation.rank == 1)
             .order_by(WeatherForecast.forecast_date)
-            .limit(10)
+            .limit(FORECAST_DAYS)
         )
-        result = await self.db.execute(stmt)
-        forecasts: Sequence[WeatherForecast] = result.scalars().all()
+        rows = (await self.db.execute(stmt)).all()
+        if not rows:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Nenhuma estação associada ao talhão"
+            )
+        forecasts = [forecast for _, forecast in rows if forecast is not None]
+        return self._forecast_response(rows[0].code, forecasts, datetime.utcnow())
+
+    async def get_forecasts(self, station_codes: list[str]) -> list[ForecastResponse]:
+        """Previsões de várias estações em uma consulta (``row_number`` limita os dias por estação)."""
+        ids = await station_registry.resolve_many(self.db, station_codes)
+        ranked = select(
+            WeatherForecast,
+            func.row_number()
+            .over(partition_by=WeatherForecast.station_id, order_by=WeatherForecast.forecast_date)
+            .label("day_rank"),
+        ).where(WeatherForecast.station_id.in_(ids.values())).subquery()
+        forecast = aliased(WeatherForecast, ranked)
+        stmt = (
+            select(forecast)
+            .where(ranked.c.day_rank <= FORECAST_DAYS)
+            .order_by(ranked.c.station_id, ranked.c.forecast_date)
+        )
+        by_station = defaultdict(list)
+        for row in (await self.db.execute(stmt)).scalars():
+            by_station[row.station_id].append(row)
+        generated_at = datetime.utcnow()
+        return [self._forecast_response(code, by_station[station_id], generated_at) for code, station_id in ids.items()]
+
+    @staticmethod
+    def _forecast_response(station_code: str, forecasts, generated_at: datetime) -> ForecastResponse:
         return ForecastResponse(
-            station_code=station.code,
-            generated_at=datetime.utcnow(),
+            station_code=station_code,
+            generated_at=generated_at,
             forecast=[
                 ForecastDay(
                     date=fc.forecast_date,
@@ -55,22 +274,51 @@ class WeatherService:
         )
 
     async def get_history(self, station_code: str) -> HistoryResponse:
-        station = (
-            await self.db.execute(select(WeatherStation).where(WeatherStation.code == station_code))
-        ).scalar_one()
+        station_id = await station_registry.resolve(self.db, station_code)
         stmt = (
             select(WeatherHistory)
-            .where(WeatherHistory.station_id == station.id)
+            .where(WeatherHistory.station_id == station_id)
             .order_by(WeatherHistory.reading_date.desc())
-            .limit(30)
+            .limit(HISTORY_DAYS)
         )
-        result = await self.db.execute(stmt)
-        history = result.scalars().all()
+        history = (await self.db.execute(stmt)).scalars().all()
+        return self._history_response(station_code, history)
+
+    async def get_histories(self, station_codes: list[str]) -> list[HistoryResponse]:
+        """Histórico recente de várias estações em uma consulta.
+
+        Usa ``JOIN LATERAL ... LIMIT`` por estação em vez de ``row_number``: o histórico é
+        longo e particionado, e o top-N por estação sai direto do índice
+        ``(station_id, reading_date DESC)`` sem numerar toda a série.
+        """
+        ids = await station_registry.resolve_many(self.db, station_codes)
+        recent = (
+            select(WeatherHistory)
+            .where(WeatherHistory.station_id == WeatherStation.id)
+            .order_by(WeatherHistory.reading_date.desc())
+            .limit(HISTORY_DAYS)
+            .lateral("recent")
+        )
+        history = aliased(WeatherHistory, recent)
+        stmt = (
+            select(history)
+            .select_from(WeatherStation)
+            .join(recent, true())
+            .where(WeatherStation.id.in_(ids.values()))
+            .order_by(recent.c.station_id, recent.c.reading_date.desc())
+        )
+        by_station = defaultdict(list)
+        for row in (await self.db.execute(stmt)).scalars():
+            by_station[row.station_id].append(row)
+        return [self._history_response(code, by_station[station_id]) for code, station_id in ids.items()]
+
+    @staticmethod
+    def _history_response(station_code: str, history) -> HistoryResponse:
         return HistoryResponse(
-            station_code=station.code,
+            station_code=station_code,
             history=[
                 WeatherSummary(
-                    station=station.code,
+                    station=station_code,
                     rainfall_mm=row.rainfall_mm,
                     temperature_c=row.temperature_c,
                     eto=row.eto,
@@ -80,14 +328,62 @@ class WeatherService:
             ],
         )
 
-    async def get_rainfall_stats(self, station_code: str) -> dict[str, float]:
-        station = (
-            await self.db.execute(select(WeatherStation).where(WeatherStation.code == station_code))
-        ).scalar_one()
+    async def get_rainfall_stats(
+        self, station_code: str, start: date | None = None, end: date | None = None
+    ) -> dict[str, float]:
+        """Estatísticas de chuva em ``[start, end]`` combinando buckets dos rollups em uma consulta."""
+        station_id = await station_registry.resolve(self.db, station_code)
+        ranges = rollup_ranges(start, end)
+        parts = []
+        if ranges.days:
+            parts.append(
+                select(
+                    func.sum(WeatherHistory.rainfall_mm).label("rainfall_sum"),
+                    func.count().label("reading_count"),
+                    func.count().filter(WeatherHistory.rainfall_mm > 0).label("rainy_days"),
+                ).where(WeatherHistory.station_id == station_id, _in_ranges(WeatherHistory.reading_date, ranges.days))
+            )
+        for model, bucket, bucket_ranges in (
+            (WeatherRainfallMonthly, WeatherRainfallMonthly.month, ranges.months),
+            (WeatherRainfallSeasonal, WeatherRainfallSeasonal.season_start, ranges.seasons),
+        ):
+            if bucket_ranges:
+                parts.append(
+                    select(
+                        func.sum(model.rainfall_sum).label("rainfall_sum"),
+                        func.sum(model.reading_count).label("reading_count"),
+                        func.sum(model.rainy_days).label("rainy_days"),
+                    ).where(model.station_id == station_id, _in_ranges(bucket, bucket_ranges))
+                )
+        if not parts:
+            return {"avg": 0.0, "total": 0.0, "readings": 0, "rainy_days": 0}
+        combined = union_all(*parts).subquery()
+        stmt = select(
+            func.coalesce(func.sum(combined.c.rainfall_sum), literal(0.0)),
+            func.coalesce(func.sum(combined.c.reading_count), literal(0)),
+            func.coalesce(func.sum(combined.c.rainy_days), literal(0)),
+        )
+        total, readings, rainy_days = (await self.db.execute(stmt)).one()
+        readings = int(readings)
+        return {
+            "avg": float(total) / readings if readings else 0.0,
+            "total": float(total),
+            "readings": readings,
+            "rainy_days": int(rainy_days),
+        }
+
+    async def get_rainfall_monthly(
+        self, station_code: str, start: date | None = None, end: date | None = None
+    ) -> list[tuple[date, float, int]]:
+        """Série mensal (mês, total, dias com chuva) lida direto do rollup mensal."""
+        station_id = await station_registry.resolve(self.db, station_code)
         stmt = (
-            select(func.avg(WeatherHistory.rainfall_mm), func.sum(WeatherHistory.rainfall_mm))
-            .where(WeatherHistory.station_id == station.id)
+            select(WeatherRainfallMonthly.month, WeatherRainfallMonthly.rainfall_sum, WeatherRainfallMonthly.rainy_days)
+            .where(WeatherRainfallMonthly.station_id == station_id, WeatherRainfallMonthly.reading_count > 0)
+            .order_by(WeatherRainfallMonthly.month)
         )
-        result = await self.db.execute(stmt)
-        avg_rain, total_rain = result.one()
-        return {"avg": float(avg_rain or 0), "total": float(total_rain or 0)}
+        if start:
+            stmt = stmt.where(WeatherRainfallMonthly.month >= _month_floor(start))
+        if end:
+            stmt = stmt.where(WeatherRainfallMonthly.month <= end)
+        return [tuple(row) for row in (await self.db.execute(stmt)).all()]
@@ -0,0 +1,240 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import rasterio
+import shapely
+from fastapi import HTTPException, status
+from rasterio.errors import RasterioIOError, WindowError
+from rasterio.features import geometry_mask, geometry_window
+from rasterio.warp import transform_bounds, transform_geom
+from shapely.geometry import mapping
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models import Field, FieldLayer
+from app.schemas import ZonalStatsResponse
+from app.services.tiles import invalidate_tiles
+
+settings = get_settings()
+
+FIELD_CRS = "EPSG:4674"
+ZONAL_SOURCE = "zonal_stats"
+# Faixa fixa do histograma por tipo de camada (comparável entre talhões); demais usam min/max do talhão.
+HISTOGRAM_RANGES = {"ndvi": (-1.0, 1.0)}
+SPATIAL_BAND_DEGREES = 0.02
+
+FieldGeometry = tuple[int, bytes]
+
+
+def _summarize(data: np.ma.MaskedArray, percentiles: list[float], bins: int, value_range) -> dict:
+    values = data.compressed().astype(np.float64)
+    quantiles = np.percentile(values, percentiles)
+    counts, edges = np.histogram(values, bins=bins, range=value_range or (values.min(), values.max()))
+    stats = {
+        "avg": float(data.mean()),
+        "min": float(data.min()),
+        "max": float(data.max()),
+        "std": float(data.std()),
+        **{f"p{percentile:g}": float(value) for percentile, value in zip(percentiles, quantiles)},
+    }
+    stats = {key: round(value, 4) for key, value in stats.items()}
+    stats["count"] = int(values.size)
+    stats["histogram"] = {"edges": [round(float(edge), 4) for edge in edges], "counts": counts.tolist()}
+    return stats
+
+
+def zonal_stats(
+    raster_path: str,
+    fields: list[FieldGeometry],
+    band: int = 1,
+    percentiles: list[float] | None = None,
+    bins: int = 10,
+    value_range: tuple[float, float] | None = None,
+) -> list[tuple[int, dict | None]]:
+    """Estatísticas de ``band`` dentro de cada talhão (geometria WKB em SIRGAS 2000).
+
+    Para cada talhão lê só a janela do raster que cobre o seu bbox (em um COG, apenas os
+    blocos internos correspondentes) e descarta os pixels fora do polígono e os de nodata
+    com um array mascarado. Talhões fora do raster ou sem pixels válidos voltam com ``None``.
+    """
+    percentiles = percentiles or [10, 25, 50, 75, 90]
+    results = []
+    with rasterio.open(raster_path) as src:
+        for field_id, wkb in fields:
+            geometry = transform_geom(FIELD_CRS, src.crs, mapping(shapely.from_wkb(wkb)))
+            try:
+                window = geometry_window(src, [geometry])
+            except WindowError:
+                results.append((field_id, None))
+                continue
+            data = np.ma.masked_invalid(src.read(band, window=window, masked=True))
+            transform = src.window_transform(window)
+            outside = geometry_mask([geometry], out_shape=data.shape, transform=transform)
+            if outside.all():
+                # Talhão menor que um pixel: considera os pixels tocados pelo contorno.
+                outside = geometry_mask([geometry], out_shape=data.shape, transform=transform, all_touched=True)
+            data = np.ma.masked_array(data, mask=np.ma.getmaskarray(data) | outside)
+            results.append((field_id, _summarize(data, percentiles, bins, value_range) if data.count() else None))
+    return results
+
+
+def resolve_raster_path(raster_path: str | Path) -> Path:
+    """Caminho do raster dentro de ``RASTER_STORAGE_DIR`` (relativo a ela ou absoluto).
+
+    Recusa caminhos virtuais do GDAL (``/vsicurl/``, ``/vsis3/`` ...), URLs e qualquer
+    caminho que, resolvido, saia da raiz configurada.
+    """
+    raw = str(raster_path)
+    root = Path(settings.raster_storage_dir).resolve()
+    if raw.startswith("/vsi") or "://" in raw:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Raster deve ser um arquivo local")
+    resolved = (root / raw).resolve()
+    if not resolved.is_relative_to(root):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Raster fora do diretório de rasters"
+        )
+    return resolved
+
+
+def relative_raster_path(raster_path: Path) -> str:
+    """Caminho do raster relativo a ``RASTER_STORAGE_DIR``: o que é exposto em ``FieldLayer.raster_url``.
+
+    Rasters fora da raiz (ex.: via CLI) precisam de um ``raster_url`` explícito.
+    """
+    resolved = Path(raster_path).resolve()
+    root = Path(settings.raster_storage_dir).resolve()
+    if not resolved.is_relative_to(root):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Informe raster_url para rasters fora do diretório de rasters",
+        )
+    return resolved.relative_to(root).as_posix()
+
+
+_executor: Executor | None = None
+
+
+def _get_executor() -> Executor:
+    """Pool do processo, criado no primeiro uso e reaproveitado entre execuções.
+
+    Processos daemon (ex.: worker prefork do Celery) não podem criar filhos: nesse caso
+    usa threads, já que o GDAL e o NumPy liberam o GIL na leitura e na maior parte do cálculo.
+    """
+    global _executor
+    if _executor is None:
+        if multiprocessing.current_process().daemon:
+            _executor = ThreadPoolExecutor(max_workers=settings.zonal_workers, thread_name_prefix="zonal")
+        else:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.zonal_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+    return _executor
+
+
+class ZonalStatsService:
+    """Calcula estatísticas zonais de um raster local (GeoTIFF/COG) e grava em ``FieldLayer.stats``."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def compute(
+        self,
+        raster_path: Path,
+        layer_type: str,
+        field_ids: list[int] | None = None,
+        band: int = 1,
+        raster_url: str | None = None,
+    ) -> ZonalStatsResponse:
+        started = time.perf_counter()
+        try:
+            with rasterio.open(raster_path) as src:
+                bounds = transform_bounds(src.crs, FIELD_CRS, *src.bounds)
+                band_count = src.count
+        except RasterioIOError as exc:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Raster inválido: {exc}")
+        if not 1 <= band <= band_count:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Banda inexistente: {band}")
+
+        # Só os talhões que intersectam a extensão do raster (índice GiST de fields.geometry).
+        stmt = select(Field.id, func.ST_AsBinary(Field.geometry)).where(
+            func.ST_Intersects(Field.geometry, func.ST_MakeEnvelope(*bounds, 4674))
+        )
+        if field_ids is not None:
+            stmt = stmt.where(Field.id.in_(field_ids))
+        fields = [(field_id, bytes(wkb)) for field_id, wkb in (await self.db.execute(stmt.order_by(Field.id))).all()]
+        await self.db.commit()
+
+        # Sem raster_url, grava o caminho relativo: o absoluto do worker não sai para os clientes.
+        raster_url = raster_url or relative_raster_path(raster_path)
+        results = await self._run(str(raster_path), fields, band, layer_type)
+        computed = {field_id: stats for field_id, stats in results if stats is not None}
+        await self._write(computed, layer_type, raster_url, band)
+        return ZonalStatsResponse(
+            layer_type=layer_type,
+            raster_url=raster_url,
+            fields=len(fields),
+            computed=len(computed),
+            skipped=len(fields) - len(computed),
+            elapsed_seconds=round(time.perf_counter() - started, 3),
+        )
+
+    @staticmethod
+    async def _run(
+        raster_path: str, fields: list[FieldGeometry], band: int, layer_type: str
+    ) -> list[tuple[int, dict | None]]:
+        if not fields:
+            return []
+        # Talhões vizinhos no mesmo lote reaproveitam os blocos no cache do GDAL do processo;
+        # vários lotes por processo equilibram talhões grandes e pequenos.
+        centroids = shapely.centroid(shapely.from_wkb([wkb for _, wkb in fields]))
+        order = np.lexsort((shapely.get_x(centroids), np.floor(shapely.get_y(centroids) / SPATIAL_BAND_DEGREES)))
+        fields = [fields[index] for index in order]
+        size = max(len(fields) // (settings.zonal_workers * 4), 1)
+        chunks = [fields[start : start + size] for start in range(0, len(fields), size)]
+        options = {
+            "band": band,
+            "percentiles": settings.zonal_percentiles,
+            "bins": settings.zonal_histogram_bins,
+            "value_range": HISTOGRAM_RANGES.get(layer_type),
+        }
+        loop = asyncio.get_running_loop()
+        pool = _get_executor()
+        parts = await asyncio.gather(
+            *(loop.run_in_executor(pool, partial(zonal_stats, raster_path, chunk, **options)) for chunk in chunks)
+        )
+        return [result for part in parts for result in part]
+
+    async def _write(self, computed: dict[int, dict], layer_type: str, raster_url: str, band: int) -> None:
+        """Atualiza a camada do talhão para este raster ou cria uma nova, em um único commit."""
+        existing = (
+            await self.db.execute(
+                select(FieldLayer).where(FieldLayer.layer_type == layer_type, FieldLayer.raster_url == raster_url)
+            )
+        ).scalars()
+        layers = {layer.field_id: layer for layer in existing if layer.field_id in computed}
+        computed_at = datetime.now(timezone.utc).isoformat()
+        for field_id, stats in computed.items():
+            stats = {**stats, "band": band, "computed_at": computed_at}
+            layer = layers.get(field_id)
+            if layer is None:
+                self.db.add(
+                    FieldLayer(
+                        field_id=field_id, layer_type=layer_type, source=ZONAL_SOURCE, stats=stats, raster_url=raster_url
+                    )
+                )
+            else:
+                layer.stats = stats
+                layer.source = ZONAL_SOURCE
+        await self.db.commit()
+        # O commit já agenda a invalidação dos tiles; aguardá-la evita perdê-la em
+        # processos de vida curta (tarefa Celery, CLI).
+        if computed:
+            await invalidate_tiles()
+
@@ -0,0 +1,19 @@
+import asyncio
+
+from app.db.session import engine, get_session
+from app.services.tokens import RefreshTokenService
+from app.tasks.simulations import celery_app
+
+
+async def _prune() -> int:
+    try:
+        async with get_session() as db:
+            return await RefreshTokenService(db).prune()
+    finally:
+        # Cada execução roda em um event loop novo: conexões do pool não podem ser reaproveitadas.
+        await engine.dispose()
+
+
+@celery_app.task(name="auth.prune_refresh_tokens", ignore_result=True)
+def prune_refresh_tokens() -> int:
+    return asyncio.run(_prune())
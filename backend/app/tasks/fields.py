@@ -0,0 +1,32 @@
+import asyncio
+
+from app.core.redis import redis_client
+from app.db.session import engine, get_session
+from app.services.zonal import ZonalStatsService, resolve_raster_path
+from app.tasks.simulations import celery_app
+
+
+async def _zonal_stats(
+    raster_path: str, layer_type: str, field_ids: list[int] | None, band: int, raster_url: str | None
+) -> dict:
+    try:
+        async with get_session() as db:
+            result = await ZonalStatsService(db).compute(
+                resolve_raster_path(raster_path), layer_type, field_ids, band, raster_url
+            )
+        return result.model_dump()
+    finally:
+        # Cada execução roda em um event loop novo: conexões do pool não podem ser reaproveitadas.
+        await engine.dispose()
+        await redis_client.connection_pool.disconnect()
+
+
+@celery_app.task(name="fields.zonal_stats")
+def compute_zonal_stats(
+    raster_path: str,
+    layer_type: str,
+    field_ids: list[int] | None = None,
+    band: int = 1,
+    raster_url: str | None = None,
+) -> dict:
+    return asyncio.run(_zonal_stats(raster_path, layer_type, field_ids, band, raster_url))
@@ -0,0 +1,23 @@
+import asyncio
+
+from app.core.redis import redis_client
+from app.db.session import engine, get_session
+from app.services.prices import PriceService, publish_latest
+from app.tasks.simulations import celery_app
+
+
+async def _poll() -> list[str]:
+    try:
+        async with get_session() as db:
+            quotes = await PriceService(db).poll()
+        await publish_latest(quotes)
+        return list(quotes)
+    finally:
+        # Cada execução roda em um event loop novo: conexões do pool não podem ser reaproveitadas.
+        await engine.dispose()
+        await redis_client.connection_pool.disconnect()
+
+
+@celery_app.task(name="prices.poll", ignore_result=True)
+def poll_prices() -> list[str]:
+    return asyncio.run(_poll())
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from app.core.config import get_settings
+from app.core.metrics import REPORT_JOBS, REPORT_RENDER_SECONDS
+from app.db.session import engine, get_session
+from app.services.reports import RENDER_TASK, ReportService, queue_depth, render_pdf
+from app.tasks.simulations import celery_app
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# O limite rígido encerra a execução; depois dele (com folga) um job "running" é tido como perdido.
+HARD_TIME_LIMIT = settings.report_time_limit + 30
+STALE_AFTER = timedelta(seconds=HARD_TIME_LIMIT + 30)
+# Um "pending" sem publicação há mais que o maior backoff (mais a folga) perdeu a mensagem.
+PENDING_STALE_AFTER = STALE_AFTER + timedelta(seconds=settings.report_retry_backoff * 2**settings.report_max_retries)
+
+
+def retry_countdown(attempt: int) -> int:
+    return settings.report_retry_backoff * 2 ** (attempt - 1)
+
+
+async def _render(job_id: int) -> int | None:
+    """Gera o relatório; devolve o número da tentativa quando uma nova deve ser agendada.
+
+    A última tentativa é decidida pelo contador ``attempts`` do banco, que também conta
+    execuções vindas de mensagens republicadas.
+    """
+    try:
+        async with get_session() as db:
+            service = ReportService(db)
+            job = await service.claim(job_id, STALE_AFTER)
+            if job is None:
+                return None
+            final_attempt = job.attempts > settings.report_max_retries
+            started = time.perf_counter()
+            try:
+                render_pdf(job.report_type, job.payload)
+            except Exception as exc:
+                logger.warning(f"Falha ao gerar o relatório {job_id} (tentativa {job.attempts})", exc_info=True)
+                await service.fail(job_id, exc, final_attempt)
+                REPORT_JOBS.labels("failed" if final_attempt else "retried").inc()
+                return None if final_attempt else job.attempts
+            REPORT_RENDER_SECONDS.labels(job.report_type.value).observe(time.perf_counter() - started)
+            await service.finish(job_id, f"s3://siad-reports/{job_id}.pdf")
+            REPORT_JOBS.labels("finished").inc()
+            return None
+    finally:
+        # Cada execução roda em um event loop novo: conexões do pool não podem ser reaproveitadas.
+        await engine.dispose()
+
+
+@celery_app.task(
+    bind=True,
+    name=RENDER_TASK,
+    ignore_result=True,
+    # Confirmada só ao terminar: a mensagem sobrevive a um reinício do worker no meio da geração.
+    acks_late=True,
+    # O limite de tentativas vem de ``attempts`` no banco (ver ``_render``).
+    max_retries=None,
+    soft_time_limit=settings.report_time_limit,
+    time_limit=HARD_TIME_LIMIT,
+)
+def render_report(self, job_id: int) -> None:
+    attempt = asyncio.run(_render(job_id))
+    if attempt is not None:
+        raise self.retry(countdown=retry_countdown(attempt))
+
+
+async def _stalled(include_pending: bool) -> list[int]:
+    try:
+        async with get_session() as db:
+            return await ReportService(db).redispatch_stalled(
+                PENDING_STALE_AFTER if include_pending else None, STALE_AFTER
+            )
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task(name="reports.requeue_stalled", ignore_result=True)
+def requeue_stalled_reports() -> int:
+    """Republica jobs cuja mensagem se perdeu; duplicatas são descartadas em ``claim``.
+
+    Com mensagens na fila do broker um ``pending`` antigo pode só estar esperando a vez:
+    nesse caso apenas execuções perdidas (``running``) são republicadas.
+    """
+    job_ids = asyncio.run(_stalled(include_pending=queue_depth() == 0))
+    for job_id in job_ids:
+        render_report.delay(job_id)
+    if job_ids:
+        logger.warning(f"Relatórios republicados na fila: {job_ids}")
+    return len(job_ids)
@@ -1,33 +1,78 @@
+import logging
+import os
+
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess, start_http_server
 
 from app.core.config import get_settings
+from app.services.analytics import monte_carlo_margin
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 celery_app = Celery(
     "siad",
     broker=settings.redis_url,
     backend=settings.redis_url,
+    include=["app.tasks.prices", "app.tasks.auth", "app.tasks.fields", "app.tasks.reports"],
 )
+celery_app.conf.beat_schedule = {
+    "poll-prices": {
+        "task": "prices.poll",
+        "schedule": settings.price_poll_seconds,
+        # Uma coleta atrasada não deve se acumular com a próxima.
+        "options": {"expires": settings.price_poll_seconds},
+    },
+    "prune-refresh-tokens": {
+        "task": "auth.prune_refresh_tokens",
+        "schedule": settings.refresh_token_prune_seconds,
+        "options": {"expires": settings.refresh_token_prune_seconds},
+    },
+    "requeue-stalled-reports": {
+        "task": "reports.requeue_stalled",
+        "schedule": settings.report_time_limit,
+        "options": {"expires": settings.report_time_limit},
+    },
+}
+# Relatórios em fila própria: um worker dedicado (``-Q reports -c N``) limita quantos rodam juntos.
+celery_app.conf.task_routes = {"reports.render": {"queue": settings.report_queue}}
+
+
+@worker_init.connect
+def _serve_metrics(**_kwargs) -> None:
+    """Métricas do worker em ``WORKER_METRICS_PORT``.
+
+    No pool prefork as tarefas rodam em processos filhos: com ``PROMETHEUS_MULTIPROC_DIR``
+    definido, o servidor agrega os valores gravados por cada um deles.
+    """
+    if settings.worker_metrics_port is None:
+        return
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    try:
+        start_http_server(settings.worker_metrics_port, registry=registry)
+    except OSError as exc:
+        logger.warning(f"Métricas do worker indisponíveis na porta {settings.worker_metrics_port}: {exc}")
+
+
+@worker_process_shutdown.connect
+def _release_metrics(pid: int | None = None, **_kwargs) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
 
 
 @celery_app.task
 def run_monte_carlo(payload: dict) -> dict:
-    import random
-
     iterations = payload.get("iterations", 1000)
     bag_price = payload.get("bag_price", 150)
-    rainfall_pct = payload.get("rainfall_delta_pct", 0)
-    input_pct = payload.get("input_cost_delta_pct", 0)
-    results = []
-    for _ in range(iterations):
-        rainfall = 1 + random.gauss(rainfall_pct / 100, 0.05)
-        inputs = 1 - random.gauss(input_pct / 100, 0.05)
-        yield_base = random.uniform(45, 65)
-        margin_base = random.uniform(1400, 2200)
-        results.append({
-            "yield": yield_base * rainfall,
-            "margin": margin_base * rainfall * inputs,
-        })
-    avg_yield = sum(r["yield"] for r in results) / iterations
-    avg_margin = sum(r["margin"] for r in results) / iterations
-    return {"yield": round(avg_yield, 2), "margin": round(avg_margin, 2), "bag_price": bag_price}
+    stats = monte_carlo_margin(
+        iterations,
+        rainfall_delta_pct=payload.get("rainfall_delta_pct", 0),
+        input_cost_delta_pct=payload.get("input_cost_delta_pct", 0),
+        seed=payload.get("seed"),
+    )
+    result = {key: round(value, 4 if key == "prob_negative_margin" else 2) for key, value in stats.items()}
+    result["bag_price"] = bag_price
+    return result
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.core import security
+from app.core.cache import TwoTierCache
+from app.core.security import PasswordHasher, create_access_token, decode_token
+from app.main import app
+from app.models import User, UserRole
+from app.schemas import TokenPayload
+from app.services import users as users_service
+
+client = TestClient(app)
+
+
+class _UserSession:
+    def __init__(self, user):
+        self.user = user
+        self.gets = 0
+
+    async def get(self, _model, user_id):
+        self.gets += 1
+        return self.user if user_id == self.user.id else None
+
+
+@pytest.fixture
+def session(monkeypatch):
+    user = User(
+        id=7,
+        email="ana@example.com",
+        full_name="Ana",
+        role=UserRole.agronomo,
+        locale="pt-BR",
+        preferences={},
+        is_active=True,
+        created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        updated_at=None,
+    )
+    db = _UserSession(user)
+
+    async def _override():
+        yield db
+
+    monkeypatch.setattr(users_service, "principal_cache", TwoTierCache("principals-test", None))
+    app.dependency_overrides[deps.get_db] = _override
+    app.dependency_overrides[deps.rate_limit_dep] = lambda: None
+    yield db
+    app.dependency_overrides.pop(deps.get_db)
+    app.dependency_overrides.pop(deps.rate_limit_dep)
+
+
+def test_current_user_is_loaded_once(session):
+    headers = {"Authorization": f"Bearer {create_access_token('7', ['agronomo'])}"}
+    responses = [client.get("/auth/me", headers=headers) for _ in range(3)]
+    assert all(response.status_code == 200 for response in responses)
+    assert responses[-1].json()["email"] == "ana@example.com"
+    assert session.gets == 1
+
+    users_service.principal_cache.invalidate_local([7])
+    session.user.is_active = False
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    assert session.gets == 2
+
+
+def test_role_check_from_token_claims():
+    claims = TokenPayload.model_validate(decode_token(create_access_token("7", ["visualizador"])))
+    assert asyncio.run(deps.require_roles(UserRole.visualizador, from_token=True)(claims)) is claims
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(deps.require_roles(UserRole.gestor, from_token=True)(claims))
+    assert exc.value.status_code == 403
+
+
+def test_password_hashing_leaves_event_loop_free_and_sheds_excess(monkeypatch):
+    def slow_hash(password):
+        time.sleep(0.2)
+        return f"hashed:{password}"
+
+    monkeypatch.setattr(security.pwd_context, "hash", slow_hash)
+    hasher = PasswordHasher(workers=2, max_pending=2)
+
+    async def ticker():
+        ticks = 0
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        return ticks
+
+    async def scenario():
+        return await asyncio.gather(
+            *(hasher.hash(str(i)) for i in range(3)), asyncio.wait_for(ticker(), 0.15), return_exceptions=True
+        )
+
+    *hashes, ticks = asyncio.run(scenario())
+    assert hashes[:2] == ["hashed:0", "hashed:1"]
+    assert isinstance(hashes[2], HTTPException) and hashes[2].status_code == 503
+    assert ticks == 10
+
+
+def test_refresh_rejects_access_tokens_without_lookup(session):
+    access = create_access_token("7", ["agronomo"])
+    response = client.post("/auth/refresh", json={"refresh_token": access})
+    assert response.status_code == 401
+    assert session.gets == 0
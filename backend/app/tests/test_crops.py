@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -43,3 +45,103 @@ def test_simulation(monkeypatch):
     response = client.post("/crops/simulation", json=payload)
     assert response.status_code == 200
     assert response.json()["projected_margin"] == 2000
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.commits = 0
+
+    async def execute(self, stmt, params=None):
+        self.executed.append((stmt, params))
+        return _FakeResult(self.rows)
+
+    async def commit(self):
+        self.commits += 1
+
+
+async def test_compare_is_batched(monkeypatch):
+    from app.schemas import SimulationCompareRequest, SimulationRequest
+
+    monkeypatch.setattr(crops_service.baseline_cache, "redis", None)
+    crops_service.baseline_cache.clear_local()
+    session = _FakeSession([(1, 60.0, 2000.0)])
+    scenarios = [
+        SimulationRequest(
+            field_id=field_id,
+            rainfall_delta_pct=delta,
+            input_cost_delta_pct=-delta / 2,
+            fertilizer_delta_pct=0,
+            cultivar="SOJA RR",
+            bag_price=150,
+        )
+        for field_id, delta in [(1, 10), (1, -10), (2, 0)]
+    ]
+    results = await crops_service.CropService(session).compare(SimulationCompareRequest(scenarios=scenarios))
+
+    assert len(session.executed) == 2
+    assert len(session.executed[1][1]) == 3
+    assert session.commits == 1
+    expected = crops_service._simulate_margin(scenarios[0], 60.0, 2000.0)
+    assert results[0] == expected
+    assert results[2].projected_margin == crops_service.DEFAULT_BASELINE_MARGIN
+
+
+def test_sweep_top_k_streams_columns(monkeypatch):
+    async def fake_baselines(_self, field_ids):
+        return {field_id: (60.0, 2000.0) for field_id in field_ids}
+
+    monkeypatch.setattr(crops_service.CropService, "_baselines", fake_baselines)
+    payload = {
+        "field_id": 1,
+        "cultivar": "SOJA RR",
+        "rainfall_delta_pct": {"start": -20, "stop": 20, "step": 5},
+        "input_cost_delta_pct": {"start": -10, "stop": 10, "step": 5},
+        "fertilizer_delta_pct": {"start": 0, "stop": 10, "step": 10},
+        "bag_prices": [140, 160],
+        "top_k": 3,
+    }
+    response = client.post("/crops/simulation/sweep", json=payload)
+    assert response.status_code == 200
+    header, chunk = [json.loads(line) for line in response.text.splitlines()]
+    assert header["cells"] == 3
+    assert chunk["rainfall_delta_pct"] == [20.0] * 3
+    assert chunk["input_cost_delta_pct"] == [-10.0] * 3
+    assert chunk["projected_margin"] == [2640.0] * 3
+
+
+def test_sweep_rejects_oversized_grid():
+    payload = {
+        "field_id": 1,
+        "cultivar": "SOJA RR",
+        "rainfall_delta_pct": {"start": 0, "stop": 100, "step": 0.01},
+        "input_cost_delta_pct": {"start": 0, "stop": 100, "step": 0.01},
+        "fertilizer_delta_pct": {"start": 0, "stop": 0, "step": 1},
+        "bag_prices": [150],
+    }
+    response = client.post("/crops/simulation/sweep", json=payload)
+    assert response.status_code == 422
+
+
+async def test_baselines_are_cached(monkeypatch):
+    monkeypatch.setattr(crops_service.baseline_cache, "redis", None)
+    crops_service.baseline_cache.clear_local()
+    session = _FakeSession([(7, 58.0, 1900.0)])
+    service = crops_service.CropService(session)
+
+    assert await service._baselines({7}) == {7: (58.0, 1900.0)}
+    assert await service._baselines({7}) == {7: (58.0, 1900.0)}
+    assert len(session.executed) == 1
+
+    crops_service.baseline_cache.invalidate_local([7])
+    await service._baselines({7})
+    assert len(session.executed) == 2
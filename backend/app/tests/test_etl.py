@@ -0,0 +1,78 @@
+import io
+from datetime import date
+
+from fastapi import UploadFile
+
+from app.schemas import UploadMapping
+from app.services import etl as etl_service
+from app.services.etl_load import season_window
+
+
+async def test_ingest_csv_reports_nulls_per_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl_service, "VALIDATION_CHUNK_ROWS", 2)
+    content = b"station_code,date,rainfall_mm\nBR001,2025-01-01,1.0\nBR001,2025-01-02,\nBR002,,3.0\nBR002,2025-01-04,4.0\n"
+    service = etl_service.ETLService(tmp_path)
+
+    result = await service.ingest_file(UploadFile(filename="rain.csv", file=io.BytesIO(content)))
+
+    assert (tmp_path / "rain.csv").read_bytes() == content
+    assert result.status == "stored"
+    assert result.issues == [
+        "Valores ausentes no bloco 0 (linhas 0+): coluna 'rainfall_mm' (1)",
+        "Valores ausentes no bloco 1 (linhas 2+): coluna 'date' (1)",
+    ]
+
+
+async def test_ingest_unsupported_format(tmp_path):
+    service = etl_service.ETLService(tmp_path)
+    result = await service.ingest_file(UploadFile(filename="scan.tif", file=io.BytesIO(b"II*\x00")))
+    assert result.issues == ["Formato não suportado, realizar conversão"]
+
+
+def test_normalize_rainfall_from_parquet_staging(tmp_path):
+    source = tmp_path / "rain.csv"
+    source.write_text("station_code,date,rainfall_mm,eto,ndvi\nBR001,2025-01-31,-2.0,4.1,0.6\nBR002,2025-02-01,5.5,3.9,0.7\n")
+    service = etl_service.ETLService(tmp_path)
+
+    out = service.normalize_rainfall(source)
+
+    assert (tmp_path / "staged" / "rain_csv" / "station_code=BR001").is_dir()
+    table = service.open_staged(out).to_table().sort_by("station_code")
+    assert table.column("rainfall_mm").to_pylist() == [0.0, 5.5]
+    assert table.column("month").to_pylist() == [202501, 202502]
+    assert service.normalize_rainfall(source) == out
+
+    preview = service.preview_mapping(UploadMapping(file_path=source, column_map={"rainfall_mm": "chuva"}))
+    assert preview["columns"] == ["station_code", "date", "chuva", "eto", "ndvi"]
+
+
+async def test_staging_survives_type_changes_and_local_dates(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl_service, "STAGING_BLOCK_BYTES", 64)
+    rows = "".join(f"BR001,{day:02d}/01/2025,{day}\n" for day in range(1, 20))
+    content = f"station_code,date,rainfall_mm\n{rows}BR001,20/01/2025,60.5\nBR001,ontem,1\n".encode()
+    service = etl_service.ETLService(tmp_path)
+
+    result = await service.ingest_file(UploadFile(filename="rain.csv", file=io.BytesIO(content)))
+
+    assert result.issues == ["Datas em formato não reconhecido (aceitos: %Y-%m-%d, %d/%m/%Y, %Y/%m/%d, %d-%m-%Y): 1 linhas"]
+    table = service.open_staged(tmp_path / "rain.csv").to_table()
+    assert table.num_rows == 21
+    assert sorted(table.column("rainfall_mm").to_pylist())[-1] == 60.5
+    assert table.column("month").to_pylist().count(202501) == 20
+
+
+async def test_staging_reports_conversion_errors(tmp_path):
+    content = b"field_id,season,area_ha\n101,Safra 23/24,120\nabc,Safra 23/24,95\n"
+    service = etl_service.ETLService(tmp_path)
+
+    result = await service.ingest_file(UploadFile(filename="productivity.csv", file=io.BytesIO(content)))
+
+    assert result.status == "stored"
+    assert result.issues[0].startswith("Falha ao converter para Parquet")
+    assert not (tmp_path / "staged").exists()
+
+
+def test_season_labels_map_to_planting_windows():
+    assert season_window("Safra 23/24") == (date(2023, 7, 1), date(2024, 1, 1))
+    assert season_window("safrinha 2024") == (date(2024, 1, 1), date(2024, 7, 1))
+    assert season_window("Inverno") is None
@@ -0,0 +1,213 @@
+import asyncio
+import io
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import rasterio
+import shapely
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from rasterio.transform import from_origin
+from shapely.geometry import box
+
+from app.api import deps
+from app.main import app
+from app.schemas import FieldSchema, NearestStationResponse
+from app.services import field_import
+from app.services import fields as fields_service
+from app.services import tiles as tiles_service
+from app.services import zonal
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def override_db():
+    async def _override():
+        yield None
+
+    app.dependency_overrides[deps.get_db] = _override
+    app.dependency_overrides[deps.rate_limit_dep] = lambda: None
+    yield
+    app.dependency_overrides.pop(deps.get_db)
+    app.dependency_overrides.pop(deps.rate_limit_dep)
+
+
+def test_list_fields_pages_by_keyset(monkeypatch):
+    calls = []
+
+    async def fake_list(_self, after_id, limit):
+        calls.append((after_id, limit))
+        field = FieldSchema(id=42, name="Talhão 42", area_ha=10, geometry={"type": "MultiPolygon", "coordinates": []})
+        return [field], 42
+
+    monkeypatch.setattr(fields_service.FieldService, "list_fields", fake_list)
+    response = client.get("/fields", params={"after_id": 41, "limit": 1})
+    assert response.status_code == 200
+    assert response.headers["X-Next-Cursor"] == "42"
+    assert response.json()[0]["id"] == 42
+    assert calls == [(41, 1)]
+
+
+def test_list_fields_geojson_is_passed_through(monkeypatch):
+    body = '{"type" : "FeatureCollection", "features" : []}'
+
+    async def fake_geojson(_self, after_id, limit):
+        return body, None
+
+    monkeypatch.setattr(fields_service.FieldService, "list_fields_geojson", fake_geojson)
+    response = client.get("/fields", params={"format": "geojson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/geo+json"
+    assert "X-Next-Cursor" not in response.headers
+    assert response.text == body
+
+
+def test_tiles_are_versioned_and_revalidated(monkeypatch):
+    rendered = []
+
+    async def fake_version():
+        return 7
+
+    async def fake_get(_self, z, x, y, version):
+        rendered.append((z, x, y, version))
+        return b"\x1a\x02mvt" if x else b""
+
+    monkeypatch.setattr(tiles_service.FieldTileService, "get", fake_get)
+    monkeypatch.setattr("app.api.routes.fields.tile_version", fake_version)
+    response = client.get("/fields/tiles/12/1520/2200.mvt")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+    etag = response.headers["ETag"]
+    assert etag == '"fields-7-12-1520-2200"'
+
+    assert client.get("/fields/tiles/12/1520/2200.mvt", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/fields/tiles/12/0/2200.mvt").status_code == 204
+    assert client.get("/fields/tiles/23/0/0.mvt").status_code == 422
+    assert rendered == [(12, 1520, 2200, 7), (12, 0, 2200, 7)]
+
+
+def test_tile_version_is_not_cached_while_bump_is_pending(monkeypatch):
+    counter = {"value": 3}
+    bump_started = asyncio.Event()
+    release_bump = asyncio.Event()
+
+    async def get(_key):
+        return counter["value"]
+
+    async def incr(_key):
+        bump_started.set()
+        await release_bump.wait()
+        counter["value"] += 1
+
+    monkeypatch.setattr(tiles_service, "redis_client", SimpleNamespace(get=get, incr=incr))
+    monkeypatch.setattr(tiles_service, "_version", (0.0, None))
+
+    async def scenario():
+        assert await tiles_service.tile_version() == 3
+        session = SimpleNamespace(info={"field_tiles_changed": True})
+        tiles_service._invalidate_tiles(session)
+        await bump_started.wait()
+        # INCR ainda em andamento: nada de servir (nem memorizar) a versão antiga.
+        assert await tiles_service.tile_version() is None
+        release_bump.set()
+        await asyncio.gather(*tiles_service._pending_bumps)
+        assert await tiles_service.tile_version() == 4
+
+    asyncio.run(scenario())
+
+
+def test_spatial_filters_and_nearest_stations(monkeypatch):
+    calls = []
+
+    async def fake_bbox(_self, bbox, after_id, limit):
+        calls.append(bbox)
+        return [], None
+
+    async def fake_nearest(_self, field_id, k):
+        calls.append((field_id, k))
+        return [
+            NearestStationResponse(
+                code="A001", name="Brasília", latitude=-15.79, longitude=-47.93, elevation=None, rank=1, distance_km=12.5
+            )
+        ]
+
+    monkeypatch.setattr(fields_service.FieldService, "fields_in_bbox", fake_bbox)
+    monkeypatch.setattr(fields_service.FieldService, "nearest_stations", fake_nearest)
+    assert client.get("/fields/within", params={"bbox": "-48.1,-16,-47.5,-15.5"}).json() == []
+    assert client.get("/fields/within", params={"bbox": "-47.5,-16,-48.1,-15.5"}).status_code == 422
+    assert client.get("/fields/within", params={"bbox": "-48.1,-16"}).status_code == 422
+    invalid = {"type": "Polygon", "coordinates": [[[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]]]}
+    assert client.post("/fields/within", json=invalid).status_code == 422
+    response = client.get("/fields/7/stations", params={"k": 1})
+    assert response.json()[0]["distance_km"] == 12.5
+    assert calls == [(-48.1, -16.0, -47.5, -15.5), (7, 1)]
+
+
+def test_import_streams_features_and_repairs_geometries():
+    bowtie = {"type": "Polygon", "coordinates": [[[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]]]}
+    square_3d = {"type": "Polygon", "coordinates": [[[0, 0, 5], [1, 0, 5], [1, 1, 5], [0, 1, 5], [0, 0, 5]]]}
+    collection = {
+        "type": "FeatureCollection",
+        "name": "talhoes",
+        "features": [
+            {"type": "Feature", "properties": {"name": "Gravata", "ndvi": 0.7}, "geometry": bowtie},
+            {"type": "Feature", "properties": {"name": "Sede"}, "geometry": {"type": "Point", "coordinates": [0, 0]}},
+            {"type": "Feature", "id": 9, "properties": {"area_ha": 12.5}, "geometry": square_3d},
+        ],
+    }
+    source = io.BytesIO(json.dumps(collection).encode())
+    [batch] = list(field_import.prepared_batches(source, batch_size=10))
+    assert (batch.features, batch.repaired, batch.rejected) == (3, 1, 1)
+    assert [record[:3] for record in batch.records] == [(0, "Gravata", None), (2, "Talhão importado 3", 12.5)]
+    assert json.loads(batch.records[1][5]) == {"feature_id": 9}
+    assert shapely.from_wkb(batch.records[0][6]).geom_type == "MultiPolygon"
+    assert not shapely.from_wkb(batch.records[1][6]).has_z
+    assert batch.issues[0].startswith("Feição 0: Self-intersection")
+
+    with pytest.raises(ValueError):
+        list(field_import.iter_features(io.BytesIO(b'{"type": "Feature", "geometry": null}')))
+
+
+def test_zonal_stats_reads_field_windows(tmp_path):
+    # Raster 100x100 em SIRGAS 2000 com pixels de 0.001°; valor = coluna / 100.
+    path = tmp_path / "ndvi.tif"
+    data = np.tile(np.arange(100, dtype="float32") / 100, (100, 1))
+    data[50, 15] = -9999
+    transform = from_origin(-50.0, -10.0, 0.001, 0.001)
+    with rasterio.open(
+        path, "w", driver="GTiff", width=100, height=100, count=1, dtype="float32", nodata=-9999,
+        crs="EPSG:4674", transform=transform, tiled=True, blockxsize=16, blockysize=16,
+    ) as dst:
+        dst.write(data, 1)
+
+    fields = [
+        (1, shapely.to_wkb(box(-49.99, -10.06, -49.98, -10.04))),  # colunas 10-19
+        (2, shapely.to_wkb(box(-49.0, -11.0, -48.9, -10.9))),  # fora do raster
+        (3, shapely.to_wkb(box(-49.9502, -10.0502, -49.9501, -10.0501))),  # menor que um pixel
+    ]
+    [(_, stats), outside, (_, tiny)] = zonal.zonal_stats(str(path), fields, value_range=(-1.0, 1.0))
+    assert outside == (2, None)
+    assert (stats["min"], stats["max"], stats["p50"]) == (0.1, 0.19, 0.14)
+    assert stats["count"] == 20 * 10 - 1
+    assert sum(stats["histogram"]["counts"]) == stats["count"]
+    assert tiny["count"] == 1 and tiny["avg"] == 0.49
+
+
+def test_zonal_raster_path_is_confined_to_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(zonal.settings, "raster_storage_dir", str(tmp_path))
+
+    resolved = zonal.resolve_raster_path("ndvi/cena.tif")
+    assert resolved == tmp_path / "ndvi" / "cena.tif"
+    assert zonal.relative_raster_path(resolved) == "ndvi/cena.tif"
+    with pytest.raises(HTTPException):
+        zonal.relative_raster_path(tmp_path.parent / "fora.tif")
+    for path in ("../segredo.tif", "/etc/passwd", "/vsicurl/http://example.com/a.tif", "s3://bucket/a.tif"):
+        with pytest.raises(HTTPException) as exc:
+            zonal.resolve_raster_path(path)
+        assert exc.value.status_code == 422
+
+    response = client.post("/fields/layers/zonal", json={"raster_path": "cena.tif", "layer_type": "ndvi"})
+    assert response.status_code == 401
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.core.cache import StaleWhileRevalidateCache
+from app.main import app
+from app.services import prices as price_service
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def override_db():
+    async def _override():
+        yield None
+
+    app.dependency_overrides[deps.get_db] = _override
+    yield
+    app.dependency_overrides.pop(deps.get_db)
+
+
+class _FakeRedis:
+    """Subconjunto de ``redis.asyncio`` usado pelo cache (MGET, SET NX/PX, EVAL)."""
+
+    def __init__(self):
+        self.store: dict[str, str] = {}
+        self.calls: list[str] = []
+
+    async def mget(self, keys):
+        self.calls.append("mget")
+        return [self.store.get(key) for key in keys]
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        self.calls.append("set")
+        if nx and key in self.store:
+            return False
+        self.store[key] = value
+        return True
+
+    async def eval(self, _script, _numkeys, key, token):
+        if self.store.get(key) == token:
+            del self.store[key]
+            return 1
+        return 0
+
+
+class _StubFetcher:
+    def __init__(self, value, delay=0.05):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+def test_current_prices_served_from_store_snapshot(monkeypatch):
+    snapshot = {"freight": {"price_r_t": 85.0, "source": "AgroFreight API", "timestamp": "2025-01-01T00:00:00"}}
+    reads = []
+
+    async def fake_latest():
+        reads.append(1)
+        return snapshot
+
+    monkeypatch.setattr(price_service, "_latest_from_store", fake_latest)
+    monkeypatch.setattr(price_service, "price_cache", StaleWhileRevalidateCache("prices-test", None, 300, 3600))
+    first = client.get("/prices/current")
+    second = client.get("/prices/current")
+    assert first.status_code == second.status_code == 200
+    assert first.json() == {"freight": snapshot["freight"]}
+    assert len(reads) == 1
+
+
+class _RecordingSession:
+    def __init__(self):
+        self.rows = []
+        self.commits = 0
+
+    async def execute(self, _stmt, rows=None):
+        self.rows.extend(rows or [])
+
+    async def commit(self):
+        self.commits += 1
+
+
+def test_poll_appends_one_row_per_commodity(monkeypatch):
+    async def failing():
+        raise RuntimeError("fonte fora do ar")
+
+    sources = {
+        "soybean_spot": _StubFetcher({"price_r_sc": 185.5, "source": "CEPEA", "timestamp": "2025-01-01T12:00:00"}, 0),
+        # Cotações malformadas: descartadas sem abortar a coleta das demais.
+        "soybean_contract": _StubFetcher({"price_r_sc": 188.2, "source": "B3"}, 0),
+        "fertilizer_npk": _StubFetcher({"price_r_t": "n/d", "source": "ANDA", "timestamp": "2025-01-01T12:00:00"}, 0),
+        "freight": failing,
+    }
+    monkeypatch.setattr(price_service, "PRICE_SOURCES", sources)
+    db = _RecordingSession()
+    quotes = asyncio.run(price_service.PriceService(db).poll())
+    assert list(quotes) == ["soybean_spot"]
+    assert db.commits == 1
+    [row] = db.rows
+    assert (row["commodity"], row["price"], row["unit"]) == ("soybean_spot", 185.5, "R$/sc")
+    assert row["ts"].tzinfo is not None
+
+
+def test_concurrent_misses_fetch_once_per_key():
+    cache = StaleWhileRevalidateCache("single-flight", _FakeRedis(), soft_ttl=300, hard_ttl=3600)
+    fetcher = _StubFetcher({"price": 10})
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get_many({"spot": fetcher}) for _ in range(20)))
+        assert all(result == {"spot": {"price": 10}} for result in results)
+
+    asyncio.run(scenario())
+    assert fetcher.calls == 1
+
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    cache = StaleWhileRevalidateCache("stale", None, soft_ttl=300, hard_ttl=3600)
+    cache._local["spot"] = {"value": {"price": 1}, "fresh_until": time.time() - 1, "expires_at": time.time() + 60}
+    fetcher = _StubFetcher({"price": 2})
+
+    async def scenario():
+        stale = await asyncio.gather(*(cache.get_many({"spot": fetcher}) for _ in range(10)))
+        assert all(result == {"spot": {"price": 1}} for result in stale)
+        await asyncio.gather(*cache._background)
+        assert await cache.get_many({"spot": fetcher}) == {"spot": {"price": 2}}
+
+    asyncio.run(scenario())
+    assert fetcher.calls == 1
+
+
+def test_waits_for_peer_holding_redis_lock():
+    redis = _FakeRedis()
+    cache = StaleWhileRevalidateCache("peer", redis, soft_ttl=300, hard_ttl=3600)
+    redis.store[cache._lock_key("spot")] = "other-worker"
+    fetcher = _StubFetcher({"price": 3})
+
+    async def peer_publishes():
+        await asyncio.sleep(0.1)
+        envelope = {"value": {"price": 4}, "fresh_until": time.time() + 300, "expires_at": time.time() + 3600}
+        redis.store[cache._redis_key("spot")] = json.dumps(envelope)
+
+    async def scenario():
+        result, _ = await asyncio.gather(cache.get_many({"spot": fetcher}), peer_publishes())
+        assert result == {"spot": {"price": 4}}
+
+    asyncio.run(scenario())
+    assert fetcher.calls == 0
+
+
+def test_ttls_are_jittered():
+    cache = StaleWhileRevalidateCache("jitter", None, soft_ttl=100, hard_ttl=1000, jitter=0.2)
+    expiries = {round(cache._envelope(1)["fresh_until"] - time.time()) for _ in range(50)}
+    assert len(expiries) > 1
+    assert all(80 <= ttl <= 120 for ttl in expiries)
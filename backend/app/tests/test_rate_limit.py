@@ -0,0 +1,77 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core import rate_limit
+
+
+class _FakeScript:
+    """Substitui o script Lua registrado, guardando os argumentos de cada chamada."""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = []
+
+    async def __call__(self, keys, args):
+        self.calls.append((keys, args))
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_buckets", OrderedDict())
+    monkeypatch.setattr(rate_limit, "_fallback_tats", OrderedDict())
+    monkeypatch.setattr(rate_limit, "_breaker", rate_limit.CircuitBreaker(failures=3, cooldown=30))
+
+
+def test_limits_scale_with_role_and_route():
+    settings = rate_limit.settings
+    rules = rate_limit.limits_for("user:1", ["visualizador", "gestor"], "etl.load")
+    factor = settings.rate_limit_role_factors["gestor"]
+    assert rules == [
+        ("rate:user:1", int(settings.rate_limit_per_minute * factor)),
+        ("rate:user:1:etl.load", int(settings.rate_limit_routes["etl.load"] * factor)),
+    ]
+    assert rate_limit.limits_for("ip:10.0.0.1", [], "weather.get_forecast") == [
+        ("rate:ip:10.0.0.1", settings.rate_limit_per_minute)
+    ]
+
+
+def test_all_buckets_checked_in_one_call(monkeypatch):
+    script = _FakeScript(result=[0, 3500])
+    monkeypatch.setattr(rate_limit, "_gcra", script)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(rate_limit.enforce([("rate:a", 120), ("rate:a:etl.load", 5)]))
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "4"
+    assert script.calls == [(["rate:a", "rate:a:etl.load"], [1, 500, 120, 12000, 5])]
+    # A negação fica em memória até o Retry-After: sem nova ida ao Redis.
+    with pytest.raises(HTTPException):
+        asyncio.run(rate_limit.enforce([("rate:a", 120), ("rate:a:etl.load", 5)]))
+    assert len(script.calls) == 1
+
+
+def test_reserved_block_is_spent_locally(monkeypatch):
+    script = _FakeScript(result=[10, 0])
+    monkeypatch.setattr(rate_limit, "_gcra", script)
+    for _ in range(25):
+        asyncio.run(rate_limit.enforce([("rate:a", 120)]))
+    assert len(script.calls) == 3
+    assert script.calls[0][1][0] == 10
+
+
+def test_breaker_stops_calling_redis_and_limits_per_worker(monkeypatch):
+    script = _FakeScript(error=RedisConnectionError("down"))
+    monkeypatch.setattr(rate_limit, "_gcra", script)
+    for _ in range(5):
+        asyncio.run(rate_limit.enforce([("rate:a", 5)]))
+    assert len(script.calls) == 3
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(rate_limit.enforce([("rate:a", 5)]))
+    assert exc.value.status_code == 429
@@ -0,0 +1,99 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.main import app
+from app.models import ReportType
+from app.schemas import ReportStatus
+from app.services import reports as report_service
+from app.tasks import reports as report_tasks
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def override_db():
+    async def _override():
+        yield None
+
+    app.dependency_overrides[deps.get_db] = _override
+    yield
+    app.dependency_overrides.pop(deps.get_db)
+
+
+def test_create_report_forwards_idempotency_key(monkeypatch):
+    received = []
+
+    async def fake_enqueue(_self, payload, idempotency_key=None):
+        received.append((payload.report_type, idempotency_key))
+        return ReportStatus(id=7, report_type=payload.report_type, status="pending", created_at=datetime(2026, 1, 1))
+
+    monkeypatch.setattr(report_service.ReportService, "enqueue", fake_enqueue)
+    response = client.post("/reports", json={"report_type": "safra"}, headers={"Idempotency-Key": "safra-2026"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    assert received == [(ReportType.safra, "safra-2026")]
+
+
+calls: list[tuple] = []
+
+
+class _FakeJobs:
+    """Substitui o ReportService no worker, registrando as transições do job."""
+
+    def __init__(self, _db):
+        pass
+
+    async def claim(self, job_id, stale_after):
+        calls.append(("claim", job_id))
+        attempts = sum(1 for call in calls if call[0] == "claim")
+        return SimpleNamespace(report_type=ReportType.clima, payload={"safra": "2025/26"}, attempts=attempts)
+
+    async def finish(self, job_id, file_url):
+        calls.append(("finish", file_url))
+
+    async def fail(self, job_id, error, final):
+        calls.append(("fail", str(error), final))
+
+
+@pytest.fixture
+def fake_worker(monkeypatch):
+    class _Session:
+        async def __aenter__(self):
+            return None
+
+        async def __aexit__(self, *_exc):
+            return False
+
+    async def fake_dispose():
+        return None
+
+    calls.clear()
+    monkeypatch.setattr(report_tasks, "ReportService", _FakeJobs)
+    monkeypatch.setattr(report_tasks, "get_session", _Session)
+    monkeypatch.setattr(report_tasks, "engine", SimpleNamespace(dispose=fake_dispose))
+    return calls
+
+
+def test_render_task_marks_job_finished(fake_worker):
+    report_tasks.render_report.apply(args=[5])
+    assert fake_worker == [("claim", 5), ("finish", "s3://siad-reports/5.pdf")]
+
+
+def test_render_task_retries_then_fails(fake_worker, monkeypatch):
+    def broken(_report_type, _params):
+        raise ValueError("fonte indisponível")
+
+    monkeypatch.setattr(report_tasks, "render_pdf", broken)
+    # Em apply() as novas tentativas rodam na hora, sem o backoff; o limite vem de ``attempts``.
+    report_tasks.render_report.apply(args=[5])
+    retries = report_tasks.settings.report_max_retries
+    assert fake_worker.count(("claim", 5)) == retries + 1
+    assert [call[2] for call in fake_worker if call[0] == "fail"] == [False] * retries + [True]
+
+    # Mensagem republicada (retries=0 no Celery) de um job que já esgotou as tentativas.
+    report_tasks.render_report.apply(args=[5])
+    assert fake_worker[-1] == ("fail", "fonte indisponível", True)
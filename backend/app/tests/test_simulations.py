@@ -0,0 +1,16 @@
+from app.tasks.simulations import run_monte_carlo
+
+
+def test_monte_carlo_payload_keys():
+    result = run_monte_carlo({"iterations": 5000, "bag_price": 160, "seed": 7})
+    assert {"yield", "margin", "bag_price"} <= result.keys()
+    assert result["bag_price"] == 160
+    assert result["margin_p5"] <= result["margin_p50"] <= result["margin_p95"]
+    assert result["var_95"] >= 0
+    assert 0 <= result["prob_negative_margin"] <= 1
+
+
+def test_monte_carlo_is_reproducible_with_seed():
+    payload = {"iterations": 200_000, "rainfall_delta_pct": 10, "input_cost_delta_pct": -5, "seed": 42}
+    assert run_monte_carlo(payload) == run_monte_carlo(payload)
+    assert 55 < run_monte_carlo(payload)["yield"] < 66
@@ -1,8 +1,13 @@
+import asyncio
+from datetime import date
+
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
 from app.api import deps
 from app.main import app
+from app.models import WeatherStation
 from app.schemas import ForecastResponse, HistoryResponse, StationResponse
 from app.services import weather as weather_service
 
@@ -49,3 +54,63 @@ def test_history(monkeypatch):
     response = client.get("/weather/history", params={"station": "BR001"})
     assert response.status_code == 200
     assert response.json()["station_code"] == "BR001"
+
+
+class _StationResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class _StationSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def execute(self, _stmt):
+        self.queries += 1
+        return _StationResult(self.rows)
+
+
+def test_station_registry_resolves_in_memory():
+    station = WeatherStation(id=7, code="BR007", name="Teste", latitude=-10.0, longitude=-50.0, elevation=None)
+    db = _StationSession([station])
+    registry = weather_service.StationRegistry(miss_interval=0)
+
+    async def scenario():
+        assert await registry.resolve(db, "BR007") == 7
+        assert await registry.resolve(db, "BR007") == 7
+        assert db.queries == 1
+        with pytest.raises(HTTPException) as exc:
+            await registry.resolve(db, "XX999")
+        assert exc.value.status_code == 404
+        assert db.queries == 2
+        registry.invalidate()
+        assert [s.code for s in await registry.stations(db)] == ["BR007"]
+        assert db.queries == 3
+
+    asyncio.run(scenario())
+
+
+def test_forecast_batch(monkeypatch):
+    async def fake_forecasts(_self, codes):
+        return [ForecastResponse(station_code=code, generated_at="2025-01-01T00:00:00Z", forecast=[]) for code in codes]
+
+    monkeypatch.setattr(weather_service.WeatherService, "get_forecasts", fake_forecasts)
+    response = client.get("/weather/forecast/batch", params=[("stations", "BR001,BR002"), ("stations", "BR001")])
+    assert response.status_code == 200
+    assert [item["station_code"] for item in response.json()] == ["BR001", "BR002"]
+
+
+def test_rollup_ranges_cover_window_with_coarsest_buckets():
+    ranges = weather_service.rollup_ranges(date(2001, 3, 15), date(2021, 11, 3))
+    assert ranges.seasons == [(date(2001, 7, 1), date(2021, 7, 1))]
+    assert ranges.months == [(date(2001, 4, 1), date(2001, 7, 1)), (date(2021, 7, 1), date(2021, 11, 1))]
+    assert ranges.days == [(date(2001, 3, 15), date(2001, 4, 1)), (date(2021, 11, 1), date(2021, 11, 4))]
+    assert weather_service.rollup_ranges(None, None).seasons == [(None, None)]
+    assert weather_service.rollup_ranges(date(2020, 1, 5), date(2020, 1, 20)).days == [(date(2020, 1, 5), date(2020, 1, 21))]